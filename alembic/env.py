@@ -14,6 +14,7 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from app.core.config import settings
 from app.models.user import Base as UserBase
 from app.models.transcription import Base as TranscriptionBase
+from app.models.outbox import OutboxMessage  # noqa: F401, registers the table
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
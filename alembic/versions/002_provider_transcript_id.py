@@ -0,0 +1,27 @@
+"""Add provider transcript ID to transcription jobs
+
+Revision ID: 002_provider_transcript_id
+Revises: 001_initial_migration
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '002_provider_transcript_id'
+down_revision: Union[str, None] = '001_initial_migration'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transcription_jobs', sa.Column('provider_transcript_id', sa.String(length=255), nullable=True))
+    op.create_index(op.f('ix_transcription_jobs_provider_transcript_id'), 'transcription_jobs', ['provider_transcript_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_transcription_jobs_provider_transcript_id'), table_name='transcription_jobs')
+    op.drop_column('transcription_jobs', 'provider_transcript_id')
@@ -0,0 +1,42 @@
+"""Add keyset pagination indexes for job listing
+
+Revision ID: 003_job_listing_indexes
+Revises: 002_provider_transcript_id
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '003_job_listing_indexes'
+down_revision: Union[str, None] = '002_provider_transcript_id'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Build concurrently so job writes are not blocked on large tables
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transcription_jobs_user_id_created_at_id',
+            'transcription_jobs',
+            ['user_id', sa.text('created_at DESC'), 'id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_transcription_jobs_created_at_id',
+            'transcription_jobs',
+            [sa.text('created_at DESC'), 'id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_transcription_jobs_created_at_id', table_name='transcription_jobs', postgresql_concurrently=True)
+        op.drop_index('ix_transcription_jobs_user_id_created_at_id', table_name='transcription_jobs', postgresql_concurrently=True)
@@ -0,0 +1,69 @@
+"""Move transcript results into their own table
+
+Revision ID: 004_transcription_results
+Revises: 003_job_listing_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '004_transcription_results'
+down_revision: Union[str, None] = '003_job_listing_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('transcription_results',
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('transcript_text', sa.Text(), nullable=True),
+        sa.Column('speaker_diarization_results', sa.JSON(), nullable=True),
+        sa.Column('sentiment_analysis_results', sa.JSON(), nullable=True),
+        sa.Column('summary', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['transcription_jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('job_id')
+    )
+    
+    # Backfill from the jobs table before dropping the columns
+    op.execute("""
+        INSERT INTO transcription_results (
+            job_id, transcript_text, speaker_diarization_results,
+            sentiment_analysis_results, summary, created_at
+        )
+        SELECT id, transcript_text, speaker_diarization_results,
+               sentiment_analysis_results, summary, COALESCE(completed_at, now())
+        FROM transcription_jobs
+        WHERE transcript_text IS NOT NULL
+           OR speaker_diarization_results IS NOT NULL
+           OR sentiment_analysis_results IS NOT NULL
+           OR summary IS NOT NULL
+    """)
+    
+    op.drop_column('transcription_jobs', 'summary')
+    op.drop_column('transcription_jobs', 'sentiment_analysis_results')
+    op.drop_column('transcription_jobs', 'speaker_diarization_results')
+    op.drop_column('transcription_jobs', 'transcript_text')
+
+
+def downgrade() -> None:
+    op.add_column('transcription_jobs', sa.Column('transcript_text', sa.Text(), nullable=True))
+    op.add_column('transcription_jobs', sa.Column('speaker_diarization_results', sa.JSON(), nullable=True))
+    op.add_column('transcription_jobs', sa.Column('sentiment_analysis_results', sa.JSON(), nullable=True))
+    op.add_column('transcription_jobs', sa.Column('summary', sa.Text(), nullable=True))
+    
+    op.execute("""
+        UPDATE transcription_jobs
+        SET transcript_text = r.transcript_text,
+            speaker_diarization_results = r.speaker_diarization_results,
+            sentiment_analysis_results = r.sentiment_analysis_results,
+            summary = r.summary
+        FROM transcription_results r
+        WHERE r.job_id = transcription_jobs.id
+    """)
+    
+    op.drop_table('transcription_results')
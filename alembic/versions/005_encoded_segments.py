@@ -0,0 +1,88 @@
+"""Store diarization and sentiment segments in the compact columnar encoding
+
+Revision ID: 005_encoded_segments
+Revises: 004_transcription_results
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.segment_codec import decode_segments, encode_segments
+
+# revision identifiers, used by Alembic.
+revision: str = '005_encoded_segments'
+down_revision: Union[str, None] = '004_transcription_results'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+results = sa.table(
+    'transcription_results',
+    sa.column('job_id', sa.Integer),
+    sa.column('speaker_diarization_results', sa.JSON),
+    sa.column('sentiment_analysis_results', sa.JSON),
+    sa.column('speaker_segments', sa.LargeBinary),
+    sa.column('sentiment_segments', sa.LargeBinary)
+)
+
+
+def _convert(source_columns, convert, target_columns) -> None:
+    """Rewrite rows in job_id order, one batch at a time"""
+    connection = op.get_bind()
+    last_job_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(results.c.job_id, *source_columns)
+            .where(results.c.job_id > last_job_id)
+            .order_by(results.c.job_id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            connection.execute(
+                results.update()
+                .where(results.c.job_id == row[0])
+                .values({column.name: convert(value) for column, value in zip(target_columns, row[1:])})
+            )
+        last_job_id = rows[-1][0]
+
+
+def _from_json(value):
+    # JSON columns can come back as text on some drivers
+    if isinstance(value, str):
+        value = json.loads(value)
+    return encode_segments(value)
+
+
+def upgrade() -> None:
+    op.add_column('transcription_results', sa.Column('speaker_segments', sa.LargeBinary(), nullable=True))
+    op.add_column('transcription_results', sa.Column('sentiment_segments', sa.LargeBinary(), nullable=True))
+    
+    _convert(
+        [results.c.speaker_diarization_results, results.c.sentiment_analysis_results],
+        _from_json,
+        [results.c.speaker_segments, results.c.sentiment_segments]
+    )
+    
+    op.drop_column('transcription_results', 'sentiment_analysis_results')
+    op.drop_column('transcription_results', 'speaker_diarization_results')
+
+
+def downgrade() -> None:
+    op.add_column('transcription_results', sa.Column('speaker_diarization_results', sa.JSON(), nullable=True))
+    op.add_column('transcription_results', sa.Column('sentiment_analysis_results', sa.JSON(), nullable=True))
+    
+    _convert(
+        [results.c.speaker_segments, results.c.sentiment_segments],
+        decode_segments,
+        [results.c.speaker_diarization_results, results.c.sentiment_analysis_results]
+    )
+    
+    op.drop_column('transcription_results', 'sentiment_segments')
+    op.drop_column('transcription_results', 'speaker_segments')
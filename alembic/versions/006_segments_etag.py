@@ -0,0 +1,56 @@
+"""Add a precomputed ETag for transcript segments
+
+Revision ID: 006_segments_etag
+Revises: 005_encoded_segments
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.segment_codec import segments_etag
+
+# revision identifiers, used by Alembic.
+revision: str = '006_segments_etag'
+down_revision: Union[str, None] = '005_encoded_segments'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+results = sa.table(
+    'transcription_results',
+    sa.column('job_id', sa.Integer),
+    sa.column('speaker_segments', sa.LargeBinary),
+    sa.column('sentiment_segments', sa.LargeBinary),
+    sa.column('segments_etag', sa.String)
+)
+
+
+def upgrade() -> None:
+    op.add_column('transcription_results', sa.Column('segments_etag', sa.String(length=64), nullable=True))
+    
+    connection = op.get_bind()
+    last_job_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(results.c.job_id, results.c.speaker_segments, results.c.sentiment_segments)
+            .where(results.c.job_id > last_job_id)
+            .order_by(results.c.job_id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for job_id, speaker_segments, sentiment_segments in rows:
+            connection.execute(
+                results.update()
+                .where(results.c.job_id == job_id)
+                .values(segments_etag=segments_etag(speaker_segments, sentiment_segments))
+            )
+        last_job_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    op.drop_column('transcription_results', 'segments_etag')
@@ -0,0 +1,51 @@
+"""Add a generated tsvector column and GIN index for transcript search
+
+Revision ID: 007_transcript_search
+Revises: 006_segments_etag
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '007_transcript_search'
+down_revision: Union[str, None] = '006_segments_etag'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'transcription_results',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('english', coalesce(transcript_text, ''))", persisted=True),
+            nullable=True
+        )
+    )
+    
+    # Build concurrently so result writes are not blocked on large tables
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transcription_results_search_vector',
+            'transcription_results',
+            ['search_vector'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transcription_results_search_vector',
+            table_name='transcription_results',
+            postgresql_concurrently=True
+        )
+    op.drop_column('transcription_results', 'search_vector')
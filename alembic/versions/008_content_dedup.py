@@ -0,0 +1,54 @@
+"""Add content hash deduplication columns to transcription jobs
+
+Revision ID: 008_content_dedup
+Revises: 007_transcript_search
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '008_content_dedup'
+down_revision: Union[str, None] = '007_transcript_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transcription_jobs', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.add_column('transcription_jobs', sa.Column('duplicate_of_job_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'transcription_jobs_duplicate_of_job_id_fkey',
+        'transcription_jobs', 'transcription_jobs',
+        ['duplicate_of_job_id'], ['id'],
+        ondelete='SET NULL'
+    )
+    
+    # Build concurrently so job writes are not blocked on large tables
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_transcription_jobs_duplicate_of_job_id'),
+            'transcription_jobs',
+            ['duplicate_of_job_id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_transcription_jobs_user_id_content_sha256',
+            'transcription_jobs',
+            ['user_id', 'content_sha256'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_transcription_jobs_user_id_content_sha256', table_name='transcription_jobs', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_transcription_jobs_duplicate_of_job_id'), table_name='transcription_jobs', postgresql_concurrently=True)
+    op.drop_constraint('transcription_jobs_duplicate_of_job_id_fkey', 'transcription_jobs', type_='foreignkey')
+    op.drop_column('transcription_jobs', 'duplicate_of_job_id')
+    op.drop_column('transcription_jobs', 'content_sha256')
@@ -0,0 +1,52 @@
+"""Add the outbox_messages table for transactional task publishing
+
+Revision ID: 009_outbox_messages
+Revises: 008_content_dedup
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '009_outbox_messages'
+down_revision: Union[str, None] = '008_content_dedup'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_messages',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('task_name', sa.String(length=255), nullable=False),
+        sa.Column('task_id', sa.String(length=255), nullable=False),
+        sa.Column('args', sa.JSON(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # Wake the relay once per inserting statement; delivered when the transaction commits
+    op.execute("""
+        CREATE FUNCTION notify_outbox_messages() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('outbox_messages', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER outbox_messages_notify
+        AFTER INSERT ON outbox_messages
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_outbox_messages()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER outbox_messages_notify ON outbox_messages")
+    op.execute("DROP FUNCTION notify_outbox_messages()")
+    op.drop_table('outbox_messages')
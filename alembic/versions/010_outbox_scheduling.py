@@ -0,0 +1,39 @@
+"""Add queue and tenant columns to outbox messages for fair-share publishing
+
+Revision ID: 010_outbox_scheduling
+Revises: 009_outbox_messages
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '010_outbox_scheduling'
+down_revision: Union[str, None] = '009_outbox_messages'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Messages written before priority routing go to the bulk queue
+    op.add_column(
+        'outbox_messages',
+        sa.Column('queue', sa.String(length=255), nullable=False, server_default='transcriptions.bulk')
+    )
+    op.alter_column('outbox_messages', 'queue', server_default=None)
+    op.add_column('outbox_messages', sa.Column('user_id', sa.Integer(), nullable=True))
+    op.create_index(
+        'ix_outbox_messages_queue_user_id_id',
+        'outbox_messages',
+        ['queue', 'user_id', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_messages_queue_user_id_id', table_name='outbox_messages')
+    op.drop_column('outbox_messages', 'user_id')
+    op.drop_column('outbox_messages', 'queue')
@@ -0,0 +1,31 @@
+"""Add probed audio properties to transcription jobs
+
+Revision ID: 011_audio_probe
+Revises: 010_outbox_scheduling
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '011_audio_probe'
+down_revision: Union[str, None] = '010_outbox_scheduling'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transcription_jobs', sa.Column('audio_format', sa.String(length=10), nullable=True))
+    op.add_column('transcription_jobs', sa.Column('audio_duration', sa.Float(), nullable=True))
+    op.add_column('transcription_jobs', sa.Column('sample_rate', sa.Integer(), nullable=True))
+    op.add_column('transcription_jobs', sa.Column('channels', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('transcription_jobs', 'channels')
+    op.drop_column('transcription_jobs', 'sample_rate')
+    op.drop_column('transcription_jobs', 'audio_duration')
+    op.drop_column('transcription_jobs', 'audio_format')
@@ -0,0 +1,25 @@
+"""Add chunk count to transcription jobs
+
+Revision ID: 012_chunked_transcription
+Revises: 011_audio_probe
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '012_chunked_transcription'
+down_revision: Union[str, None] = '011_audio_probe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transcription_jobs', sa.Column('chunk_count', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('transcription_jobs', 'chunk_count')
@@ -0,0 +1,29 @@
+"""Store the S3 object key of transcription jobs instead of a presigned URL
+
+Revision ID: 013_s3_object_key
+Revises: 012_chunked_transcription
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '013_s3_object_key'
+down_revision: Union[str, None] = '012_chunked_transcription'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transcription_jobs', sa.Column('s3_object_key', sa.Text(), nullable=True))
+    # Jobs created before this keep their presigned URL
+    op.alter_column('transcription_jobs', 's3_url', existing_type=sa.Text(), nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("UPDATE transcription_jobs SET s3_url = s3_object_key WHERE s3_url IS NULL")
+    op.alter_column('transcription_jobs', 's3_url', existing_type=sa.Text(), nullable=False)
+    op.drop_column('transcription_jobs', 's3_object_key')
@@ -1,29 +1,33 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core import security
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.password_hashing import password_hasher
 from app.models.user import User
 from app.schemas.auth import Token, UserCreate, User as UserSchema
 
 router = APIRouter()
 
 @router.post("/register", response_model=UserSchema)
-def create_user(
+async def create_user(
     user_in: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check if user already exists
-    user = db.query(User).filter(User.username == user_in.username).first()
+    result = await db.execute(select(User).where(User.username == user_in.username))
+    user = result.scalars().first()
     if user:
         raise HTTPException(
             status_code=400,
             detail="Username already registered"
         )
     
-    user = db.query(User).filter(User.email == user_in.email).first()
+    result = await db.execute(select(User).where(User.email == user_in.email))
+    user = result.scalars().first()
     if user:
         raise HTTPException(
             status_code=400,
@@ -31,7 +35,7 @@ def create_user(
         )
     
     # Create new user
-    hashed_password = User.hash_password(user_in.password)
+    hashed_password = await password_hasher.hash(user_in.password)
     user = User(
         username=user_in.username,
         email=user_in.email,
@@ -39,27 +43,43 @@ def create_user(
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     return user
 
 @router.post("/login", response_model=Token)
-def login_for_access_token(
-    db: Session = Depends(get_db),
+async def login_for_access_token(
+    db: AsyncSession = Depends(get_async_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not user.verify_password(form_data.password):
+    result = await db.execute(select(User).where(User.username == form_data.username))
+    user = result.scalars().first()
+    verified = False
+    if user:
+        verified, new_hash = await password_hasher.verify_and_update(
+            form_data.password, user.hashed_password
+        )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Transparently rehash when the configured work factor has changed
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
+    # Embed id, roles and token version when stateless claims are enabled
+    claims = None
+    if settings.JWT_STATELESS_CLAIMS:
+        claims = security.create_principal_claims(user, user.token_version)
+    
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        subject=user.username, expires_delta=access_token_expires
+        subject=user.username, expires_delta=access_token_expires, claims=claims
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,17 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Header, Query, Response, status
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Union
+from app.core.celery_app import INTERACTIVE_QUEUE, BULK_QUEUE
+from app.core.config import settings
+from app.core.database import get_async_db
 from app.core.security import get_current_active_user
 from app.models.user import User
-from app.models.transcription import TranscriptionJob, JobStatus
+from app.models.outbox import OutboxMessage
+from app.models.transcription import (
+    TranscriptionJob,
+    TranscriptionResult,
+    JobStatus,
+    SEARCH_CONFIG,
+    DEDUP_LOCK_QUERY,
+    dedup_lock_key
+)
 from app.schemas.transcription import (
     TranscriptionJobResponse,
+    TranscriptionJobSummary,
+    TranscriptionJobListItem,
     JobSubmissionResponse,
-    TranscriptionJobCreate
+    TranscriptionJobCreate,
+    TranscriptionOptions,
+    BatchObject,
+    BatchCreateRequest,
+    BatchSubmissionResponse,
+    BatchItemResult,
+    UploadCreateRequest,
+    UploadCreateResponse,
+    UploadCompleteRequest,
+    TranscriptSearchResult
 )
-from app.services.s3_service import s3_service
+from app.services.s3_service import get_s3_service
+from app.utils.audio_probe import AudioInfo, AudioProbeError, probe_audio, probe_file
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.segment_codec import decode_segments, segments_in_window
 from app.workers.transcription_worker import process_transcription_job
+import asyncio
+import json
+import math
+import re
 import uuid
 import os
 import logging
@@ -20,6 +54,318 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+ALLOWED_CONTENT_TYPES = ['audio/mpeg', 'audio/wav', 'audio/mp3', 'audio/m4a', 'audio/ogg']
+MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+# Segment lists served by the segments endpoint, and the column each is stored in
+SEGMENT_KINDS = {
+    "diarization": TranscriptionResult.speaker_segments,
+    "sentiment": TranscriptionResult.sentiment_segments
+}
+# Highlighting used for search snippets; matched words are read back out of it
+HEADLINE_START, HEADLINE_STOP = "<b>", "</b>"
+HEADLINE_OPTIONS = f"StartSel={HEADLINE_START}, StopSel={HEADLINE_STOP}, MaxFragments=2, MaxWords=25, MinWords=8"
+MAX_SEGMENT_HITS = 5
+# Result fields that job listings only return when asked for with include=,
+# and the transcription_results column each one is read from
+INCLUDABLE_RESULT_FIELDS = {
+    "transcript_text": TranscriptionResult.transcript_text,
+    "speaker_diarization_results": TranscriptionResult.speaker_segments,
+    "sentiment_analysis_results": TranscriptionResult.sentiment_segments,
+    "summary": TranscriptionResult.summary
+}
+
+def _validate_content_type(content_type: str) -> None:
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Allowed types: {', '.join(ALLOWED_CONTENT_TYPES)}"
+        )
+
+def _validate_file_size(file_size: int) -> None:
+    if file_size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail="File size too large. Maximum allowed size is 100MB"
+        )
+
+def _validate_audio(probe: Callable[..., AudioInfo], *args) -> AudioInfo:
+    """
+    Read the audio's container headers with probe and reject files that are
+    corrupt or outside the allowed durations. Blocking, run it in the threadpool
+    """
+    try:
+        audio = probe(*args)
+    except AudioProbeError as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable audio file: {str(e)}")
+    if audio.duration < settings.AUDIO_MIN_DURATION:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Audio too short. Minimum duration is {settings.AUDIO_MIN_DURATION:g} seconds"
+        )
+    if audio.duration > settings.AUDIO_MAX_DURATION:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Audio too long. Maximum duration is {settings.AUDIO_MAX_DURATION:g} seconds"
+        )
+    return audio
+
+async def _probe_object(object_name: str, size: int) -> AudioInfo:
+    """Validate an object already in S3, reading only its headers with range requests"""
+    return await run_in_threadpool(
+        _validate_audio, probe_audio, partial(get_s3_service().read_range, object_name), size
+    )
+
+async def _verify_uploaded_object(object_name: str) -> AudioInfo:
+    """
+    Check the type, size and audio of an object a client uploaded directly.
+    Objects that fail are deleted, since no job will ever reference them
+    """
+    metadata = await run_in_threadpool(get_s3_service().head_object, object_name)
+    if metadata is None:
+        raise HTTPException(status_code=400, detail="Uploaded object not found")
+    
+    try:
+        _validate_content_type(metadata.get('ContentType'))
+        _validate_file_size(metadata['ContentLength'])
+        return await _probe_object(object_name, metadata['ContentLength'])
+    except HTTPException:
+        await run_in_threadpool(get_s3_service().delete_object, object_name)
+        raise
+
+def _object_name_for(user: User, filename: str) -> str:
+    file_extension = os.path.splitext(filename)[1]
+    return f"audio/{user.id}/{uuid.uuid4()}{file_extension}"
+
+class UploadedAudio(NamedTuple):
+    filename: str
+    object_name: str
+    content_sha256: Optional[str] = None
+    audio: Optional[AudioInfo] = None
+
+def _dedup_lock_key(user: User, content_sha256: str, options: TranscriptionOptions) -> int:
+    return dedup_lock_key(
+        user.id,
+        content_sha256,
+        options.enable_speaker_diarization,
+        options.enable_sentiment_analysis,
+        options.enable_summarization
+    )
+
+async def _find_reusable_jobs(
+    db: AsyncSession,
+    user: User,
+    content_hashes: Set[str],
+    options: TranscriptionOptions
+) -> Dict[str, TranscriptionJob]:
+    """
+    Completed or in-flight job per audio hash with the same options, preferring completed ones.
+    Takes transaction-level advisory locks first, so concurrent uploads of the
+    same content, and workers finishing the job they would follow, wait until
+    the caller commits.
+    """
+    if not content_hashes:
+        return {}
+    
+    keys = sorted(_dedup_lock_key(user, content_sha256, options) for content_sha256 in content_hashes)
+    await db.execute(DEDUP_LOCK_QUERY, {"keys": keys})
+    
+    # Statuses are read under the locks, never from jobs the session loaded earlier
+    result = await db.execute(
+        select(TranscriptionJob)
+        .options(load_only(
+            TranscriptionJob.id,
+            TranscriptionJob.status,
+            TranscriptionJob.content_sha256,
+            TranscriptionJob.confidence_score
+        ))
+        .execution_options(populate_existing=True)
+        .where(
+            TranscriptionJob.user_id == user.id,
+            TranscriptionJob.content_sha256.in_(content_hashes),
+            TranscriptionJob.enable_speaker_diarization == options.enable_speaker_diarization,
+            TranscriptionJob.enable_sentiment_analysis == options.enable_sentiment_analysis,
+            TranscriptionJob.enable_summarization == options.enable_summarization,
+            TranscriptionJob.duplicate_of_job_id.is_(None),
+            TranscriptionJob.status.in_([
+                JobStatus.COMPLETED.value,
+                JobStatus.PROCESSING.value,
+                JobStatus.PENDING.value
+            ])
+        )
+        .order_by(
+            (TranscriptionJob.status == JobStatus.COMPLETED.value).desc(),
+            TranscriptionJob.created_at.desc()
+        )
+    )
+    
+    reusable = {}
+    for job in result.scalars():
+        reusable.setdefault(job.content_sha256, job)
+    return reusable
+
+async def _create_transcription_jobs(
+    db: AsyncSession,
+    user: User,
+    uploads: List[UploadedAudio],
+    options: TranscriptionOptions,
+    queue: str = BULK_QUEUE
+) -> List[TranscriptionJob]:
+    """
+    Create job records for objects already in S3 in one transaction, together
+    with outbox messages that queue the ones that need transcribing on queue.
+    Audio already transcribed with the same options gets a copy of that result.
+    Audio still being transcribed, by an earlier job or earlier in the batch,
+    follows that job and is completed by the worker alongside it.
+    """
+    reusable = await _find_reusable_jobs(
+        db, user, {upload.content_sha256 for upload in uploads if upload.content_sha256}, options
+    )
+    completed_ids = [job.id for job in reusable.values() if job.status == JobStatus.COMPLETED.value]
+    reusable_results = {}
+    if completed_ids:
+        result = await db.execute(
+            select(TranscriptionResult).where(TranscriptionResult.job_id.in_(completed_ids))
+        )
+        reusable_results = {transcription_result.job_id: transcription_result for transcription_result in result.scalars()}
+    
+    now = datetime.utcnow()
+    jobs, batch_duplicates, batch_originals = [], [], {}
+    for upload in uploads:
+        job = TranscriptionJob(
+            user_id=user.id,
+            filename=upload.filename,
+            s3_object_key=upload.object_name,
+            status=JobStatus.PENDING.value,
+            content_sha256=upload.content_sha256,
+            enable_speaker_diarization=options.enable_speaker_diarization,
+            enable_sentiment_analysis=options.enable_sentiment_analysis,
+            enable_summarization=options.enable_summarization
+        )
+        if upload.audio is not None:
+            job.audio_format, job.audio_duration, job.sample_rate, job.channels = upload.audio
+        
+        original = reusable.get(upload.content_sha256)
+        if original is not None:
+            job.duplicate_of_job_id = original.id
+            if original.status == JobStatus.COMPLETED.value:
+                job.status = JobStatus.COMPLETED.value
+                job.confidence_score = original.confidence_score
+                job.processing_time = 0.0
+                job.started_at = job.completed_at = now
+        elif upload.content_sha256 in batch_originals:
+            batch_duplicates.append((job, batch_originals[upload.content_sha256]))
+        else:
+            # Task id is chosen up front so the job is written once, with its outbox message
+            job.celery_task_id = str(uuid.uuid4())
+            if upload.content_sha256:
+                batch_originals[upload.content_sha256] = job
+        jobs.append(job)
+    
+    # Flushed as one multi-row INSERT ... RETURNING
+    db.add_all(jobs)
+    await db.flush()
+    
+    for job, original in batch_duplicates:
+        job.duplicate_of_job_id = original.id
+    db.add_all([
+        reusable_results[job.duplicate_of_job_id].copy_for(job.id)
+        for job in jobs
+        if job.status == JobStatus.COMPLETED.value and job.duplicate_of_job_id in reusable_results
+    ])
+    # Published by the outbox relay once this transaction commits
+    queued = [job for job in jobs if job.celery_task_id]
+    db.add_all([
+        OutboxMessage.for_task(
+            process_transcription_job, job.id, queue=queue, task_id=job.celery_task_id, user_id=user.id
+        )
+        for job in queued
+    ])
+    await db.commit()
+    
+    logger.info(f"Created {len(jobs)} transcription jobs for user {user.id}, {len(queued)} queued")
+    return jobs
+
+async def _create_transcription_job(
+    db: AsyncSession,
+    user: User,
+    filename: str,
+    object_name: str,
+    options: TranscriptionOptions,
+    content_sha256: Optional[str] = None,
+    audio: Optional[AudioInfo] = None
+) -> TranscriptionJob:
+    """
+    Create and queue the job for a single object already in S3. Short audio
+    goes to the interactive queue, ahead of bulk work
+    """
+    queue = BULK_QUEUE
+    if audio is not None and audio.duration <= settings.INTERACTIVE_MAX_DURATION:
+        queue = INTERACTIVE_QUEUE
+    jobs = await _create_transcription_jobs(
+        db, user, [UploadedAudio(filename, object_name, content_sha256, audio)], options, queue
+    )
+    return jobs[0]
+
+def _submission_response(job: TranscriptionJob, message: str) -> JobSubmissionResponse:
+    """Submission response with a rough completion estimate from the audio duration"""
+    estimate = None
+    if job.status == JobStatus.COMPLETED.value:
+        estimate = 0.0
+    elif job.audio_duration is not None:
+        estimate = round(settings.ETA_BASE_SECONDS + job.audio_duration * settings.ETA_PROCESSING_RATIO)
+    return JobSubmissionResponse(
+        job_id=job.id,
+        message=message,
+        status=JobStatus(job.status),
+        audio_duration=job.audio_duration,
+        estimated_completion_seconds=estimate
+    )
+
+def _validate_batch_size(item_count: int) -> None:
+    if item_count == 0:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if item_count > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large. Maximum allowed items is {settings.BATCH_MAX_ITEMS}"
+        )
+
+async def _submit_batch(
+    db: AsyncSession,
+    user: User,
+    filenames: List[str],
+    outcomes: List[Union[UploadedAudio, BaseException]],
+    options: TranscriptionOptions
+) -> BatchSubmissionResponse:
+    """Create jobs for the items that were accepted and report every item in request order"""
+    accepted = [outcome for outcome in outcomes if isinstance(outcome, UploadedAudio)]
+    try:
+        jobs = iter(await _create_transcription_jobs(db, user, accepted, options) if accepted else [])
+    except Exception as e:
+        logger.error(f"Failed to create batch jobs: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    items, redundant_objects = [], []
+    for filename, outcome in zip(filenames, outcomes):
+        if isinstance(outcome, UploadedAudio):
+            job = next(jobs)
+            items.append(BatchItemResult(filename=filename, job_id=job.id, status=JobStatus(job.status)))
+            # A copied result is all the job needs, the audio is already stored
+            if job.duplicate_of_job_id and job.status == JobStatus.COMPLETED.value and outcome.content_sha256:
+                redundant_objects.append(outcome.object_name)
+        else:
+            error = outcome.detail if isinstance(outcome, HTTPException) else str(outcome)
+            items.append(BatchItemResult(filename=filename, error=error))
+    
+    for object_name in redundant_objects:
+        await run_in_threadpool(get_s3_service().delete_object, object_name)
+    
+    return BatchSubmissionResponse(
+        submitted=len(accepted),
+        failed=len(outcomes) - len(accepted),
+        items=items
+    )
+
 @router.post("/upload", response_model=JobSubmissionResponse)
 async def upload_audio_file(
     file: UploadFile = File(...),
@@ -27,72 +373,57 @@ async def upload_audio_file(
     enable_sentiment_analysis: bool = True,
     enable_summarization: bool = True,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Upload audio file and create transcription job
+    Upload audio file and create transcription job. The form parser spools files
+    over 1MB to a temporary file first; large files should use POST /uploads
     """
     try:
         # Validate file type
-        allowed_types = ['audio/mpeg', 'audio/wav', 'audio/mp3', 'audio/m4a', 'audio/ogg']
-        if file.content_type not in allowed_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file type. Allowed types: {', '.join(allowed_types)}"
-            )
+        _validate_content_type(file.content_type)
         
         # Validate file size (max 100MB)
-        max_size = 100 * 1024 * 1024  # 100MB
-        file_size = 0
         file.file.seek(0, 2)  # Seek to end
         file_size = file.file.tell()
         file.file.seek(0)  # Seek back to beginning
+        _validate_file_size(file_size)
         
-        if file_size > max_size:
-            raise HTTPException(
-                status_code=400,
-                detail="File size too large. Maximum allowed size is 100MB"
-            )
+        # Reject corrupt or unusable audio before paying to store it
+        audio = await run_in_threadpool(_validate_audio, probe_file, file.file, file_size)
         
         # Generate unique S3 object name
-        file_extension = os.path.splitext(file.filename)[1]
-        object_name = f"audio/{current_user.id}/{uuid.uuid4()}{file_extension}"
+        object_name = _object_name_for(current_user, file.filename)
         
-        # Upload to S3
-        s3_url = await s3_service.upload_file(file, object_name)
-
-        # Generate presigned URL for the uploaded file
-        presigned_url = s3_service.generate_presigned_url(object_name)
+        # Stream to S3
+        upload = await get_s3_service().upload_file(file, object_name)
+        logger.info(f"Stored {object_name} ({upload['size']} bytes, sha256 {upload['sha256']})")
         
-        # Create job record
-        job = TranscriptionJob(
-            user_id=current_user.id,
-            filename=file.filename,
-            s3_url=presigned_url,
-            status=JobStatus.PENDING.value,
-            enable_speaker_diarization=enable_speaker_diarization,
-            enable_sentiment_analysis=enable_sentiment_analysis,
-            enable_summarization=enable_summarization
+        job = await _create_transcription_job(
+            db,
+            current_user,
+            file.filename,
+            object_name,
+            TranscriptionJobCreate(
+                filename=file.filename,
+                enable_speaker_diarization=enable_speaker_diarization,
+                enable_sentiment_analysis=enable_sentiment_analysis,
+                enable_summarization=enable_summarization
+            ),
+            content_sha256=upload["sha256"],
+            audio=audio
         )
         
-        db.add(job)
-        db.commit()
-        db.refresh(job)
-        
-        # Queue Celery task
-        task = process_transcription_job.delay(job.id)
-        
-        # Update job with Celery task ID
-        job.celery_task_id = task.id
-        db.commit()
+        if job.duplicate_of_job_id is None:
+            message = "File uploaded successfully. Transcription job started."
+        elif job.status == JobStatus.COMPLETED.value:
+            # The copied result is all this job needs, the audio is already stored
+            await run_in_threadpool(get_s3_service().delete_object, object_name)
+            message = "Identical audio was already transcribed. Results copied."
+        else:
+            message = "Identical audio is already being transcribed. Results will be shared."
         
-        logger.info(f"Created transcription job {job.id} for user {current_user.id}")
-        
-        return JobSubmissionResponse(
-            job_id=job.id,
-            message="File uploaded successfully. Transcription job started.",
-            status=JobStatus.PENDING
-        )
+        return _submission_response(job, message)
 
     except HTTPException as http_exc:
         # Re-raise HTTPExceptions
@@ -101,18 +432,260 @@ async def upload_audio_file(
         logger.error(f"Failed to upload file: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/uploads", response_model=UploadCreateResponse)
+async def create_upload(
+    upload_in: UploadCreateRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Create a direct-to-S3 upload: a presigned PUT URL for small files,
+    or presigned part URLs of a multipart upload for large files
+    """
+    _validate_content_type(upload_in.content_type)
+    _validate_file_size(upload_in.file_size)
+    if upload_in.file_size <= 0:
+        raise HTTPException(status_code=400, detail="File size must be greater than zero")
+    
+    object_name = _object_name_for(current_user, upload_in.filename)
+    expiration = settings.S3_PRESIGNED_UPLOAD_EXPIRATION
+    part_size = settings.S3_MULTIPART_CHUNK_SIZE
+    
+    try:
+        if upload_in.file_size <= part_size:
+            upload_url = get_s3_service().generate_presigned_upload_url(
+                object_name, upload_in.content_type, expiration
+            )
+            return UploadCreateResponse(
+                object_key=object_name,
+                expires_in=expiration,
+                upload_url=upload_url
+            )
+        
+        multipart = await run_in_threadpool(
+            get_s3_service().create_presigned_multipart_upload,
+            object_name,
+            upload_in.content_type,
+            math.ceil(upload_in.file_size / part_size),
+            expiration
+        )
+        return UploadCreateResponse(
+            object_key=object_name,
+            expires_in=expiration,
+            upload_id=multipart["upload_id"],
+            part_size=part_size,
+            part_urls=multipart["part_urls"]
+        )
+    
+    except Exception as e:
+        logger.error(f"Failed to create upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/uploads/complete", response_model=JobSubmissionResponse)
+async def complete_upload(
+    upload_in: UploadCompleteRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Verify a direct-to-S3 upload and create its transcription job
+    """
+    # Clients may only complete uploads into their own prefix
+    if not upload_in.object_key.startswith(f"audio/{current_user.id}/"):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    try:
+        if upload_in.upload_id:
+            if not upload_in.parts:
+                raise HTTPException(status_code=400, detail="Multipart uploads require the uploaded parts")
+            await run_in_threadpool(
+                get_s3_service().complete_multipart_upload,
+                upload_in.object_key,
+                upload_in.upload_id,
+                [part.model_dump() for part in upload_in.parts]
+            )
+        
+        audio = await _verify_uploaded_object(upload_in.object_key)
+        
+        job = await _create_transcription_job(
+            db,
+            current_user,
+            upload_in.filename,
+            upload_in.object_key,
+            upload_in,
+            audio=audio
+        )
+        
+        return _submission_response(job, "Upload verified successfully. Transcription job started.")
+    
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        logger.error(f"Failed to complete upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch/upload", response_model=BatchSubmissionResponse)
+async def batch_upload_audio_files(
+    files: List[UploadFile] = File(...),
+    enable_speaker_diarization: bool = True,
+    enable_sentiment_analysis: bool = True,
+    enable_summarization: bool = True,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Upload many audio files and create their transcription jobs in one request.
+    Invalid files are reported per item and do not fail the batch. Like
+    POST /upload, files over 1MB are spooled to temporary files first.
+    """
+    _validate_batch_size(len(files))
+    semaphore = asyncio.Semaphore(settings.BATCH_UPLOAD_CONCURRENCY)
+    
+    async def store(file: UploadFile) -> UploadedAudio:
+        _validate_content_type(file.content_type)
+        file.file.seek(0, 2)
+        file_size = file.file.tell()
+        file.file.seek(0)
+        _validate_file_size(file_size)
+        audio = await run_in_threadpool(_validate_audio, probe_file, file.file, file_size)
+        
+        object_name = _object_name_for(current_user, file.filename)
+        async with semaphore:
+            upload = await get_s3_service().upload_file(file, object_name)
+        return UploadedAudio(file.filename, object_name, upload["sha256"], audio)
+    
+    outcomes = await asyncio.gather(*(store(file) for file in files), return_exceptions=True)
+    return await _submit_batch(
+        db,
+        current_user,
+        [file.filename for file in files],
+        outcomes,
+        TranscriptionOptions(
+            enable_speaker_diarization=enable_speaker_diarization,
+            enable_sentiment_analysis=enable_sentiment_analysis,
+            enable_summarization=enable_summarization
+        )
+    )
+
+@router.post("/batch", response_model=BatchSubmissionResponse)
+async def batch_create_transcription_jobs(
+    batch_in: BatchCreateRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create transcription jobs for many already uploaded S3 objects in one request.
+    Invalid objects are reported per item and do not fail the batch.
+    """
+    _validate_batch_size(len(batch_in.objects))
+    semaphore = asyncio.Semaphore(settings.BATCH_UPLOAD_CONCURRENCY)
+    
+    async def verify(batch_object: BatchObject) -> UploadedAudio:
+        # Clients may only submit objects from their own prefix
+        if not batch_object.object_key.startswith(f"audio/{current_user.id}/"):
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        async with semaphore:
+            audio = await _verify_uploaded_object(batch_object.object_key)
+        return UploadedAudio(batch_object.filename, batch_object.object_key, audio=audio)
+    
+    outcomes = await asyncio.gather(*(verify(batch_object) for batch_object in batch_in.objects), return_exceptions=True)
+    return await _submit_batch(
+        db,
+        current_user,
+        [batch_object.filename for batch_object in batch_in.objects],
+        outcomes,
+        batch_in
+    )
+
+def _segment_hits(speaker_segments: Optional[bytes], snippet: str) -> List[dict]:
+    """Diarization segments containing any of the words highlighted in the snippet"""
+    words = {
+        word.lower()
+        for word in re.findall(f"{re.escape(HEADLINE_START)}(.*?){re.escape(HEADLINE_STOP)}", snippet)
+    }
+    if not words or speaker_segments is None:
+        return []
+    
+    pattern = re.compile(r"\b(" + "|".join(re.escape(word) for word in words) + r")\b", re.IGNORECASE)
+    hits = []
+    for segment in decode_segments(speaker_segments):
+        if pattern.search(segment.get("text") or ""):
+            hits.append({
+                "start": segment.get("start"),
+                "end": segment.get("end"),
+                "speaker": segment.get("speaker"),
+                "text": segment["text"]
+            })
+            if len(hits) == MAX_SEGMENT_HITS:
+                break
+    return hits
+
+@router.get("/search", response_model=List[TranscriptSearchResult])
+async def search_transcriptions(
+    q: str = Query(..., min_length=1, max_length=500, description="Web search syntax: words, \"phrases\", OR, -exclude"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Search the current user's transcripts, best matches first
+    """
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    rank = func.ts_rank(TranscriptionResult.search_vector, ts_query)
+    
+    # Rank on the GIN index first, so snippets are only built for the returned rows
+    ranked = (
+        select(TranscriptionResult.job_id, rank.label("rank"))
+        .join(TranscriptionJob, TranscriptionJob.id == TranscriptionResult.job_id)
+        .where(
+            TranscriptionJob.user_id == current_user.id,
+            TranscriptionResult.search_vector.bool_op("@@")(ts_query)
+        )
+        .order_by(rank.desc(), TranscriptionResult.job_id)
+        .limit(limit)
+        .subquery()
+    )
+    query = (
+        select(
+            ranked.c.job_id,
+            ranked.c.rank,
+            TranscriptionJob.filename,
+            TranscriptionJob.created_at,
+            func.ts_headline(
+                SEARCH_CONFIG, TranscriptionResult.transcript_text, ts_query, HEADLINE_OPTIONS
+            ).label("snippet"),
+            TranscriptionResult.speaker_segments
+        )
+        .select_from(ranked)
+        .join(TranscriptionJob, TranscriptionJob.id == ranked.c.job_id)
+        .join(TranscriptionResult, TranscriptionResult.job_id == ranked.c.job_id)
+        .order_by(ranked.c.rank.desc(), ranked.c.job_id)
+    )
+    rows = (await db.execute(query)).all()
+    
+    results = []
+    for row in rows:
+        segments = await run_in_threadpool(_segment_hits, row.speaker_segments, row.snippet)
+        results.append({
+            "job_id": row.job_id,
+            "filename": row.filename,
+            "created_at": row.created_at,
+            "rank": row.rank,
+            "snippet": row.snippet,
+            "segments": segments
+        })
+    return results
+
 @router.get("/{job_id}", response_model=TranscriptionJobResponse)
-def get_transcription_job(
+async def get_transcription_job(
     job_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get transcription job status and results
     """
-    job = db.query(TranscriptionJob).filter(
-        TranscriptionJob.id == job_id
-    ).first()
+    job = await db.get(TranscriptionJob, job_id, options=[joinedload(TranscriptionJob.result)])
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -123,37 +696,163 @@ def get_transcription_job(
     
     return job
 
-@router.get("/", response_model=List[TranscriptionJobResponse])
-def get_user_transcription_jobs(
-    skip: int = 0,
-    limit: int = 100,
+@router.get(
+    "/",
+    response_model=List[TranscriptionJobListItem],
+    response_model_exclude_unset=True
+)
+async def get_user_transcription_jobs(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
+    include: Optional[str] = Query(
+        None, description=f"Comma-separated result fields to add: {', '.join(INCLUDABLE_RESULT_FIELDS)}"
+    ),
+    status_filter: Optional[JobStatus] = Query(None, alias="status"),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Get user's transcription jobs
+    Get user's transcription jobs, newest first.
+    Pass the X-Next-Cursor response header back as `cursor` for the next page.
+    Only job metadata is returned unless result fields are requested with `include`.
     """
-    query = db.query(TranscriptionJob)
+    included_fields = [field.strip() for field in include.split(",") if field.strip()] if include else []
+    unknown_fields = set(included_fields) - set(INCLUDABLE_RESULT_FIELDS)
+    if unknown_fields:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include fields: {', '.join(sorted(unknown_fields))}"
+        )
+    
+    # Load only the job columns that will be returned, and results only when asked for
+    columns = list(TranscriptionJobSummary.model_fields)
+    query = select(TranscriptionJob).options(
+        load_only(*(getattr(TranscriptionJob, column) for column in columns))
+    )
+    if included_fields:
+        query = query.options(
+            selectinload(TranscriptionJob.result).load_only(
+                *(INCLUDABLE_RESULT_FIELDS[field] for field in included_fields)
+            )
+        )
+    columns += included_fields
     
     # Non-superusers can only see their own jobs
     if not current_user.is_superuser:
-        query = query.filter(TranscriptionJob.user_id == current_user.id)
+        query = query.where(TranscriptionJob.user_id == current_user.id)
     
-    jobs = query.offset(skip).limit(limit).all()
-    return jobs
+    if status_filter is not None:
+        query = query.where(TranscriptionJob.status == status_filter.value)
+    if created_after is not None:
+        query = query.where(TranscriptionJob.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(TranscriptionJob.created_at < created_before)
+    
+    # Keyset pagination on (created_at DESC, id), served by the matching indexes
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(or_(
+            TranscriptionJob.created_at < cursor_created_at,
+            and_(
+                TranscriptionJob.created_at == cursor_created_at,
+                TranscriptionJob.id > cursor_id
+            )
+        ))
+    
+    query = query.order_by(
+        TranscriptionJob.created_at.desc(), TranscriptionJob.id
+    ).limit(limit + 1)
+    
+    result = await db.execute(query)
+    jobs = result.scalars().all()
+    
+    # One extra row tells whether another page exists
+    if len(jobs) > limit:
+        jobs = jobs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(jobs[-1].created_at, jobs[-1].id)
+    
+    return [
+        TranscriptionJobListItem(**{column: getattr(job, column) for column in columns})
+        for job in jobs
+    ]
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # Weak comparison, as If-None-Match requires
+    return "*" in candidates or etag in [candidate.removeprefix("W/") for candidate in candidates]
+
+@router.get("/{job_id}/segments")
+async def stream_transcription_segments(
+    job_id: int,
+    kind: str = Query("diarization", pattern="^(diarization|sentiment)$"),
+    start_ms: Optional[int] = Query(None, ge=0),
+    end_ms: Optional[int] = Query(None, ge=0),
+    speakers: Optional[str] = Query(None, description="Comma-separated speaker labels, diarization only"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stream transcript segments as NDJSON, optionally limited to a time window
+    and to selected speakers
+    """
+    if start_ms is not None and end_ms is not None and end_ms <= start_ms:
+        raise HTTPException(status_code=400, detail="end_ms must be greater than start_ms")
+    
+    speaker_filter = {speaker.strip() for speaker in speakers.split(",") if speaker.strip()} if speakers else None
+    if speaker_filter and kind != "diarization":
+        raise HTTPException(status_code=400, detail="Speaker filtering is only supported for diarization segments")
+    
+    segments_column = SEGMENT_KINDS[kind]
+    job = await db.get(
+        TranscriptionJob,
+        job_id,
+        options=[
+            load_only(TranscriptionJob.id, TranscriptionJob.user_id),
+            joinedload(TranscriptionJob.result).load_only(segments_column, TranscriptionResult.segments_etag)
+        ]
+    )
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Check if user owns this job or is superuser
+    if job.user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if job.result is None:
+        raise HTTPException(status_code=404, detail="Transcript not available yet")
+    
+    etag = f'"{job.result.segments_etag}"'
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    blob = getattr(job.result, segments_column.key)
+    
+    def ndjson_lines():
+        # Sync generator, so decoding runs in the threadpool rather than the event loop
+        for segment in segments_in_window(blob, start_ms, end_ms):
+            if speaker_filter is None or segment.get("speaker") in speaker_filter:
+                yield json.dumps(segment) + "\n"
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson", headers={"ETag": etag})
 
 @router.delete("/{job_id}")
-def delete_transcription_job(
+async def delete_transcription_job(
     job_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete transcription job
     """
-    job = db.query(TranscriptionJob).filter(
-        TranscriptionJob.id == job_id
-    ).first()
+    job = await db.get(TranscriptionJob, job_id)
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -162,7 +861,41 @@ def delete_transcription_job(
     if job.user_id != current_user.id and not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    db.delete(job)
-    db.commit()
+    # Uploads cannot start following the job, nor the worker finish it, until this commits
+    if job.content_sha256:
+        await db.execute(DEDUP_LOCK_QUERY, {"keys": [job.dedup_lock_key()]})
+        await db.refresh(job)
+    
+    # Jobs still waiting on this one's transcript need a transcription of their own
+    followers = []
+    if job.status in [JobStatus.PENDING.value, JobStatus.PROCESSING.value]:
+        result = await db.execute(
+            select(TranscriptionJob)
+            .where(
+                TranscriptionJob.duplicate_of_job_id == job.id,
+                TranscriptionJob.status == JobStatus.PENDING.value
+            )
+            .order_by(TranscriptionJob.id)
+        )
+        followers = result.scalars().all()
+    
+    await db.delete(job)
+    if followers:
+        successor = followers[0]
+        successor.duplicate_of_job_id = None
+        successor.celery_task_id = str(uuid.uuid4())
+        for follower in followers[1:]:
+            follower.duplicate_of_job_id = successor.id
+        db.add(OutboxMessage.for_task(
+            process_transcription_job,
+            successor.id,
+            queue=BULK_QUEUE,
+            task_id=successor.celery_task_id,
+            user_id=successor.user_id
+        ))
+    await db.commit()
+    
+    if followers:
+        logger.info(f"Requeued job {successor.id} for {len(followers)} duplicates of deleted job {job_id}")
     
     return {"message": "Job deleted successfully"}
@@ -1,8 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from app.core.database import get_db
-from app.core.security import get_current_active_user, get_current_user
+from app.core.database import get_async_db
+from app.core.password_hashing import password_hasher
+from app.core.security import (
+    get_current_active_user,
+    get_current_active_user_profile,
+    get_current_user,
+    invalidate_principal,
+    revoke_tokens
+)
 from app.models.user import User
 from app.schemas.auth import User as UserSchema, UserCreate
 from app.schemas.user import UserUpdate, UserResponse
@@ -14,7 +22,7 @@ router = APIRouter()
 
 @router.get("/me", response_model=UserSchema)
 async def read_user_me(
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user_profile)
 ):
     """
     Get current user profile
@@ -25,18 +33,23 @@ async def read_user_me(
 async def update_user_me(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update current user profile
     """
+    # The authenticated user may be a cached or token-derived principal, so load it into this session
+    current_user = await db.get(User, current_user.id)
+    previous_username = current_user.username
+    
     # Update user fields
     if user_update.email is not None:
         # Check if email is already taken by another user
-        existing_user = db.query(User).filter(
+        result = await db.execute(select(User).where(
             User.email == user_update.email,
             User.id != current_user.id
-        ).first()
+        ))
+        existing_user = result.scalars().first()
         if existing_user:
             raise HTTPException(
                 status_code=400,
@@ -46,10 +59,11 @@ async def update_user_me(
     
     if user_update.username is not None:
         # Check if username is already taken by another user
-        existing_user = db.query(User).filter(
+        result = await db.execute(select(User).where(
             User.username == user_update.username,
             User.id != current_user.id
-        ).first()
+        ))
+        existing_user = result.scalars().first()
         if existing_user:
             raise HTTPException(
                 status_code=400,
@@ -58,10 +72,12 @@ async def update_user_me(
         current_user.username = user_update.username
     
     if user_update.password is not None:
-        current_user.hashed_password = User.hash_password(user_update.password)
+        current_user.hashed_password = await password_hasher.hash(user_update.password)
     
-    db.commit()
-    db.refresh(current_user)
+    await revoke_tokens(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    await invalidate_principal(current_user.id, previous_username, current_user.username)
     
     logger.info(f"User {current_user.id} updated their profile")
     return current_user
@@ -71,7 +87,7 @@ async def read_users(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Retrieve users (superuser only)
@@ -82,14 +98,15 @@ async def read_users(
             detail="Not enough permissions"
         )
     
-    users = db.query(User).offset(skip).limit(limit).all()
+    result = await db.execute(select(User).offset(skip).limit(limit))
+    users = result.scalars().all()
     return users
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def read_user(
     user_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific user by ID (superuser only or own profile)
@@ -101,7 +118,7 @@ async def read_user(
             detail="Not enough permissions"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -115,7 +132,7 @@ async def update_user(
     user_id: int,
     user_update: UserUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update a user (superuser only)
@@ -126,20 +143,23 @@ async def update_user(
             detail="Not enough permissions"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=404,
             detail="User not found"
         )
     
+    previous_username = user.username
+    
     # Update user fields
     if user_update.email is not None:
         # Check if email is already taken by another user
-        existing_user = db.query(User).filter(
+        result = await db.execute(select(User).where(
             User.email == user_update.email,
             User.id != user_id
-        ).first()
+        ))
+        existing_user = result.scalars().first()
         if existing_user:
             raise HTTPException(
                 status_code=400,
@@ -149,10 +169,11 @@ async def update_user(
     
     if user_update.username is not None:
         # Check if username is already taken by another user
-        existing_user = db.query(User).filter(
+        result = await db.execute(select(User).where(
             User.username == user_update.username,
             User.id != user_id
-        ).first()
+        ))
+        existing_user = result.scalars().first()
         if existing_user:
             raise HTTPException(
                 status_code=400,
@@ -161,7 +182,7 @@ async def update_user(
         user.username = user_update.username
     
     if user_update.password is not None:
-        user.hashed_password = User.hash_password(user_update.password)
+        user.hashed_password = await password_hasher.hash(user_update.password)
     
     if user_update.is_active is not None:
         user.is_active = user_update.is_active
@@ -169,8 +190,10 @@ async def update_user(
     if user_update.is_superuser is not None:
         user.is_superuser = user_update.is_superuser
     
-    db.commit()
-    db.refresh(user)
+    await revoke_tokens(user)
+    await db.commit()
+    await db.refresh(user)
+    await invalidate_principal(user.id, previous_username, user.username)
     
     logger.info(f"Superuser {current_user.id} updated user {user_id}")
     return user
@@ -179,7 +202,7 @@ async def update_user(
 async def delete_user(
     user_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a user (superuser only)
@@ -196,15 +219,17 @@ async def delete_user(
             detail="Cannot delete yourself"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=404,
             detail="User not found"
         )
     
-    db.delete(user)
-    db.commit()
+    await revoke_tokens(user)
+    await db.delete(user)
+    await db.commit()
+    await invalidate_principal(user.id, user.username)
     
     logger.info(f"Superuser {current_user.id} deleted user {user_id}")
     return {"message": "User deleted successfully"}
@@ -213,7 +238,7 @@ async def delete_user(
 async def activate_user(
     user_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Activate a user (superuser only)
@@ -224,7 +249,7 @@ async def activate_user(
             detail="Not enough permissions"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -232,7 +257,9 @@ async def activate_user(
         )
     
     user.is_active = True
-    db.commit()
+    await revoke_tokens(user)
+    await db.commit()
+    await invalidate_principal(user.id, user.username)
     
     logger.info(f"Superuser {current_user.id} activated user {user_id}")
     return {"message": "User activated successfully"}
@@ -241,7 +268,7 @@ async def activate_user(
 async def deactivate_user(
     user_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Deactivate a user (superuser only)
@@ -258,7 +285,7 @@ async def deactivate_user(
             detail="Cannot deactivate yourself"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -266,7 +293,9 @@ async def deactivate_user(
         )
     
     user.is_active = False
-    db.commit()
+    await revoke_tokens(user)
+    await db.commit()
+    await invalidate_principal(user.id, user.username)
     
     logger.info(f"Superuser {current_user.id} deactivated user {user_id}")
     return {"message": "User deactivated successfully"}
@@ -275,7 +304,7 @@ async def deactivate_user(
 async def make_superuser(
     user_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Grant superuser privileges (superuser only)
@@ -286,7 +315,7 @@ async def make_superuser(
             detail="Not enough permissions"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -294,7 +323,9 @@ async def make_superuser(
         )
     
     user.is_superuser = True
-    db.commit()
+    await revoke_tokens(user)
+    await db.commit()
+    await invalidate_principal(user.id, user.username)
     
     logger.info(f"Superuser {current_user.id} granted superuser privileges to user {user_id}")
     return {"message": "User granted superuser privileges"}
@@ -303,7 +334,7 @@ async def make_superuser(
 async def remove_superuser(
     user_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Remove superuser privileges (superuser only)
@@ -320,7 +351,7 @@ async def remove_superuser(
             detail="Cannot remove superuser privileges from yourself"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -328,7 +359,9 @@ async def remove_superuser(
         )
     
     user.is_superuser = False
-    db.commit()
+    await revoke_tokens(user)
+    await db.commit()
+    await invalidate_principal(user.id, user.username)
     
     logger.info(f"Superuser {current_user.id} removed superuser privileges from user {user_id}")
     return {"message": "Superuser privileges removed"}
\ No newline at end of file
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.database import get_async_db
+from app.core.security import verify_webhook_signature
+from app.models.transcription import TranscriptionJob, JobStatus
+from app.schemas.transcription import TranscriptWebhook
+from app.workers.transcription_worker import finalize_transcription_job
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+FINISHED_STATUSES = {"completed", "error"}
+
+@router.post("/assemblyai")
+async def assemblyai_webhook(
+    payload: TranscriptWebhook,
+    job_id: Optional[int] = Query(None),
+    x_webhook_signature: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Receive transcript completion callbacks from AssemblyAI. The job id comes
+    from the webhook URL, so the signature is checked before touching the database
+    """
+    if job_id is None or not verify_webhook_signature(job_id, x_webhook_signature):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook signature"
+        )
+    
+    result = await db.execute(select(TranscriptionJob).where(
+        TranscriptionJob.id == job_id,
+        TranscriptionJob.provider_transcript_id == payload.transcript_id
+    ))
+    job = result.scalar_one_or_none()
+    
+    if not job:
+        # Transcript id not yet recorded for the job, let the provider retry
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Duplicate deliveries for finished jobs are acknowledged without work
+    if job.status != JobStatus.PROCESSING.value:
+        return {"message": "Job already finalized"}
+    
+    if payload.status not in FINISHED_STATUSES:
+        return {"message": "Transcript not finished"}
+    
+    finalize_transcription_job.delay(job.id)
+    logger.info(f"Received completion callback for job {job.id} ({payload.status})")
+    
+    return {"message": "Job finalization queued"}
@@ -1,5 +1,14 @@
 from celery import Celery
+from celery.signals import worker_process_init
+from billiard.process import current_process
 from app.core.config import settings
+from app.core.database import reset_engine_after_fork
+from app.utils.metrics import start_worker_metrics_server
+from app.utils.process_local import ProcessLocal
+
+# Transcription queues: single small uploads that someone is waiting on, and everything else
+INTERACTIVE_QUEUE = "transcriptions.interactive"
+BULK_QUEUE = "transcriptions.bulk"
 
 # Create Celery instance
 celery_app = Celery(
@@ -17,9 +26,34 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
-    task_annotations={
-        "*": {"rate_limit": "10/s"}
+    task_routes={
+        "app.workers.transcription_worker.process_transcription_job": {"queue": BULK_QUEUE},
+        "app.workers.transcription_worker.transcribe_audio_chunk": {"queue": BULK_QUEUE},
+        "app.workers.transcription_worker.stitch_transcription_chunks": {"queue": BULK_QUEUE},
     },
     worker_prefetch_multiplier=1,
+    # Publishes wait for the broker to confirm, so the outbox relay only
+    # deletes messages RabbitMQ has accepted
+    broker_transport_options={"confirm_publish": True},
     task_acks_late=True,
+    beat_schedule={
+        "sweep-stale-transcription-jobs": {
+            "task": "app.workers.transcription_worker.sweep_stale_transcription_jobs",
+            "schedule": settings.TRANSCRIPT_SWEEP_INTERVAL,
+        },
+    },
 )
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Per-process setup for prefork children"""
+    reset_engine_after_fork()
+    # Clients inherited from the parent share its sockets; build this child's own before the first task
+    ProcessLocal.reset_all()
+    from app.services.s3_service import get_s3_service
+    from app.services.transcription_backend import get_transcription_backend
+    get_s3_service()
+    get_transcription_backend()
+    
+    if settings.WORKER_METRICS_PORT:
+        start_worker_metrics_server(settings.WORKER_METRICS_PORT, current_process().index)
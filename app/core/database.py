@@ -1,17 +1,69 @@
+import time
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.utils.metrics import DB_POOL_CHECKOUT_WAIT, register_pool_metrics
+
+class _CheckoutTimingMixin:
+    """Record how long each checkout waits for a free connection"""
+    metrics_label = None
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.metrics_label).observe(time.perf_counter() - start)
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    metrics_label = "sync"
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+pool_options = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
 
 print("DATABASE_URL:", settings.DATABASE_URL)
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(settings.DATABASE_URL, poolclass=InstrumentedQueuePool, **pool_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the request path, so queries do not block the event loop.
+# Objects stay loaded after commit because async sessions cannot lazy load.
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, **pool_options
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+register_pool_metrics("sync", engine)
+register_pool_metrics("async", async_engine.sync_engine)
+
 Base = declarative_base()
 
+def reset_engine_after_fork() -> None:
+    """
+    Drop connections inherited from the parent process without closing them,
+    so a forked worker never shares a socket with its parent or siblings
+    """
+    engine.dispose(close=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
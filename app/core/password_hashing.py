@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from app.core.config import settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, size-limited thread pool so hashing never
+    blocks the event loop. bcrypt releases the GIL, so threads run in parallel.
+    At most max_pending operations may be running or queued; beyond that
+    callers get a 503 instead of piling up behind a login storm.
+    """
+    
+    def __init__(self, workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._pending = 0
+    
+    async def _run(self, func, *args):
+        if self._pending >= self.max_pending:
+            logger.warning("Password hashing queue is full, rejecting request")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+    
+    async def hash(self, password: str) -> str:
+        return await self._run(User.hash_password, password)
+    
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(User.verify_and_update_password, password, hashed_password)
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
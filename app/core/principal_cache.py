@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+import redis.asyncio as aioredis
+from app.core.config import settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Columns cached for an authenticated user. The password hash is never cached.
+PRINCIPAL_FIELDS = ("id", "username", "email", "is_active", "is_superuser", "created_at", "updated_at")
+DATETIME_FIELDS = ("created_at", "updated_at")
+
+def snapshot_user(user: User) -> Dict[str, Any]:
+    return {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+
+def _encode(snapshot: Dict[str, Any]) -> str:
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in snapshot.items()
+    })
+
+def _decode(raw: str) -> Dict[str, Any]:
+    snapshot = json.loads(raw)
+    for field in DATETIME_FIELDS:
+        if snapshot.get(field):
+            snapshot[field] = datetime.fromisoformat(snapshot[field])
+    return snapshot
+
+class PrincipalCache:
+    """
+    Cache of authenticated users keyed by token subject.
+
+    The first tier is an in-process LRU with a TTL. When Redis is enabled it
+    also serves as a shared second tier, and invalidations are broadcast over
+    pub/sub so every process drops its local copy right away. The local tier
+    is only used while this process is subscribed, so it never misses one.
+    
+    A lookup that read the database before a change committed must not cache
+    what it read after the change was invalidated. Callers take a generation
+    before reading and pass it to set, which skips the write if the subject
+    was invalidated in between.
+    """
+    
+    CHANNEL = "principal-cache:invalidate"
+    
+    # Caches the snapshot only if the subject's generation is still the one read before the lookup
+    SET_IF_GENERATION = """
+    if (redis.call('GET', KEYS[2]) or '') == ARGV[1] then
+        redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+        return 1
+    end
+    return 0
+    """
+    
+    def __init__(self, maxsize: int, ttl: float, redis_url: Optional[str] = None, redis_ttl: int = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.redis_ttl = redis_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._redis = aioredis.Redis.from_url(redis_url, decode_responses=True) if redis_url else None
+        self._set_if_generation = self._redis.register_script(self.SET_IF_GENERATION) if self._redis else None
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = False
+        # Bumped by every invalidation this process makes or hears of
+        self._local_generation = 0
+    
+    @staticmethod
+    def _redis_key(subject: str) -> str:
+        return f"principal:{subject}"
+    
+    @staticmethod
+    def _generation_key(subject: str) -> str:
+        return f"principal-generation:{subject}"
+    
+    def _local_enabled(self) -> bool:
+        return self._redis is None or self._subscribed
+    
+    def _drop_local(self, subjects: Iterable[str]) -> None:
+        self._local_generation += 1
+        for subject in subjects:
+            self._entries.pop(subject, None)
+    
+    def _get_local(self, subject: str) -> Optional[Dict[str, Any]]:
+        if not self._local_enabled():
+            return None
+        entry = self._entries.get(subject)
+        if entry is None:
+            return None
+        expires_at, snapshot = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(subject, None)
+            return None
+        self._entries.move_to_end(subject)
+        return snapshot
+    
+    def _set_local(self, subject: str, snapshot: Dict[str, Any]) -> None:
+        if not self._local_enabled():
+            return
+        self._entries[subject] = (time.monotonic() + self.ttl, snapshot)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    async def get(self, subject: str) -> Optional[User]:
+        """Return a detached User for the subject, or None on a miss"""
+        snapshot = self._get_local(subject)
+        
+        if snapshot is None and self._redis is not None:
+            try:
+                raw = await self._redis.get(self._redis_key(subject))
+            except Exception as e:
+                logger.warning(f"Principal cache lookup in Redis failed: {str(e)}")
+                raw = None
+            if raw is not None:
+                snapshot = _decode(raw)
+                self._set_local(subject, snapshot)
+        
+        if snapshot is None:
+            return None
+        return User(**snapshot)
+    
+    async def generation(self, subject: str) -> Tuple[int, Optional[str]]:
+        """Take before reading the user from the database, and pass to set"""
+        shared = None
+        if self._redis is not None:
+            try:
+                shared = await self._redis.get(self._generation_key(subject)) or ""
+            except Exception as e:
+                logger.warning(f"Principal cache generation lookup in Redis failed: {str(e)}")
+        return self._local_generation, shared
+    
+    async def set(self, subject: str, user: User, generation: Tuple[int, Optional[str]]) -> None:
+        """Cache a user read from the database, unless the subject was invalidated since generation"""
+        local_generation, shared_generation = generation
+        snapshot = snapshot_user(user)
+        if local_generation == self._local_generation:
+            self._set_local(subject, snapshot)
+        
+        # Without a generation from Redis there is no telling whether the read is stale
+        if self._redis is not None and shared_generation is not None:
+            try:
+                await self._set_if_generation(
+                    keys=[self._redis_key(subject), self._generation_key(subject)],
+                    args=[shared_generation, _encode(snapshot), self.redis_ttl]
+                )
+            except Exception as e:
+                logger.warning(f"Principal cache write to Redis failed: {str(e)}")
+    
+    async def invalidate(self, *subjects: str) -> None:
+        """Drop subjects from every tier and tell other processes to do the same"""
+        subjects = [subject for subject in subjects if subject]
+        if not subjects:
+            return
+        self._drop_local(subjects)
+        
+        if self._redis is not None:
+            try:
+                async with self._redis.pipeline(transaction=True) as pipe:
+                    for subject in subjects:
+                        pipe.incr(self._generation_key(subject))
+                        # Outlives any lookup that could still be holding the previous generation
+                        pipe.expire(self._generation_key(subject), self.redis_ttl)
+                    pipe.delete(*(self._redis_key(subject) for subject in subjects))
+                    pipe.publish(self.CHANNEL, json.dumps(subjects))
+                    await pipe.execute()
+            except Exception as e:
+                logger.error(f"Principal cache invalidation in Redis failed: {str(e)}")
+    
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(self.CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        self._subscribed = True
+                    elif message["type"] == "message":
+                        self._drop_local(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Principal cache invalidation listener failed: {str(e)}")
+            finally:
+                # Invalidations may be missed while disconnected, so start from scratch
+                self._subscribed = False
+                self._drop_local(list(self._entries))
+            await asyncio.sleep(1)
+    
+    def start(self) -> None:
+        if self._redis is not None and self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+    
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+    redis_url=settings.REDIS_URL if settings.PRINCIPAL_CACHE_REDIS_ENABLED else None,
+    redis_ttl=settings.PRINCIPAL_CACHE_REDIS_TTL
+)
@@ -0,0 +1,229 @@
+"""
+Fleet-wide limits on calls to a transcription provider, kept in Redis.
+
+Every API call takes a token from a shared token bucket and a slot in a shared
+concurrency semaphore, so the limits hold however many Celery workers are
+running. Both checks run in one Lua script, so acquiring
+costs a single round trip and cannot race between processes.
+
+The bucket rate adapts to the provider: a 429 response halves it and blocks
+every caller until Retry-After has passed, and each successful call adds a
+little back, up to the configured rate. Semaphore slots are leased, so a
+worker that dies mid-call frees its slot when the lease runs out.
+
+When Redis is unavailable calls go through unthrottled rather than failing.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator, Optional
+import redis
+
+logger = logging.getLogger(__name__)
+
+# How long to wait before trying again when every concurrency slot is taken
+SLOT_POLL_MS = 50
+
+# Returns 0 once a token and a slot are taken, otherwise milliseconds to wait
+ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+local max_rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local concurrency, lease_ms = tonumber(ARGV[3]), tonumber(ARGV[4])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'rate', 'blocked_until')
+local blocked_until = tonumber(state[4]) or 0
+if blocked_until > now then
+    return blocked_until - now
+end
+
+local rate = tonumber(state[3]) or max_rate
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate / 1000)
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if redis.call('ZCARD', KEYS[2]) >= concurrency then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', now)
+    return tonumber(ARGV[6])
+end
+if tokens < 1 then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', now)
+    return math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'updated', now)
+redis.call('ZADD', KEYS[2], now + lease_ms, ARGV[5])
+redis.call('PEXPIRE', KEYS[2], lease_ms)
+return 0
+"""
+
+# Frees the slot and adjusts the rate: additive increase on success, halved on a 429
+RELEASE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+local retry_after_ms = tonumber(ARGV[2])
+local max_rate, min_rate = tonumber(ARGV[3]), tonumber(ARGV[4])
+
+redis.call('ZREM', KEYS[2], ARGV[1])
+local state = redis.call('HMGET', KEYS[1], 'rate', 'blocked_until')
+local rate = tonumber(state[1]) or max_rate
+local blocked_until = tonumber(state[2]) or 0
+
+if retry_after_ms > 0 then
+    -- Calls rejected inside one backoff window only halve the rate once
+    if blocked_until <= now then
+        rate = math.max(min_rate, rate / 2)
+    end
+    redis.call('HSET', KEYS[1], 'rate', tostring(rate), 'tokens', '0', 'updated', now,
+        'blocked_until', math.max(blocked_until, now + retry_after_ms))
+else
+    redis.call('HSET', KEYS[1], 'rate', tostring(math.min(max_rate, rate + tonumber(ARGV[5]))))
+end
+return 0
+"""
+
+class ProviderRateLimitedError(Exception):
+    """Raised when the provider rejects a call with 429 Too Many Requests"""
+    def __init__(self, retry_after: float):
+        super().__init__(f"Provider rate limit hit, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+class ProviderLimitTimeoutError(Exception):
+    """Raised when no call slot frees up within the limiter timeout"""
+
+def parse_retry_after(value: Optional[str], default: float) -> float:
+    """Seconds from a Retry-After header, given either as seconds or as an HTTP date"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+class ProviderLimiter:
+    def __init__(
+        self,
+        name: str,
+        redis_url: str,
+        rate: float,
+        burst: int,
+        max_concurrency: int,
+        timeout: float = 60.0,
+        lease: float = 120.0
+    ):
+        self.rate = rate
+        self.min_rate = rate / 20
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.lease_ms = int(lease * 1000)
+        self._keys = [f"provider_limit:{name}:bucket", f"provider_limit:{name}:in_flight"]
+        self._redis = redis.Redis.from_url(redis_url)
+        self._acquire = self._redis.register_script(ACQUIRE_SCRIPT)
+        self._release = self._redis.register_script(RELEASE_SCRIPT)
+
+    def _try_acquire(self, slot_id: str) -> Optional[int]:
+        """Milliseconds to wait before trying again, 0 once the slot is taken, None when Redis is unavailable"""
+        try:
+            return self._acquire(
+                keys=self._keys,
+                args=[self.rate, self.burst, self.max_concurrency, self.lease_ms, slot_id, SLOT_POLL_MS]
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Provider limiter unavailable, calling without it: {str(e)}")
+            return None
+
+    def acquire(self) -> Optional[str]:
+        """
+        Wait for a token and a concurrency slot and return the slot id,
+        or None when Redis is unavailable
+        """
+        slot_id = uuid.uuid4().hex
+        deadline = time.monotonic() + self.timeout
+        while True:
+            wait_ms = self._try_acquire(slot_id)
+            if wait_ms is None:
+                return None
+            if wait_ms == 0:
+                return slot_id
+
+            wait = wait_ms / 1000
+            if time.monotonic() + wait > deadline:
+                raise ProviderLimitTimeoutError(f"No provider call slot within {self.timeout:.0f}s")
+            time.sleep(wait)
+
+    async def async_acquire(self) -> Optional[str]:
+        """acquire() for asyncio callers; waits on the event loop, only Redis calls run in a thread"""
+        slot_id = uuid.uuid4().hex
+        deadline = time.monotonic() + self.timeout
+        while True:
+            wait_ms = await asyncio.to_thread(self._try_acquire, slot_id)
+            if wait_ms is None:
+                return None
+            if wait_ms == 0:
+                return slot_id
+
+            wait = wait_ms / 1000
+            if time.monotonic() + wait > deadline:
+                raise ProviderLimitTimeoutError(f"No provider call slot within {self.timeout:.0f}s")
+            await asyncio.sleep(wait)
+
+    def release(self, slot_id: Optional[str], succeeded: bool = True, retry_after: float = 0.0) -> None:
+        """
+        Free the slot. Successful calls raise the rate back towards its limit,
+        and a retry_after from a 429 backs the whole fleet off
+        """
+        if slot_id is None:
+            return
+        increase = self.rate / 50 if succeeded else 0
+        try:
+            self._release(
+                keys=self._keys,
+                args=[slot_id, int(retry_after * 1000), self.rate, self.min_rate, increase]
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Provider limiter release failed: {str(e)}")
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a call slot for the duration of one provider call"""
+        slot_id = self.acquire()
+        try:
+            yield
+        except ProviderRateLimitedError as e:
+            if slot_id is None:
+                # Without Redis only this process can back off
+                time.sleep(e.retry_after)
+            self.release(slot_id, succeeded=False, retry_after=max(e.retry_after, 0.001))
+            raise
+        except BaseException:
+            self.release(slot_id, succeeded=False)
+            raise
+        else:
+            self.release(slot_id)
+
+    @asynccontextmanager
+    async def async_slot(self) -> AsyncIterator[None]:
+        """slot() for asyncio callers"""
+        slot_id = await self.async_acquire()
+        try:
+            yield
+        except ProviderRateLimitedError as e:
+            if slot_id is None:
+                await asyncio.sleep(e.retry_after)
+            await asyncio.to_thread(self.release, slot_id, False, max(e.retry_after, 0.001))
+            raise
+        except BaseException:
+            await asyncio.to_thread(self.release, slot_id, False)
+            raise
+        else:
+            await asyncio.to_thread(self.release, slot_id)
@@ -1,19 +1,22 @@
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+import hashlib
+import hmac
+from typing import Any, Dict, Union, Optional
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.principal_cache import principal_cache
+from app.core.token_versions import token_versions
 from app.models.user import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: timedelta = None
+    subject: Union[str, Any], expires_delta: timedelta = None, claims: Optional[Dict[str, Any]] = None
 ) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -21,26 +24,139 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[str]:
+def create_principal_claims(user: User, token_version: int) -> Dict[str, Any]:
+    """Claims that let a stateless token be authorized without a user lookup"""
+    return {
+        "uid": user.id,
+        "act": user.is_active,
+        "su": user.is_superuser,
+        "ver": token_version,
+    }
+
+def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        username: str = payload.get("sub")
-        if username is None:
+        if payload.get("sub") is None:
             return None
-        return username
+        return payload
     except JWTError:
         return None
 
+def verify_token(token: str) -> Optional[str]:
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    return payload["sub"]
+
+async def principal_from_claims(payload: Dict[str, Any], db: AsyncSession) -> Optional[User]:
+    """
+    Build a detached User from stateless token claims if they are still current.
+    Only id, username and role flags are set.
+    """
+    if "uid" not in payload or "ver" not in payload:
+        return None
+    current_version = await token_versions.get(payload["uid"])
+    if current_version is None:
+        # Not cached, or Redis is down; the database has the authoritative version
+        current_version = await db.scalar(select(User.token_version).where(User.id == payload["uid"]))
+        if current_version is None:
+            return None
+        await token_versions.seed(payload["uid"], current_version)
+    if current_version != payload["ver"]:
+        return None
+    return User(
+        id=payload["uid"],
+        username=payload["sub"],
+        is_active=payload["act"],
+        is_superuser=payload["su"]
+    )
+
+async def revoke_tokens(user: User) -> None:
+    """
+    Bump the user's token version as part of the caller's transaction, before it
+    commits. Fails the request if the cached version cannot be dropped, since
+    revoked tokens would otherwise stay valid
+    """
+    user.token_version = User.token_version + 1
+    if settings.JWT_STATELESS_CLAIMS and not await token_versions.discard(user.id):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Could not revoke existing tokens, try again later"
+        )
+
+async def invalidate_principal(user_id: int, *usernames: str) -> None:
+    """Make committed user changes visible to authentication immediately"""
+    await principal_cache.invalidate(*usernames)
+    if settings.JWT_STATELESS_CLAIMS:
+        # A check that ran before the commit may have cached the old version
+        await token_versions.discard(user_id)
+
+WEBHOOK_SIGNATURE_HEADER = "X-Webhook-Signature"
+
+def create_webhook_signature(job_id: int) -> str:
+    """Per-job value AssemblyAI echoes back in the webhook auth header"""
+    secret = settings.ASSEMBLYAI_WEBHOOK_SECRET or settings.SECRET_KEY
+    return hmac.new(secret.encode(), f"job:{job_id}".encode(), hashlib.sha256).hexdigest()
+
+def verify_webhook_signature(job_id: int, signature: Optional[str]) -> bool:
+    if not signature:
+        return False
+    return hmac.compare_digest(create_webhook_signature(job_id), signature)
+
+async def _load_user(username: str, db: AsyncSession) -> Optional[User]:
+    # Common case costs no query; user mutations invalidate the cache
+    user = await principal_cache.get(username)
+    if user is not None:
+        return user
+    
+    # Taken first, so a change committed while the query runs keeps its result out of the cache
+    generation = await principal_cache.generation(username)
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalar_one_or_none()
+    if user is not None:
+        await principal_cache.set(username, user, generation)
+    return user
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
+    """
+    Authenticated user. With stateless claims this only carries id, username
+    and role flags; use get_current_user_profile for the full profile.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    payload = decode_access_token(credentials.credentials)
+    if payload is None:
+        raise credentials_exception
+    
+    if settings.JWT_STATELESS_CLAIMS:
+        principal = await principal_from_claims(payload, db)
+        if principal is not None:
+            return principal
+    
+    user = await _load_user(payload["sub"], db)
+    if user is None:
+        raise credentials_exception
+    
+    return user
+
+async def get_current_user_profile(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Authenticated user with every profile field loaded"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -51,7 +167,7 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    user = await _load_user(username, db)
     if user is None:
         raise credentials_exception
     
@@ -61,3 +177,8 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+async def get_current_active_user_profile(current_user: User = Depends(get_current_user_profile)) -> User:
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
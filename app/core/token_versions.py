@@ -0,0 +1,48 @@
+import logging
+from typing import Optional
+import redis.asyncio as aioredis
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class TokenVersionStore:
+    """
+    Redis cache of the per-user token versions kept in users.token_version.
+    Stateless tokens embed the version they were issued with and are rejected
+    once it is bumped. A missing entry means unknown, not version 0.
+    """
+    
+    def __init__(self, redis_url: str, ttl: int):
+        self._redis = aioredis.Redis.from_url(redis_url, decode_responses=True)
+        self.ttl = ttl
+    
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"token-version:{user_id}"
+    
+    async def get(self, user_id: int) -> Optional[int]:
+        """Cached version for the user, or None when it is not cached or Redis is unavailable"""
+        try:
+            version = await self._redis.get(self._key(user_id))
+        except Exception as e:
+            logger.warning(f"Token version lookup failed: {str(e)}")
+            return None
+        return int(version) if version is not None else None
+    
+    async def seed(self, user_id: int, version: int) -> None:
+        """Cache a version read from the database for ttl seconds"""
+        try:
+            await self._redis.set(self._key(user_id), version, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Token version cache fill for user {user_id} failed: {str(e)}")
+    
+    async def discard(self, user_id: int) -> bool:
+        """Drop the cached version so the next check reads the database; False if that failed"""
+        try:
+            await self._redis.delete(self._key(user_id))
+            return True
+        except Exception as e:
+            logger.error(f"Token version discard for user {user_id} failed: {str(e)}")
+            return False
+
+token_versions = TokenVersionStore(settings.REDIS_URL, settings.TOKEN_VERSION_CACHE_TTL)
@@ -1,7 +1,9 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.core.principal_cache import principal_cache
 from app.utils.logging import setup_logging
 import logging
 
@@ -27,6 +29,14 @@ app.add_middleware(
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+async def startup():
+    principal_cache.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await principal_cache.stop()
+
 @app.get("/")
 async def root():
     return {"message": "Audio Transcription API", "version": "1.0.0"}
@@ -35,6 +45,10 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,49 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, Index, JSON
+from sqlalchemy.sql import func
+from typing import Any, Optional
+from app.models.user import Base
+import uuid
+
+class OutboxMessage(Base):
+    """
+    Celery task waiting to be published by the outbox relay. Rows are written in
+    the same transaction as the change that needs the task, and deleted once the
+    broker has accepted the message
+    """
+    __tablename__ = "outbox_messages"
+
+    id = Column(BigInteger, primary_key=True)
+    task_name = Column(String(255), nullable=False)
+    task_id = Column(String(255), nullable=False)
+    args = Column(JSON, nullable=False)
+
+    # Broker queue to publish to, and the tenant it is scheduled fairly for
+    queue = Column(String(255), nullable=False)
+    user_id = Column(Integer)
+
+    # Failed publish attempts, kept for troubleshooting
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    @classmethod
+    def for_task(
+        cls,
+        task: Any,
+        *args: Any,
+        queue: str,
+        task_id: Optional[str] = None,
+        user_id: Optional[int] = None
+    ) -> "OutboxMessage":
+        """Message that calls task(*args) once published to queue"""
+        return cls(
+            task_name=task.name,
+            task_id=task_id or str(uuid.uuid4()),
+            args=list(args),
+            queue=queue,
+            user_id=user_id
+        )
+
+# Per-tenant backlog heads for the relay's fair-share scheduling
+Index("ix_outbox_messages_queue_user_id_id", OutboxMessage.queue, OutboxMessage.user_id, OutboxMessage.id)
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Float
+from sqlalchemy import Column, Computed, Integer, String, Boolean, DateTime, Text, ForeignKey, LargeBinary, Float, Index, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.associationproxy import association_proxy
 from enum import Enum
+import hashlib
 from app.models.user import Base
+from app.utils.segment_codec import decode_segments
 
 class JobStatus(str, Enum):
     PENDING = "pending"
@@ -10,31 +14,67 @@ class JobStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+# Transaction-level advisory locks around jobs that share a transcript: held by
+# job creation while it picks the job to follow, and by workers and deletes
+# while they complete, fail or requeue followers. Locked in key order, so
+# overlapping batches cannot deadlock
+DEDUP_LOCK_QUERY = text(
+    "SELECT pg_advisory_xact_lock(key) "
+    "FROM (SELECT unnest(CAST(:keys AS bigint[])) AS key ORDER BY key) AS keys"
+)
+
+def dedup_lock_key(
+    user_id: int,
+    content_sha256: str,
+    enable_speaker_diarization: bool,
+    enable_sentiment_analysis: bool,
+    enable_summarization: bool
+) -> int:
+    """Signed 64-bit advisory lock key for one user, audio content and set of options"""
+    key = (
+        f"{user_id}:{content_sha256}:{bool(enable_speaker_diarization)}:"
+        f"{bool(enable_sentiment_analysis)}:{bool(enable_summarization)}"
+    )
+    return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big", signed=True)
+
 class TranscriptionJob(Base):
     __tablename__ = "transcription_jobs"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     filename = Column(String(255), nullable=False)
-    s3_url = Column(Text, nullable=False)
+    # Audio is presigned for the provider when it is submitted; s3_url is only set on older jobs
+    s3_object_key = Column(Text)
+    s3_url = Column(Text)
     status = Column(String(20), default=JobStatus.PENDING.value, nullable=False)
     celery_task_id = Column(String(255), unique=True, index=True)
+    provider_transcript_id = Column(String(255), unique=True, index=True)
+    # Set when long audio is transcribed as chunks, which have no single provider transcript
+    chunk_count = Column(Integer)
+    
+    # Deduplication: SHA-256 of the uploaded audio, and the job whose transcript this one reuses
+    content_sha256 = Column(String(64))
+    duplicate_of_job_id = Column(
+        Integer,
+        ForeignKey("transcription_jobs.id", ondelete="SET NULL"),
+        index=True
+    )
+    
+    # Audio properties read from the container headers at upload
+    audio_format = Column(String(10))
+    audio_duration = Column(Float)  # in seconds
+    sample_rate = Column(Integer)
+    channels = Column(Integer)
     
     # AssemblyAI configuration
     enable_speaker_diarization = Column(Boolean, default=True)
     enable_sentiment_analysis = Column(Boolean, default=True)
     enable_summarization = Column(Boolean, default=True)
     
-    # Results
-    transcript_text = Column(Text)
+    # Results summary; the transcript itself lives in transcription_results
     confidence_score = Column(Float)
     processing_time = Column(Float)  # in seconds
     
-    # JSON fields for detailed results
-    speaker_diarization_results = Column(JSON)
-    sentiment_analysis_results = Column(JSON)
-    summary = Column(Text)
-    
     # Error handling
     error_message = Column(Text)
     
@@ -45,4 +85,102 @@ class TranscriptionJob(Base):
     completed_at = Column(DateTime(timezone=True))
     
     # Relationships
-    user = relationship("User", back_populates="transcription_jobs")
\ No newline at end of file
+    user = relationship("User", back_populates="transcription_jobs")
+    result = relationship(
+        "TranscriptionResult",
+        back_populates="job",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+    
+    def dedup_lock_key(self) -> int:
+        return dedup_lock_key(
+            self.user_id,
+            self.content_sha256,
+            self.enable_speaker_diarization,
+            self.enable_sentiment_analysis,
+            self.enable_summarization
+        )
+    
+    # Read-through accessors for the result fields, None until the job completes
+    transcript_text = association_proxy("result", "transcript_text")
+    speaker_diarization_results = association_proxy("result", "speaker_diarization_results")
+    sentiment_analysis_results = association_proxy("result", "sentiment_analysis_results")
+    summary = association_proxy("result", "summary")
+
+# Text search configuration used for the transcript search index and queries
+SEARCH_CONFIG = "english"
+
+class TranscriptionResult(Base):
+    """
+    Transcript and analysis results, kept out of transcription_jobs so the
+    frequently updated job rows stay narrow
+    """
+    __tablename__ = "transcription_results"
+    
+    job_id = Column(
+        Integer,
+        ForeignKey("transcription_jobs.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    transcript_text = Column(Text)
+    # Segment lists encoded with app.utils.segment_codec
+    speaker_segments = Column(LargeBinary)
+    sentiment_segments = Column(LargeBinary)
+    # Content hash of the segment blobs, served as the segments ETag
+    segments_etag = Column(String(64))
+    summary = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Maintained by Postgres whenever transcript_text is written
+    search_vector = Column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{SEARCH_CONFIG}', coalesce(transcript_text, ''))", persisted=True)
+    )
+    
+    job = relationship("TranscriptionJob", back_populates="result")
+    
+    def copy_for(self, job_id: int) -> "TranscriptionResult":
+        """New result row for job_id with the same content"""
+        return TranscriptionResult(
+            job_id=job_id,
+            transcript_text=self.transcript_text,
+            speaker_segments=self.speaker_segments,
+            sentiment_segments=self.sentiment_segments,
+            segments_etag=self.segments_etag,
+            summary=self.summary
+        )
+    
+    @property
+    def speaker_diarization_results(self):
+        return decode_segments(self.speaker_segments)
+    
+    @property
+    def sentiment_analysis_results(self):
+        return decode_segments(self.sentiment_segments)
+
+# Keyset pagination indexes for job listing, per user and across all users
+Index(
+    "ix_transcription_jobs_user_id_created_at_id",
+    TranscriptionJob.user_id,
+    TranscriptionJob.created_at.desc(),
+    TranscriptionJob.id
+)
+Index(
+    "ix_transcription_jobs_created_at_id",
+    TranscriptionJob.created_at.desc(),
+    TranscriptionJob.id
+)
+# Lookup of earlier jobs with the same audio
+Index(
+    "ix_transcription_jobs_user_id_content_sha256",
+    TranscriptionJob.user_id,
+    TranscriptionJob.content_sha256
+)
+# Full-text search over transcripts
+Index(
+    "ix_transcription_results_search_vector",
+    TranscriptionResult.search_vector,
+    postgresql_using="gin"
+)
@@ -3,9 +3,12 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from passlib.context import CryptContext
+from typing import Optional, Tuple
+from app.core.config import settings
 
 Base = declarative_base()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different work factor are flagged for rehashing on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 class User(Base):
     __tablename__ = "users"
@@ -16,6 +19,8 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
+    # Bumped by every change to the user, revoking stateless tokens issued before it
+    token_version = Column(Integer, server_default="0", nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -25,6 +30,11 @@ class User(Base):
     def verify_password(self, password: str) -> bool:
         return pwd_context.verify(password, self.hashed_password)
     
+    @staticmethod
+    def verify_and_update_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password and return a replacement hash if the stored one is outdated"""
+        return pwd_context.verify_and_update(password, hashed_password)
+    
     @staticmethod
     def hash_password(password: str) -> str:
         return pwd_context.hash(password)
\ No newline at end of file
@@ -9,12 +9,14 @@ class JobStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
-class TranscriptionJobCreate(BaseModel):
-    filename: str
+class TranscriptionOptions(BaseModel):
     enable_speaker_diarization: bool = True
     enable_sentiment_analysis: bool = True
     enable_summarization: bool = True
 
+class TranscriptionJobCreate(TranscriptionOptions):
+    filename: str
+
 class TranscriptionJobResponse(BaseModel):
     id: int
     filename: str
@@ -24,6 +26,12 @@ class TranscriptionJobResponse(BaseModel):
     started_at: Optional[datetime]
     completed_at: Optional[datetime]
     
+    # Audio properties, unknown for jobs created before uploads were probed
+    audio_format: Optional[str] = None
+    audio_duration: Optional[float] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    
     # Results (only present when completed)
     transcript_text: Optional[str]
     confidence_score: Optional[float]
@@ -36,7 +44,99 @@ class TranscriptionJobResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TranscriptionJobSummary(BaseModel):
+    """Job metadata without any of the potentially large results"""
+    id: int
+    filename: str
+    status: JobStatus
+    created_at: datetime
+    updated_at: Optional[datetime]
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
+    audio_duration: Optional[float]
+    confidence_score: Optional[float]
+    processing_time: Optional[float]
+    error_message: Optional[str]
+
+class TranscriptionJobListItem(TranscriptionJobSummary):
+    """Listing entry; result fields are only present when requested with include="""
+    transcript_text: Optional[str] = None
+    speaker_diarization_results: Optional[List[Dict[str, Any]]] = None
+    sentiment_analysis_results: Optional[List[Dict[str, Any]]] = None
+    summary: Optional[str] = None
+
 class JobSubmissionResponse(BaseModel):
     job_id: int
     message: str
     status: JobStatus
+    audio_duration: Optional[float] = None  # in seconds
+    # Rough seconds until the transcript is ready, not counting time queued behind other jobs
+    estimated_completion_seconds: Optional[float] = None
+
+class UploadCreateRequest(BaseModel):
+    filename: str
+    content_type: str
+    file_size: int
+
+class PresignedPart(BaseModel):
+    part_number: int
+    url: str
+
+class UploadCreateResponse(BaseModel):
+    object_key: str
+    expires_in: int
+    # Single PUT for small files
+    upload_url: Optional[str] = None
+    # Multipart upload for large files
+    upload_id: Optional[str] = None
+    part_size: Optional[int] = None
+    part_urls: Optional[List[PresignedPart]] = None
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str
+
+class UploadCompleteRequest(TranscriptionJobCreate):
+    object_key: str
+    upload_id: Optional[str] = None
+    parts: Optional[List[CompletedPart]] = None
+
+class BatchObject(BaseModel):
+    object_key: str
+    filename: str
+
+class BatchCreateRequest(TranscriptionOptions):
+    """Already uploaded objects to transcribe with the same options"""
+    objects: List[BatchObject]
+
+class BatchItemResult(BaseModel):
+    filename: str
+    # Set when a job was created for the item
+    job_id: Optional[int] = None
+    status: Optional[JobStatus] = None
+    # Set when the item was rejected
+    error: Optional[str] = None
+
+class BatchSubmissionResponse(BaseModel):
+    submitted: int
+    failed: int
+    items: List[BatchItemResult]
+
+class TranscriptWebhook(BaseModel):
+    transcript_id: str
+    status: str
+
+class TranscriptSegmentHit(BaseModel):
+    start: Optional[int]
+    end: Optional[int]
+    speaker: Optional[str] = None
+    text: str
+
+class TranscriptSearchResult(BaseModel):
+    job_id: int
+    filename: str
+    created_at: datetime
+    rank: float
+    snippet: str
+    # Diarization segments containing matched words, in transcript order
+    segments: List[TranscriptSegmentHit]
@@ -1,25 +1,108 @@
 import assemblyai as aai
-import requests
-import time
-from typing import Dict, Any, Optional
+import httpx
+from typing import Callable, Dict, Any, Optional, TypeVar
 from app.core.config import settings
+from app.core.provider_limiter import ProviderLimiter, ProviderRateLimitedError, parse_retry_after
+from app.services.transcription_backend import TranscriptionFailedError
+from app.utils.segment_codec import encode_segments
+from app.utils.transcript_stitcher import ChunkTranscript, Word
 import logging
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+def build_assemblyai_limiter() -> ProviderLimiter:
+    """Limiter every AssemblyAI call takes a slot from, shared by all processes through Redis"""
+    return ProviderLimiter(
+        "assemblyai",
+        settings.REDIS_URL,
+        rate=settings.ASSEMBLYAI_RATE_LIMIT,
+        burst=settings.ASSEMBLYAI_RATE_BURST,
+        max_concurrency=settings.ASSEMBLYAI_MAX_CONCURRENCY,
+        timeout=settings.ASSEMBLYAI_LIMIT_TIMEOUT
+    )
+
+def _raise_on_rate_limit(response: httpx.Response) -> None:
+    """The SDK API functions report HTTP errors as message text only, so 429s are caught before they see them"""
+    if response.status_code == httpx.codes.TOO_MANY_REQUESTS:
+        raise ProviderRateLimitedError(
+            parse_retry_after(response.headers.get("Retry-After"), settings.ASSEMBLYAI_DEFAULT_RETRY_AFTER)
+        )
+
+def _delete_transcript(client: httpx.Client, transcript_id: str) -> None:
+    """DELETE /v2/transcript/{id}, which the SDK API functions do not cover"""
+    response = client.delete(f"{aai.api.ENDPOINT_TRANSCRIPT}/{transcript_id}")
+    response.raise_for_status()
+
+def _error_message(response: httpx.Response) -> str:
+    try:
+        return response.json()["error"]
+    except Exception:
+        return response.text
+
+def _create_transcript(
+    client: httpx.Client,
+    request: aai.types.TranscriptRequest
+) -> aai.types.TranscriptResponse:
+    """
+    POST /v2/transcript like aai.api.create_transcript, which reports every HTTP
+    error the same way. Requests the API rejects, e.g. for an unreachable audio
+    URL, fail for good; bad credentials and server errors are worth retrying
+    """
+    response = client.post(
+        aai.api.ENDPOINT_TRANSCRIPT,
+        json=request.dict(exclude_none=True, by_alias=True)
+    )
+    if response.is_client_error and response.status_code not in (httpx.codes.UNAUTHORIZED, httpx.codes.FORBIDDEN):
+        raise TranscriptionFailedError(f"Transcription request rejected: {_error_message(response)}")
+    if response.status_code != httpx.codes.OK:
+        raise Exception(f"Transcription request failed with HTTP {response.status_code}: {_error_message(response)}")
+    return aai.types.TranscriptResponse.parse_obj(response.json())
+
 class AssemblyAIService:
+    """TranscriptionBackend for the AssemblyAI API"""
+    
     def __init__(self):
-        aai.settings.api_key = settings.ASSEMBLYAI_API_KEY
-        self.transcriber = aai.Transcriber()
+        # Keep-alive pool reused by every call from this process; only failed connects are retried
+        pool_size = settings.ASSEMBLYAI_MAX_CONNECTIONS
+        self.http_client = httpx.Client(
+            base_url=settings.ASSEMBLYAI_BASE_URL,
+            headers={"authorization": settings.ASSEMBLYAI_API_KEY},
+            timeout=httpx.Timeout(settings.ASSEMBLYAI_READ_TIMEOUT, connect=settings.ASSEMBLYAI_CONNECT_TIMEOUT),
+            transport=httpx.HTTPTransport(
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                retries=settings.ASSEMBLYAI_CONNECT_RETRIES
+            ),
+            event_hooks={"response": [_raise_on_rate_limit]}
+        )
+        self.limiter = build_assemblyai_limiter()
     
-    def transcribe_audio(
+    def _call(self, api_call: Callable[..., T], *args: Any) -> T:
+        """Make one API call within the fleet-wide limits, retrying when the provider rate limits it"""
+        for attempt in range(settings.ASSEMBLYAI_RATE_LIMIT_RETRIES + 1):
+            try:
+                with self.limiter.slot():
+                    return api_call(self.http_client, *args)
+            except ProviderRateLimitedError as e:
+                if attempt == settings.ASSEMBLYAI_RATE_LIMIT_RETRIES:
+                    raise
+                logger.warning(f"AssemblyAI rate limited the call, retrying after {e.retry_after:.1f}s")
+    
+    def submit_transcription(
         self,
         audio_url: str,
         enable_speaker_diarization: bool = True,
-        enable_sentiment_analysis: bool = True
-    ) -> Dict[str, Any]:
+        enable_sentiment_analysis: bool = True,
+        webhook_url: Optional[str] = None,
+        webhook_auth_header_name: Optional[str] = None,
+        webhook_auth_header_value: Optional[str] = None,
+        audio_start_from: Optional[int] = None,
+        audio_end_at: Optional[int] = None
+    ) -> str:
         """
-        Transcribe audio with speaker diarization and sentiment analysis
+        Submit audio for transcription without waiting for it and return the transcript ID.
+        audio_start_from and audio_end_at (in milliseconds) limit it to part of the audio
         """
         try:
             # Configure transcription settings
@@ -33,68 +116,155 @@ class AssemblyAIService:
                 summary_model="informative",
                 summary_type="bullets",
                 # speech_model=aai.SpeechModel.slam_1
+                webhook_url=webhook_url,
+                webhook_auth_header_name=webhook_auth_header_name,
+                webhook_auth_header_value=webhook_auth_header_value,
+                audio_start_from=audio_start_from,
+                audio_end_at=audio_end_at
             )
             
-            logger.info(f"Starting transcription for audio: {audio_url}")
+            logger.info(f"Submitting transcription for audio: {audio_url}")
             
-            # Start transcription
-            transcript = self.transcriber.transcribe(audio_url, config=config)
-            
-            # Wait for completion
-            while transcript.status not in [aai.TranscriptStatus.completed, aai.TranscriptStatus.error]:
-                time.sleep(5)
-                transcript = self.transcriber.get_by_id(transcript.id)
-                logger.info(f"Transcription status: {transcript.status}")
+            transcript = self._call(
+                _create_transcript,
+                aai.types.TranscriptRequest(audio_url=audio_url, **config.raw.dict(exclude_none=True))
+            )
             
             if transcript.status == aai.TranscriptStatus.error:
-                raise Exception(f"Transcription failed: {transcript.error}")
-            
-            # Process results
-            result = {
-                "transcript_text": transcript.text,
-                "confidence": transcript.confidence,
-                "audio_duration": transcript.audio_duration,
-                "processing_time": None,  # Will be calculated by worker
-                "speaker_diarization_results": None,
-                "sentiment_analysis_results": None,
-                "summary": None
-            }
-            
-            # Add speaker diarization results
-            if enable_speaker_diarization and hasattr(transcript, 'utterances'):
-                speaker_results = []
-                for utterance in transcript.utterances:
-                    speaker_results.append({
-                        "speaker": utterance.speaker,
-                        "text": utterance.text,
-                        "start": utterance.start,
-                        "end": utterance.end,
-                        "confidence": utterance.confidence
-                    })
-                result["speaker_diarization_results"] = speaker_results
-            
-            # Add sentiment analysis results
-            if enable_sentiment_analysis and hasattr(transcript, 'sentiment_analysis'):
-                sentiment_results = []
-                for sentiment in transcript.sentiment_analysis:
-                    sentiment_results.append({
-                        "text": sentiment.text,
-                        "sentiment": sentiment.sentiment.value,
-                        "confidence": sentiment.confidence,
-                        "start": sentiment.start,
-                        "end": sentiment.end
-                    })
-                result["sentiment_analysis_results"] = sentiment_results
+                raise TranscriptionFailedError(f"Transcription submission failed: {transcript.error}")
             
-            # Add summarization
-            if hasattr(transcript, 'summary'):
-                result["summary"] = transcript.summary
-            
-            logger.info("Transcription completed successfully")
-            return result
+            logger.info(f"Submitted transcript {transcript.id}")
+            return transcript.id
             
+        except TranscriptionFailedError as e:
+            logger.error(f"AssemblyAI rejected the submission: {str(e)}")
+            raise
         except Exception as e:
-            logger.error(f"AssemblyAI transcription failed: {str(e)}")
-            raise Exception(f"AssemblyAI transcription failed: {str(e)}")
-
-assemblyai_service = AssemblyAIService()
+            logger.error(f"AssemblyAI submission failed: {str(e)}")
+            raise Exception(f"AssemblyAI submission failed: {str(e)}")
+    
+    def _fetch_finished(self, transcript_id: str) -> Optional[aai.types.TranscriptResponse]:
+        """Fetch a transcript once, None while it is still in progress"""
+        try:
+            transcript = self._call(aai.api.get_transcript, transcript_id)
+        except Exception as e:
+            logger.error(f"Failed to fetch transcript {transcript_id}: {str(e)}")
+            raise Exception(f"Failed to fetch transcript {transcript_id}: {str(e)}")
+        
+        if transcript.status not in [aai.TranscriptStatus.completed, aai.TranscriptStatus.error]:
+            return None
+        
+        if transcript.status == aai.TranscriptStatus.error:
+            raise TranscriptionFailedError(f"Transcription failed: {transcript.error}")
+        return transcript
+    
+    def poll_transcription(self, transcript_id: str) -> bool:
+        """Whether a transcript has finished, successfully or not"""
+        try:
+            transcript = self._call(aai.api.get_transcript, transcript_id)
+        except Exception as e:
+            logger.error(f"Failed to poll transcript {transcript_id}: {str(e)}")
+            raise Exception(f"Failed to poll transcript {transcript_id}: {str(e)}")
+        return transcript.status in [aai.TranscriptStatus.completed, aai.TranscriptStatus.error]
+    
+    def cancel_transcription(self, transcript_id: str) -> None:
+        """
+        AssemblyAI cannot stop a transcript in progress, so this deletes it instead,
+        which only succeeds once it has finished. Failures are logged, not raised
+        """
+        try:
+            self._call(_delete_transcript, transcript_id)
+            logger.info(f"Deleted transcript {transcript_id}")
+        except Exception as e:
+            logger.warning(f"Failed to delete transcript {transcript_id}: {str(e)}")
+    
+    def get_chunk_transcript(self, transcript_id: str, start_ms: int, end_ms: int) -> Optional[ChunkTranscript]:
+        """
+        Fetch the transcript of one chunk submitted with audio_start_from=start_ms,
+        with word and sentiment timestamps relative to the chunk start.
+        Returns None while it is still in progress
+        """
+        transcript = self._fetch_finished(transcript_id)
+        if transcript is None:
+            return None
+        
+        words = transcript.words or []
+        # Timestamps count from the start of the file; a chunk's first word can only
+        # come before start_ms if they are already relative to the chunk
+        offset = start_ms if words and words[0].start >= start_ms else 0
+        return ChunkTranscript(
+            start_ms=start_ms,
+            end_ms=end_ms,
+            words=[
+                Word(word.text, word.start - offset, word.end - offset, word.confidence, word.speaker)
+                for word in words
+            ],
+            sentiments=[
+                {
+                    "text": sentiment.text,
+                    "sentiment": sentiment.sentiment.value,
+                    "confidence": sentiment.confidence,
+                    "start": sentiment.start - offset,
+                    "end": sentiment.end - offset
+                }
+                for sentiment in transcript.sentiment_analysis_results or []
+            ],
+            summary=transcript.summary
+        )
+    
+    def get_transcription_result(
+        self,
+        transcript_id: str,
+        enable_speaker_diarization: bool = True,
+        enable_sentiment_analysis: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a submitted transcript once. Returns None while it is still in progress
+        """
+        transcript = self._fetch_finished(transcript_id)
+        if transcript is None:
+            return None
+        
+        # Process results
+        result = {
+            "transcript_text": transcript.text,
+            "confidence": transcript.confidence,
+            "audio_duration": transcript.audio_duration,
+            "processing_time": None,  # Will be calculated by worker
+            "speaker_segments": None,  # encoded with app.utils.segment_codec
+            "sentiment_segments": None,
+            "summary": None
+        }
+        
+        # Add speaker diarization results
+        if enable_speaker_diarization and transcript.utterances:
+            speaker_results = []
+            for utterance in transcript.utterances:
+                speaker_results.append({
+                    "speaker": utterance.speaker,
+                    "text": utterance.text,
+                    "start": utterance.start,
+                    "end": utterance.end,
+                    "confidence": utterance.confidence
+                })
+            result["speaker_segments"] = encode_segments(speaker_results)
+        
+        # Add sentiment analysis results
+        if enable_sentiment_analysis and transcript.sentiment_analysis_results:
+            sentiment_results = []
+            for sentiment in transcript.sentiment_analysis_results:
+                sentiment_results.append({
+                    "text": sentiment.text,
+                    "sentiment": sentiment.sentiment.value,
+                    "confidence": sentiment.confidence,
+                    "start": sentiment.start,
+                    "end": sentiment.end
+                })
+            result["sentiment_segments"] = encode_segments(sentiment_results)
+        
+        # Add summarization
+        if transcript.summary:
+            result["summary"] = transcript.summary
+        
+        logger.info(f"Transcript {transcript_id} completed successfully")
+        return result
@@ -0,0 +1,244 @@
+"""
+Deterministic offline stand-in for the transcription provider.
+
+Nothing is recognised: every audio URL seeds a synthetic conversation between a
+few speakers, so the same audio always gives the same words, speakers,
+sentiments and summary. A chunk sees the part of that conversation inside its
+time range, with timestamps relative to the chunk start, so chunked jobs
+stitch together like real ones.
+
+Nothing is stored either. The transcript ID records the audio, the time range
+and when the transcript is ready, so any worker or poller process can rebuild
+it. Transcripts are ready LOCAL_BACKEND_LATENCY seconds after they are
+submitted, a LOCAL_BACKEND_FAILURE_RATE share of them fails (always the same
+ones for the same audio), and whole-file transcripts have about
+LOCAL_BACKEND_WORDS words. No webhooks are sent, so the transcript poller has
+to run.
+"""
+import hashlib
+import random
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+from app.core.config import settings
+from app.services.transcription_backend import TranscriptionFailedError
+from app.utils.segment_codec import encode_segments
+from app.utils.transcript_stitcher import ChunkTranscript, Word
+import logging
+
+logger = logging.getLogger(__name__)
+
+VOCABULARY = (
+    "thanks for joining the call today we wanted to go over the numbers from last "
+    "quarter and plan what comes next the launch went well but support tickets "
+    "doubled so we need more people on the team before the next release"
+).split()
+SENTIMENTS = ("POSITIVE", "NEUTRAL", "NEGATIVE")
+SENTENCES_PER_BULLET = 8
+
+class _Sentence(NamedTuple):
+    words: List[Word]
+    sentiment: str
+
+class _TranscriptId(NamedTuple):
+    audio: str  # digest of the audio URL
+    start_ms: int
+    end_ms: Optional[int]  # None for the whole file
+    ready_at: float
+
+def _conversation(audio: str) -> Iterator[_Sentence]:
+    """Endless sentences of a conversation, in turns of a few sentences per speaker"""
+    rng = random.Random(audio)
+    speakers = rng.randint(2, 4)
+    speaker, position = 0, rng.randint(200, 1500)
+    while True:
+        for _ in range(rng.randint(1, 4)):
+            words = []
+            for index in range(rng.randint(4, 18)):
+                length = rng.randint(150, 600)
+                text = rng.choice(VOCABULARY)
+                words.append(Word(
+                    text.capitalize() if index == 0 else text,
+                    position,
+                    position + length,
+                    round(rng.uniform(0.8, 1.0), 3),
+                    chr(ord("A") + speaker)
+                ))
+                position += length + rng.randint(30, 200)
+            words[-1] = words[-1]._replace(text=words[-1].text + ".")
+            yield _Sentence(words, rng.choice(SENTIMENTS))
+            position += rng.randint(200, 600)
+        position += rng.randint(300, 1500)
+        speaker = (speaker + rng.randint(1, speakers - 1)) % speakers
+
+def _sentences(transcript: _TranscriptId) -> List[_Sentence]:
+    """The transcript's sentences, with timestamps relative to its start"""
+    sentences: List[_Sentence] = []
+    if transcript.end_ms is None:
+        word_count = 0
+        for sentence in _conversation(transcript.audio):
+            if word_count >= settings.LOCAL_BACKEND_WORDS:
+                break
+            sentences.append(sentence)
+            word_count += len(sentence.words)
+        return sentences
+    
+    # Like a provider given a time range, keep the words spoken inside it
+    for sentence in _conversation(transcript.audio):
+        if sentence.words[0].start >= transcript.end_ms:
+            break
+        words = [
+            word._replace(
+                start=max(word.start, transcript.start_ms) - transcript.start_ms,
+                end=min(word.end, transcript.end_ms) - transcript.start_ms
+            )
+            for word in sentence.words
+            if transcript.start_ms <= (word.start + word.end) / 2 < transcript.end_ms
+        ]
+        if words:
+            sentences.append(_Sentence(words, sentence.sentiment))
+    return sentences
+
+def _sentiment_segments(sentences: List[_Sentence]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "text": " ".join(word.text for word in sentence.words),
+            "sentiment": sentence.sentiment,
+            "confidence": min(word.confidence for word in sentence.words),
+            "start": sentence.words[0].start,
+            "end": sentence.words[-1].end
+        }
+        for sentence in sentences
+    ]
+
+def _summary(sentences: List[_Sentence]) -> Optional[str]:
+    bullets = [
+        "- " + " ".join(word.text for word in sentence.words)
+        for sentence in sentences[::SENTENCES_PER_BULLET]
+    ]
+    return "\n".join(bullets) or None
+
+class LocalTranscriptionBackend:
+    """TranscriptionBackend that generates transcripts locally, for load tests and CI"""
+    
+    def submit_transcription(
+        self,
+        audio_url: str,
+        enable_speaker_diarization: bool = True,
+        enable_sentiment_analysis: bool = True,
+        webhook_url: Optional[str] = None,
+        webhook_auth_header_name: Optional[str] = None,
+        webhook_auth_header_value: Optional[str] = None,
+        audio_start_from: Optional[int] = None,
+        audio_end_at: Optional[int] = None
+    ) -> str:
+        """Return the ID of a transcript that will be ready after LOCAL_BACKEND_LATENCY seconds"""
+        # Presigned URLs differ on every submission, only the object identifies the audio
+        audio = hashlib.sha256(urlsplit(audio_url)._replace(query="").geturl().encode()).hexdigest()[:16]
+        ready_at = int((time.time() + settings.LOCAL_BACKEND_LATENCY) * 1000)
+        # The random suffix keeps IDs unique when the same audio is submitted twice at once
+        transcript_id = (
+            f"local-{audio}-{audio_start_from or 0}-{'' if audio_end_at is None else audio_end_at}"
+            f"-{ready_at}-{uuid.uuid4().hex[:8]}"
+        )
+        logger.info(f"Submitted local transcript {transcript_id}")
+        return transcript_id
+    
+    @staticmethod
+    def _parse(transcript_id: str) -> _TranscriptId:
+        try:
+            prefix, audio, start_ms, end_ms, ready_at, _ = transcript_id.split("-")
+            if prefix != "local":
+                raise ValueError(prefix)
+            return _TranscriptId(
+                audio,
+                int(start_ms),
+                int(end_ms) if end_ms else None,
+                int(ready_at) / 1000
+            )
+        except ValueError:
+            raise Exception(f"Failed to fetch transcript {transcript_id}: not a local transcript")
+    
+    def _fetch_finished(self, transcript_id: str) -> Optional[List[_Sentence]]:
+        """The transcript's sentences, None while it is still in progress"""
+        transcript = self._parse(transcript_id)
+        if time.time() < transcript.ready_at:
+            return None
+        
+        # Seeded by the audio and range, so retrying the same audio fails again
+        failure = random.Random(f"{transcript.audio}-{transcript.start_ms}-{transcript.end_ms}").random()
+        if failure < settings.LOCAL_BACKEND_FAILURE_RATE:
+            raise TranscriptionFailedError("Transcription failed: simulated failure of the local backend")
+        return _sentences(transcript)
+    
+    def poll_transcription(self, transcript_id: str) -> bool:
+        """Whether a transcript has finished, successfully or not"""
+        return time.time() >= self._parse(transcript_id).ready_at
+    
+    def get_transcription_result(
+        self,
+        transcript_id: str,
+        enable_speaker_diarization: bool = True,
+        enable_sentiment_analysis: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a submitted transcript once. Returns None while it is still in progress
+        """
+        sentences = self._fetch_finished(transcript_id)
+        if sentences is None:
+            return None
+        
+        words = [word for sentence in sentences for word in sentence.words]
+        
+        # Consecutive sentences of one speaker make an utterance
+        utterances: List[Tuple[Optional[str], List[Word]]] = []
+        for sentence in sentences:
+            if utterances and utterances[-1][0] == sentence.words[0].speaker:
+                utterances[-1][1].extend(sentence.words)
+            else:
+                utterances.append((sentence.words[0].speaker, list(sentence.words)))
+        
+        return {
+            "transcript_text": " ".join(word.text for word in words),
+            "confidence": sum(word.confidence for word in words) / len(words) if words else None,
+            "audio_duration": (words[-1].end / 1000) if words else 0.0,
+            "processing_time": None,
+            "speaker_segments": encode_segments([
+                {
+                    "speaker": speaker,
+                    "text": " ".join(word.text for word in utterance_words),
+                    "start": utterance_words[0].start,
+                    "end": utterance_words[-1].end,
+                    "confidence": sum(word.confidence for word in utterance_words) / len(utterance_words)
+                }
+                for speaker, utterance_words in utterances
+            ]) if enable_speaker_diarization and utterances else None,
+            "sentiment_segments": (
+                encode_segments(_sentiment_segments(sentences))
+                if enable_sentiment_analysis and sentences else None
+            ),
+            "summary": _summary(sentences)
+        }
+    
+    def get_chunk_transcript(self, transcript_id: str, start_ms: int, end_ms: int) -> Optional[ChunkTranscript]:
+        """
+        Fetch the transcript of one chunk submitted with audio_start_from=start_ms,
+        with word and sentiment timestamps relative to the chunk start.
+        Returns None while it is still in progress
+        """
+        sentences = self._fetch_finished(transcript_id)
+        if sentences is None:
+            return None
+        
+        return ChunkTranscript(
+            start_ms=start_ms,
+            end_ms=end_ms,
+            words=[word for sentence in sentences for word in sentence.words],
+            sentiments=_sentiment_segments(sentences),
+            summary=_summary(sentences)
+        )
+    
+    def cancel_transcription(self, transcript_id: str) -> None:
+        """Nothing runs in the background, so there is nothing to stop"""
+        logger.info(f"Cancelled local transcript {transcript_id}")
@@ -1,56 +1,241 @@
 import boto3
-import tempfile
-import os
+import hashlib
+from typing import Dict, Any, List, Optional
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.utils.process_local import ProcessLocal
 import logging
 
 logger = logging.getLogger(__name__)
 
 class S3Service:
     def __init__(self):
-        self.s3_client = boto3.client(
+        # A session per client, since the default boto3 session is not thread safe
+        self.s3_client = boto3.session.Session().client(
             's3',
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION
+            region_name=settings.AWS_REGION,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            config=Config(
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                connect_timeout=settings.S3_CONNECT_TIMEOUT,
+                read_timeout=settings.S3_READ_TIMEOUT,
+                retries={"total_max_attempts": settings.S3_MAX_ATTEMPTS, "mode": "standard"},
+                tcp_keepalive=True
+            )
         )
         self.bucket_name = settings.S3_BUCKET_NAME
     
-    async def upload_file(self, file: UploadFile, object_name: str) -> str:
-        """Upload file to S3 and return the URL"""
+    async def upload_file(self, file: UploadFile, object_name: str) -> Dict[str, Any]:
+        """
+        Stream file to S3 in fixed-size multipart parts and return its URL, size and SHA-256.
+        Only one part is held in memory at a time and all S3 calls run in the threadpool.
+        Files over 1MB were already spooled to disk by Starlette's form parser, so this
+        reads them back from the temporary file; large files belong on the presigned upload path
+        """
+        content_type = file.content_type or 'audio/mpeg'
+        chunk_size = settings.S3_MULTIPART_CHUNK_SIZE
+        checksum = hashlib.sha256()
+        size = 0
+        upload_id = None
+        
         try:
-            # Create a temporary file to handle the upload
-            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                content = await file.read()
-                temp_file.write(content)
-                temp_file_path = temp_file.name
-            
-            # Upload to S3
-            self.s3_client.upload_file(
-                temp_file_path,
-                self.bucket_name,
-                object_name,
-                ExtraArgs={'ContentType': file.content_type or 'audio/mpeg'}
-            )
+            chunk = await self._read_chunk(file, chunk_size)
+            checksum.update(chunk)
+            size += len(chunk)
             
-            # Clean up temp file
-            os.unlink(temp_file_path)
+            if len(chunk) < chunk_size:
+                # Whole file fits in a single part, skip the multipart handshake
+                await run_in_threadpool(
+                    self.s3_client.put_object,
+                    Bucket=self.bucket_name,
+                    Key=object_name,
+                    Body=chunk,
+                    ContentType=content_type
+                )
+            else:
+                response = await run_in_threadpool(
+                    self.s3_client.create_multipart_upload,
+                    Bucket=self.bucket_name,
+                    Key=object_name,
+                    ContentType=content_type
+                )
+                upload_id = response['UploadId']
+                parts: List[Dict[str, Any]] = []
+                
+                while chunk:
+                    part_number = len(parts) + 1
+                    part = await run_in_threadpool(
+                        self.s3_client.upload_part,
+                        Bucket=self.bucket_name,
+                        Key=object_name,
+                        UploadId=upload_id,
+                        PartNumber=part_number,
+                        Body=chunk
+                    )
+                    parts.append({'ETag': part['ETag'], 'PartNumber': part_number})
+                    
+                    chunk = await self._read_chunk(file, chunk_size)
+                    checksum.update(chunk)
+                    size += len(chunk)
+                
+                await run_in_threadpool(
+                    self.s3_client.complete_multipart_upload,
+                    Bucket=self.bucket_name,
+                    Key=object_name,
+                    UploadId=upload_id,
+                    MultipartUpload={'Parts': parts}
+                )
             
             # Generate S3 URL
             s3_url = f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{object_name}"
             
-            logger.info(f"Successfully uploaded file to S3: {s3_url}")
-            return s3_url
+            logger.info(f"Successfully uploaded file to S3: {s3_url} ({size} bytes)")
+            return {
+                "s3_url": s3_url,
+                "size": size,
+                "sha256": checksum.hexdigest()
+            }
             
         except ClientError as e:
+            await self._abort_multipart_upload(object_name, upload_id)
             logger.error(f"Failed to upload file to S3: {str(e)}")
             raise Exception(f"Failed to upload file to S3: {str(e)}")
         except Exception as e:
+            await self._abort_multipart_upload(object_name, upload_id)
             logger.error(f"Unexpected error during S3 upload: {str(e)}")
             raise Exception(f"Unexpected error during S3 upload: {str(e)}")
     
+    @staticmethod
+    async def _read_chunk(file: UploadFile, chunk_size: int) -> bytes:
+        """Read up to chunk_size bytes, looping over short reads so every part but the last is full"""
+        buffer = bytearray()
+        while len(buffer) < chunk_size:
+            data = await file.read(chunk_size - len(buffer))
+            if not data:
+                break
+            buffer.extend(data)
+        return bytes(buffer)
+    
+    async def _abort_multipart_upload(self, object_name: str, upload_id: Optional[str] = None) -> None:
+        """Abort an unfinished multipart upload so S3 does not keep the orphaned parts"""
+        if upload_id is None:
+            return
+        try:
+            await run_in_threadpool(
+                self.s3_client.abort_multipart_upload,
+                Bucket=self.bucket_name,
+                Key=object_name,
+                UploadId=upload_id
+            )
+        except ClientError as e:
+            logger.error(f"Failed to abort multipart upload {upload_id}: {str(e)}")
+    
+    def generate_presigned_upload_url(
+        self, object_name: str, content_type: str, expiration: int = 3600
+    ) -> str:
+        """Generate a presigned PUT URL so clients can upload straight to S3"""
+        try:
+            return self.s3_client.generate_presigned_url(
+                'put_object',
+                Params={
+                    'Bucket': self.bucket_name,
+                    'Key': object_name,
+                    'ContentType': content_type
+                },
+                ExpiresIn=expiration
+            )
+        except ClientError as e:
+            logger.error(f"Failed to generate presigned upload URL: {str(e)}")
+            raise Exception(f"Failed to generate presigned upload URL: {str(e)}")
+    
+    def create_presigned_multipart_upload(
+        self, object_name: str, content_type: str, part_count: int, expiration: int = 3600
+    ) -> Dict[str, Any]:
+        """Start a multipart upload and presign a PUT URL for each of its parts"""
+        try:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=object_name,
+                ContentType=content_type
+            )
+            upload_id = response['UploadId']
+            part_urls = [
+                {
+                    "part_number": part_number,
+                    "url": self.s3_client.generate_presigned_url(
+                        'upload_part',
+                        Params={
+                            'Bucket': self.bucket_name,
+                            'Key': object_name,
+                            'UploadId': upload_id,
+                            'PartNumber': part_number
+                        },
+                        ExpiresIn=expiration
+                    )
+                }
+                for part_number in range(1, part_count + 1)
+            ]
+            return {"upload_id": upload_id, "part_urls": part_urls}
+        except ClientError as e:
+            logger.error(f"Failed to create multipart upload: {str(e)}")
+            raise Exception(f"Failed to create multipart upload: {str(e)}")
+    
+    def complete_multipart_upload(
+        self, object_name: str, upload_id: str, parts: List[Dict[str, Any]]
+    ) -> None:
+        """Assemble client-uploaded parts into the final object"""
+        try:
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=object_name,
+                UploadId=upload_id,
+                MultipartUpload={
+                    'Parts': [
+                        {'ETag': part["etag"], 'PartNumber': part["part_number"]}
+                        for part in sorted(parts, key=lambda part: part["part_number"])
+                    ]
+                }
+            )
+        except ClientError as e:
+            logger.error(f"Failed to complete multipart upload {upload_id}: {str(e)}")
+            raise Exception(f"Failed to complete multipart upload: {str(e)}")
+    
+    def head_object(self, object_name: str) -> Optional[Dict[str, Any]]:
+        """Return object metadata, or None if the object does not exist"""
+        try:
+            return self.s3_client.head_object(Bucket=self.bucket_name, Key=object_name)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            logger.error(f"Failed to fetch metadata for {object_name}: {str(e)}")
+            raise Exception(f"Failed to fetch S3 object metadata: {str(e)}")
+    
+    def read_range(self, object_name: str, offset: int, length: int) -> bytes:
+        """Read length bytes of an object starting at offset, fewer at its end"""
+        try:
+            response = self.s3_client.get_object(
+                Bucket=self.bucket_name,
+                Key=object_name,
+                Range=f"bytes={offset}-{offset + length - 1}"
+            )
+            return response['Body'].read()
+        except ClientError as e:
+            logger.error(f"Failed to read {object_name} at offset {offset}: {str(e)}")
+            raise Exception(f"Failed to read S3 object: {str(e)}")
+    
+    def delete_object(self, object_name: str) -> None:
+        """Delete an object; deleting a missing object is not an error"""
+        try:
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=object_name)
+        except ClientError as e:
+            logger.error(f"Failed to delete {object_name}: {str(e)}")
+            raise Exception(f"Failed to delete S3 object: {str(e)}")
+    
     def generate_presigned_url(self, object_name: str, expiration: int = 3600) -> str:
         """Generate a presigned URL for S3 object"""
         try:
@@ -64,4 +249,8 @@ class S3Service:
             logger.error(f"Failed to generate presigned URL: {str(e)}")
             raise Exception(f"Failed to generate presigned URL: {str(e)}")
 
-s3_service = S3Service()
+_s3_service = ProcessLocal(S3Service)
+
+def get_s3_service() -> S3Service:
+    """This process's S3 service, built on first use and again in forked children"""
+    return _s3_service.get()
@@ -0,0 +1,77 @@
+"""
+Interface between the workers and the speech-to-text provider.
+
+Workers submit audio, poll whether a transcript is finished, fetch it and
+cancel transcripts that are no longer needed only through a
+TranscriptionBackend. TRANSCRIPTION_BACKEND picks the implementation:
+"assemblyai" for the real API, or "local" for a deterministic offline fake that
+lets the whole pipeline run and be load tested without the live API.
+"""
+from typing import Any, Dict, Optional, Protocol
+from app.core.config import settings
+from app.utils.process_local import ProcessLocal
+from app.utils.transcript_stitcher import ChunkTranscript
+
+BACKENDS = ("assemblyai", "local")
+
+class TranscriptionFailedError(Exception):
+    """Raised when the provider reports that a transcript has failed or rejects the request for one"""
+
+class TranscriptionBackend(Protocol):
+    def submit_transcription(
+        self,
+        audio_url: str,
+        enable_speaker_diarization: bool = True,
+        enable_sentiment_analysis: bool = True,
+        webhook_url: Optional[str] = None,
+        webhook_auth_header_name: Optional[str] = None,
+        webhook_auth_header_value: Optional[str] = None,
+        audio_start_from: Optional[int] = None,
+        audio_end_at: Optional[int] = None
+    ) -> str:
+        """
+        Submit audio without waiting for it and return the transcript ID.
+        Raises TranscriptionFailedError when resubmitting cannot succeed
+        """
+        ...
+    
+    def poll_transcription(self, transcript_id: str) -> bool:
+        """Whether a transcript has finished, successfully or not"""
+        ...
+    
+    def get_transcription_result(
+        self,
+        transcript_id: str,
+        enable_speaker_diarization: bool = True,
+        enable_sentiment_analysis: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a transcript once. Returns None while it is still in progress and
+        raises TranscriptionFailedError if it failed
+        """
+        ...
+    
+    def get_chunk_transcript(self, transcript_id: str, start_ms: int, end_ms: int) -> Optional[ChunkTranscript]:
+        """Fetch one chunk's transcript once, with timestamps relative to start_ms, or None while in progress"""
+        ...
+    
+    def cancel_transcription(self, transcript_id: str) -> None:
+        """Give up on a transcript that is no longer needed. Best effort, never raises"""
+        ...
+
+def _build_backend() -> TranscriptionBackend:
+    if settings.TRANSCRIPTION_BACKEND == "assemblyai":
+        from app.services.assemblyai_service import AssemblyAIService
+        return AssemblyAIService()
+    if settings.TRANSCRIPTION_BACKEND == "local":
+        from app.services.local_backend import LocalTranscriptionBackend
+        return LocalTranscriptionBackend()
+    raise ValueError(
+        f"Unknown transcription backend {settings.TRANSCRIPTION_BACKEND!r}, expected one of {', '.join(BACKENDS)}"
+    )
+
+_backend = ProcessLocal(_build_backend)
+
+def get_transcription_backend() -> TranscriptionBackend:
+    """This process's configured backend, built on first use and again in forked children"""
+    return _backend.get()
@@ -0,0 +1,305 @@
+"""
+Audio duration, sample rate and channel count from container headers.
+
+Supports WAV, MP3, Ogg (Vorbis and Opus) and M4A. Only headers are parsed,
+no audio is decoded, and files are read through a callable that returns a
+byte range, so the same code probes a local upload or an S3 object with range
+requests. Most files need a single read of the first PROBE_SIZE bytes; MP3s
+with large ID3 tags, Ogg files (duration is in the last page) and M4As with
+the moov box at the end need one or two more, and WAVs with large chunks, such
+as LIST metadata, before the audio one more per chunk header past the first read.
+"""
+import struct
+from typing import BinaryIO, Callable, Iterator, NamedTuple, Optional, Tuple
+
+# Bytes read from the start of a file, and from any later position probed
+PROBE_SIZE = 64 * 1024
+# Top-level M4A boxes walked before giving up on finding moov
+MAX_MP4_BOXES = 32
+# WAV chunks walked before giving up on finding data
+MAX_WAV_CHUNKS = 32
+
+# (offset, length) -> bytes; may return fewer bytes at the end of the file
+Reader = Callable[[int, int], bytes]
+
+class AudioProbeError(ValueError):
+    """Raised when a file is not audio in a supported container, or its headers are corrupt"""
+
+class AudioInfo(NamedTuple):
+    format: str  # wav, mp3, ogg or m4a
+    duration: float  # in seconds
+    sample_rate: int
+    channels: int
+
+def probe_audio(read: Reader, size: int) -> AudioInfo:
+    """Probe a file of size bytes read through read"""
+    if size <= 0:
+        raise AudioProbeError("File is empty")
+    head = read(0, min(size, PROBE_SIZE))
+    try:
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            info = _probe_wav(head, read, size)
+        elif head[:4] == b"OggS":
+            info = _probe_ogg(head, read, size)
+        elif head[4:8] == b"ftyp":
+            info = _probe_mp4(head, read, size)
+        else:
+            info = _probe_mp3(head, read, size)
+    except struct.error:
+        raise AudioProbeError("Truncated audio file header")
+    if info.sample_rate <= 0 or info.channels <= 0 or info.duration < 0:
+        raise AudioProbeError(f"Invalid {info.format.upper()} stream parameters")
+    return info
+
+def probe_file(file: BinaryIO, size: int) -> AudioInfo:
+    """Probe a seekable file, leaving it positioned at the start"""
+    def read(offset: int, length: int) -> bytes:
+        file.seek(offset)
+        return file.read(length)
+    try:
+        return probe_audio(read, size)
+    finally:
+        file.seek(0)
+
+def _probe_wav(head: bytes, read: Reader, size: int) -> AudioInfo:
+    fmt = None
+    offset = 12
+    for _ in range(MAX_WAV_CHUNKS):
+        # Chunk headers past the first read, e.g. after a large LIST chunk, are read on their own
+        data, start = (head, offset) if offset + 24 <= len(head) or size <= len(head) else (read(offset, 24), 0)
+        if start + 8 > len(data):
+            break
+        chunk_id, chunk_size = struct.unpack_from("<4sI", data, start)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            if chunk_size < 16 or start + 24 > len(data):
+                raise AudioProbeError("Truncated WAV fmt chunk")
+            _, channels, sample_rate, byte_rate = struct.unpack_from("<HHII", data, start + 8)
+            fmt = channels, sample_rate, byte_rate
+        elif chunk_id == b"data":
+            if fmt is None or not fmt[2]:
+                raise AudioProbeError("WAV data chunk without a valid fmt chunk")
+            channels, sample_rate, byte_rate = fmt
+            # Streaming writers leave the size unset; the data then runs to the end of the file
+            data_size = min(chunk_size, size - body)
+            return AudioInfo("wav", data_size / byte_rate, sample_rate, channels)
+        offset = body + chunk_size + (chunk_size & 1)
+    raise AudioProbeError("No WAV data chunk in the file")
+
+# Bitrates in kbps by (MPEG-1, layer) and bitrate index
+MPEG_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates by the header's version bits (MPEG-1, MPEG-2, MPEG-2.5) and rate index
+MPEG_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+class MpegFrame(NamedTuple):
+    length: int  # in bytes, header included
+    samples: int
+    sample_rate: int
+    channels: int
+    bitrate: int  # in bits per second
+    side_info: int  # bytes between the header and a Xing/Info tag
+
+def _mpeg_frame(data: bytes, offset: int) -> Optional[MpegFrame]:
+    """The MPEG audio frame whose header starts at offset, or None if there is none"""
+    if offset + 4 > len(data):
+        return None
+    header = struct.unpack_from(">I", data, offset)[0]
+    version, layer_bits = (header >> 19) & 3, (header >> 17) & 3
+    bitrate_index, rate_index = (header >> 12) & 0xF, (header >> 10) & 3
+    if header >> 21 != 0x7FF or version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1, layer = version == 3, 4 - layer_bits
+    bitrate = MPEG_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = MPEG_SAMPLE_RATES[version][rate_index]
+    padding = (header >> 9) & 1
+    channels = 1 if (header >> 6) & 3 == 3 else 2
+    if layer == 1:
+        samples, length = 384, (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if mpeg1 or layer == 2 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    side_info = (32 if channels == 2 else 17) if mpeg1 else (17 if channels == 2 else 9)
+    return MpegFrame(length, samples, sample_rate, channels, bitrate, side_info)
+
+def _probe_mp3(head: bytes, read: Reader, size: int) -> AudioInfo:
+    # File offset of head[0], and where the audio starts in head
+    base = offset = 0
+    if head[:3] == b"ID3" and len(head) >= 10:
+        tag_size = (head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | head[9] & 0x7F
+        offset = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+        if offset >= size:
+            raise AudioProbeError("MP3 file has no audio after its ID3 tag")
+        if offset + 4 > len(head):
+            # Cover art can push the audio past the first read
+            base, offset = offset, 0
+            head = read(base, min(size - base, PROBE_SIZE))
+
+    # A frame counts once the next one follows it, so stray sync bits in tags or junk are skipped
+    while True:
+        offset = head.find(b"\xff", offset)
+        if offset < 0:
+            raise AudioProbeError("Not a WAV, MP3, Ogg or M4A file")
+        frame = _mpeg_frame(head, offset)
+        if frame is not None:
+            following = offset + frame.length
+            if base + following == size or _mpeg_frame(head, following) or (
+                following + 4 > len(head) and base + following < size
+            ):
+                break
+        offset += 1
+
+    audio_bytes = size - base - offset
+    # VBR files carry their frame count in a Xing/Info or VBRI tag in the first frame
+    tag_offset = offset + 4 + frame.side_info
+    frame_count = None
+    if head[tag_offset:tag_offset + 4] in (b"Xing", b"Info") and len(head) >= tag_offset + 12:
+        flags = struct.unpack_from(">I", head, tag_offset + 4)[0]
+        if flags & 1:
+            frame_count = struct.unpack_from(">I", head, tag_offset + 8)[0]
+    elif head[offset + 36:offset + 40] == b"VBRI" and len(head) >= offset + 54:
+        frame_count = struct.unpack_from(">I", head, offset + 50)[0]
+
+    if frame_count:
+        duration = frame_count * frame.samples / frame.sample_rate
+    else:
+        duration = audio_bytes * 8 / frame.bitrate
+    return AudioInfo("mp3", duration, frame.sample_rate, frame.channels)
+
+def _ogg_page(data: bytes, offset: int) -> Tuple[int, int, int]:
+    """Granule position, stream serial number and body offset of the Ogg page at offset"""
+    if offset + 27 > len(data) or data[offset:offset + 4] != b"OggS":
+        raise AudioProbeError("Corrupt Ogg page")
+    granule, serial = struct.unpack_from("<qI", data, offset + 6)
+    segments = data[offset + 26]
+    return granule, serial, offset + 27 + segments
+
+def _probe_ogg(head: bytes, read: Reader, size: int) -> AudioInfo:
+    _, serial, body = _ogg_page(head, 0)
+    packet = head[body:body + 19]
+    if packet[:7] == b"\x01vorbis" and len(packet) >= 16:
+        channels, sample_rate = struct.unpack_from("<BI", packet, 11)
+        granule_rate, pre_skip = sample_rate, 0
+    elif packet[:8] == b"OpusHead" and len(packet) >= 16:
+        channels, pre_skip, sample_rate = struct.unpack_from("<BHI", packet, 9)
+        # Opus always runs at 48kHz; the header only records the input rate
+        granule_rate, sample_rate = 48000, sample_rate or 48000
+    else:
+        raise AudioProbeError("Unsupported Ogg codec, expected Vorbis or Opus")
+    if not granule_rate:
+        raise AudioProbeError("Invalid Ogg sample rate")
+
+    # The last page with a granule position gives the total sample count
+    tail_start = max(0, size - PROBE_SIZE)
+    tail = head[tail_start:] if size <= len(head) else read(tail_start, size - tail_start)
+    offset = len(tail)
+    while True:
+        offset = tail.rfind(b"OggS", 0, offset)
+        if offset < 0:
+            raise AudioProbeError("No final Ogg page, the file may be truncated")
+        try:
+            granule, page_serial, _ = _ogg_page(tail, offset)
+        except AudioProbeError:
+            continue
+        if page_serial == serial and granule >= 0:
+            break
+    return AudioInfo("ogg", max(0, granule - pre_skip) / granule_rate, sample_rate, channels)
+
+def _mp4_box_header(data: bytes, offset: int, end: int) -> Optional[Tuple[bytes, int, int]]:
+    """Type, body offset and end offset of the box at offset, None past the end of data"""
+    if offset + 8 > end:
+        return None
+    box_size, box_type = struct.unpack_from(">I4s", data, offset)
+    header = 8
+    if box_size == 1:
+        if offset + 16 > end:
+            return None
+        box_size, header = struct.unpack_from(">Q", data, offset + 8)[0], 16
+    elif box_size == 0:
+        return box_type, offset + header, None
+    if box_size < header:
+        raise AudioProbeError("Corrupt M4A box")
+    return box_type, offset + header, offset + box_size
+
+def _mp4_boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Child boxes between start and end, cut off at the end of a truncated read"""
+    offset = start
+    while True:
+        box = _mp4_box_header(data, offset, end)
+        if box is None:
+            return
+        box_type, body, box_end = box
+        box_end = end if box_end is None else box_end
+        yield box_type, body, min(box_end, end)
+        offset = box_end
+
+def _mp4_child(data: bytes, start: int, end: int, wanted: bytes) -> Optional[Tuple[int, int]]:
+    for box_type, body, box_end in _mp4_boxes(data, start, end):
+        if box_type == wanted:
+            return body, box_end
+    return None
+
+def _probe_moov(moov: bytes) -> AudioInfo:
+    """Duration and sample entry of the first sound track in a moov box"""
+    for box_type, trak, trak_end in _mp4_boxes(moov, 0, len(moov)):
+        if box_type != b"trak":
+            continue
+        mdia = _mp4_child(moov, trak, trak_end, b"mdia")
+        if mdia is None:
+            continue
+        hdlr = _mp4_child(moov, *mdia, b"hdlr")
+        if hdlr is None or moov[hdlr[0] + 8:hdlr[0] + 12] != b"soun":
+            continue
+
+        mdhd = _mp4_child(moov, *mdia, b"mdhd")
+        if mdhd is None:
+            raise AudioProbeError("M4A sound track has no mdhd box")
+        body = mdhd[0]
+        if moov[body:body + 1] == b"\x01":
+            timescale, duration = struct.unpack_from(">IQ", moov, body + 20)
+        else:
+            timescale, duration = struct.unpack_from(">II", moov, body + 12)
+        if not timescale:
+            raise AudioProbeError("M4A sound track has no timescale")
+
+        minf = _mp4_child(moov, *mdia, b"minf")
+        stbl = minf and _mp4_child(moov, *minf, b"stbl")
+        stsd = stbl and _mp4_child(moov, *stbl, b"stsd")
+        if not stsd:
+            raise AudioProbeError("M4A sound track has no sample description")
+        # Audio sample entry: 8 reserved bytes after the box's 8, then channel count and 16.16 sample rate
+        entry = stsd[0] + 8
+        if entry + 36 > stsd[1]:
+            raise AudioProbeError("Truncated M4A sample description")
+        channels = struct.unpack_from(">H", moov, entry + 24)[0]
+        sample_rate = struct.unpack_from(">I", moov, entry + 32)[0] >> 16
+        # Rates above 65535Hz do not fit the field, the track timescale holds them instead
+        return AudioInfo("m4a", duration / timescale, sample_rate or timescale, channels)
+    raise AudioProbeError("M4A file has no sound track")
+
+def _probe_mp4(head: bytes, read: Reader, size: int) -> AudioInfo:
+    offset = 0
+    for _ in range(MAX_MP4_BOXES):
+        if offset >= size:
+            break
+        data, start = (head, offset) if offset + 16 <= len(head) or size <= len(head) else (read(offset, 16), 0)
+        box = _mp4_box_header(data, start, len(data))
+        if box is None:
+            break
+        box_type, body, box_end = box
+        box_end = size if box_end is None else offset + box_end - start
+        if box_type == b"moov":
+            # Sample tables come after what is needed here, so a long moov is read only in part
+            length = min(box_end, size) - offset
+            moov = head[offset:offset + length] if offset + length <= len(head) else read(offset, min(length, PROBE_SIZE))
+            header_size = body - start
+            return _probe_moov(moov[header_size:])
+        offset = box_end
+    raise AudioProbeError("No moov box in the M4A file")
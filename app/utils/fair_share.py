@@ -0,0 +1,78 @@
+"""
+Fair-share ordering of queued work across tenants.
+
+The outbox relay only publishes as many messages as a broker queue has room
+for, so the order it picks pending messages in decides who waits. Policies:
+
+- fifo: oldest message first, so one tenant's bulk upload delays everyone
+  who submits after it
+- round_robin: tenants with pending messages take turns
+- weighted: weighted round robin, a tenant with weight w gets w turns for
+  every turn of a tenant with weight 1 (default weight 1)
+
+The round robin policies use stride scheduling. Every tenant has a pass value
+that grows by 1 / weight each time one of its messages is picked, and the
+tenant with the lowest pass goes next, ties going to the older message. A
+tenant that had nothing pending joins at the lowest pass among the busy
+tenants, so it cannot save up turns while idle or be starved by a long backlog.
+"""
+import heapq
+from collections import defaultdict
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence
+
+POLICIES = ("fifo", "round_robin", "weighted")
+
+class PendingMessage(NamedTuple):
+    id: int
+    tenant: Optional[int]
+
+class FairShareScheduler:
+    """Picks pending messages for one queue, remembering each tenant's share between calls"""
+
+    def __init__(self, policy: str, weights: Optional[Mapping[int, float]] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy {policy!r}, expected one of {', '.join(POLICIES)}")
+        invalid = {tenant: weight for tenant, weight in (weights or {}).items() if not weight > 0}
+        if invalid:
+            raise ValueError(f"Tenant weights must be positive, got {invalid}")
+        self.policy = policy
+        self.weights = dict(weights or {}) if policy == "weighted" else {}
+        self.passes: Dict[Optional[int], float] = {}
+        self.virtual_time = 0.0
+
+    def pick(self, pending: Sequence[PendingMessage], slots: int) -> List[PendingMessage]:
+        """
+        The next slots messages to publish. Only the first slots messages of
+        each tenant can be picked, so callers may pass just those
+        """
+        by_age = sorted(pending, key=lambda message: message.id)
+        if self.policy == "fifo" or slots <= 0:
+            return by_age[:max(0, slots)]
+
+        backlogs: Dict[Optional[int], List[PendingMessage]] = defaultdict(list)
+        for message in by_age:
+            backlogs[message.tenant].append(message)
+
+        # Idle tenants rejoin at the current virtual time; tenants behind it have no turns to catch up on
+        known = [self.passes[tenant] for tenant in backlogs if tenant in self.passes]
+        if known:
+            self.virtual_time = max(self.virtual_time, min(known))
+        self.passes = {
+            tenant: tenant_pass for tenant, tenant_pass in self.passes.items()
+            if tenant in backlogs or tenant_pass > self.virtual_time
+        }
+        for tenant in backlogs:
+            self.passes[tenant] = max(self.passes.get(tenant, 0.0), self.virtual_time)
+
+        turns = [(self.passes[tenant], backlog[0].id, tenant, 0) for tenant, backlog in backlogs.items()]
+        heapq.heapify(turns)
+        picked = []
+        while turns and len(picked) < slots:
+            tenant_pass, _, tenant, index = heapq.heappop(turns)
+            backlog = backlogs[tenant]
+            picked.append(backlog[index])
+            tenant_pass += 1.0 / self.weights.get(tenant, 1.0)
+            self.passes[tenant] = tenant_pass
+            if index + 1 < len(backlog):
+                heapq.heappush(turns, (tenant_pass, backlog[index + 1].id, tenant, index + 1))
+        return picked
@@ -0,0 +1,34 @@
+from prometheus_client import Gauge, Histogram, start_http_server
+from sqlalchemy.engine import Engine
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    ["engine"]
+)
+DB_POOL_IDLE = Gauge(
+    "db_pool_idle_connections",
+    "Connections currently idle in the pool",
+    ["engine"]
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections opened above the pool size",
+    ["engine"]
+)
+
+def register_pool_metrics(label: str, engine: Engine) -> None:
+    """Export pool usage gauges, reading engine.pool on scrape so a recreated pool is picked up"""
+    DB_POOL_CHECKED_OUT.labels(label).set_function(lambda: engine.pool.checkedout())
+    DB_POOL_IDLE.labels(label).set_function(lambda: engine.pool.checkedin())
+    DB_POOL_OVERFLOW.labels(label).set_function(lambda: max(engine.pool.overflow(), 0))
+
+def start_worker_metrics_server(base_port: int, process_index: int) -> None:
+    """Serve metrics for one Celery process on its own port"""
+    start_http_server(base_port + process_index)
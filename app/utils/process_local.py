@@ -0,0 +1,50 @@
+"""
+Lazily built objects that belong to one process.
+
+HTTP clients hold pooled sockets, and a forked Celery child that kept using its
+parent's client would share those sockets with the parent and its siblings.
+A ProcessLocal builds its object on first use and builds a fresh one when it
+is used from a different process, so nothing is created at import time and
+nothing crosses a fork.
+"""
+import os
+import threading
+import weakref
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+class ProcessLocal(Generic[T]):
+    _instances: "weakref.WeakSet[ProcessLocal]" = weakref.WeakSet()
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._pid: Optional[int] = None
+        ProcessLocal._instances.add(self)
+
+    def get(self) -> T:
+        """The object for the current process, built on first use"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._value = self._factory()
+                    self._pid = os.getpid()
+        return self._value
+
+    def reset(self) -> None:
+        """
+        Forget the object without closing it, since an inherited one's sockets
+        still belong to the parent. Also replaces the lock, which another thread
+        may have held at fork time
+        """
+        self._lock = threading.Lock()
+        self._value = None
+        self._pid = None
+
+    @classmethod
+    def reset_all(cls) -> None:
+        """Reset every ProcessLocal, for use right after a fork"""
+        for instance in list(cls._instances):
+            instance.reset()
@@ -0,0 +1,241 @@
+"""
+Compact columnar encoding for utterance and sentiment segment lists.
+
+Segments arrive as lists of dicts that repeat the same keys on every entry.
+They are stored as one column per key instead: integer columns (start/end
+timestamps) are delta encoded, low-cardinality string columns (speaker,
+sentiment) go through a dictionary, and everything else is kept as a plain
+array. Segments are split into blocks of BLOCK_SIZE that are compressed
+separately, with zstd when the zstandard package is installed and zlib
+otherwise. The first two bytes record the format version and compression, so
+blobs written either way, or in the older single-block format, can always be
+decoded.
+
+An uncompressed header in front of the blocks records where each block lies
+and, when segments are in start order, each block's first start and the
+running maximum of end times up to its last segment. A time-window lookup
+reads the header, binary searches it, and decompresses only the blocks that
+can overlap the window.
+"""
+import hashlib
+import json
+import struct
+import zlib
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Version 1 blobs hold the whole payload, index included, in one compressed JSON document
+SINGLE_BLOCK_VERSION = 1
+FORMAT_VERSION = 2
+COMPRESSION_ZLIB = 0
+COMPRESSION_ZSTD = 1
+# Segments per separately compressed block
+BLOCK_SIZE = 256
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _encode_column(values: List[Any], dictionary_encode: bool) -> Dict[str, Any]:
+    if values and all(_is_int(value) for value in values):
+        deltas = [values[0]] + [values[i] - values[i - 1] for i in range(1, len(values))]
+        return {"t": "delta", "v": deltas}
+
+    if dictionary_encode and all(value is None or isinstance(value, str) for value in values):
+        distinct = list(dict.fromkeys(value for value in values if value is not None))
+        # Only worth it when values repeat
+        if len(distinct) <= len(values) // 2:
+            codes = {value: index for index, value in enumerate(distinct)}
+            return {"t": "dict", "d": distinct, "v": [codes.get(value, -1) for value in values]}
+
+    return {"t": "raw", "v": values}
+
+def _decode_column(column: Dict[str, Any]) -> List[Any]:
+    if column["t"] == "delta":
+        values, total = [], 0
+        for delta in column["v"]:
+            total += delta
+            values.append(total)
+        return values
+    if column["t"] == "dict":
+        dictionary = column["d"]
+        return [dictionary[code] if code >= 0 else None for code in column["v"]]
+    return column["v"]
+
+def _compress(payload: bytes) -> Tuple[int, bytes]:
+    if zstandard is not None:
+        return COMPRESSION_ZSTD, zstandard.ZstdCompressor(level=10).compress(payload)
+    return COMPRESSION_ZLIB, zlib.compress(payload, 6)
+
+def _decompress(compression: int, data: bytes) -> bytes:
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise ValueError("Segments are zstd compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+    raise ValueError("Unsupported segment compression")
+
+def _time_index(segments: List[Dict[str, Any]]) -> Optional[List[int]]:
+    """Running maximum of end times, only usable when starts are sorted"""
+    if not segments or "start" not in segments[0] or "end" not in segments[0]:
+        return None
+    starts = [segment["start"] for segment in segments]
+    ends = [segment["end"] for segment in segments]
+    if not all(_is_int(value) for value in starts + ends):
+        return None
+    if any(starts[i] < starts[i - 1] for i in range(1, len(starts))):
+        return None
+    return list(accumulate(ends, max))
+
+def _encode_block(segments: List[Dict[str, Any]], keys: Optional[List[str]]) -> bytes:
+    if keys is None:
+        # Mixed shapes are stored row by row so nothing is lost
+        payload = {"rows": segments}
+    else:
+        payload = {
+            "columns": [
+                _encode_column([segment[key] for segment in segments], dictionary_encode=key != "text")
+                for key in keys
+            ]
+        }
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+def _decode_block(payload: Dict[str, Any], keys: Optional[List[str]], count: int) -> List[Dict[str, Any]]:
+    if "rows" in payload:
+        return payload["rows"]
+    columns = [_decode_column(column) for column in payload["columns"]]
+    return [{key: column[index] for key, column in zip(keys, columns)} for index in range(count)]
+
+def encode_segments(segments: Optional[List[Dict[str, Any]]]) -> Optional[bytes]:
+    """Encode a list of segment dicts. None stays None"""
+    if segments is None:
+        return None
+
+    keys = list(segments[0]) if segments else []
+    if any(list(segment) != keys for segment in segments):
+        keys = None
+
+    compression = COMPRESSION_ZLIB
+    blocks, lengths = [], []
+    for offset in range(0, len(segments), BLOCK_SIZE):
+        compression, block = _compress(_encode_block(segments[offset:offset + BLOCK_SIZE], keys))
+        blocks.append(block)
+        lengths.append(len(block))
+
+    header = {"n": len(segments), "keys": keys, "block_size": BLOCK_SIZE, "lengths": lengths}
+    index = _time_index(segments) if keys is not None else None
+    if index is not None:
+        header["first_start"] = [segments[offset]["start"] for offset in range(0, len(segments), BLOCK_SIZE)]
+        header["max_end"] = index[BLOCK_SIZE - 1::BLOCK_SIZE]
+        if len(segments) % BLOCK_SIZE:
+            header["max_end"].append(index[-1])
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    return (
+        bytes([FORMAT_VERSION, compression])
+        + struct.pack(">I", len(header_bytes))
+        + header_bytes
+        + b"".join(blocks)
+    )
+
+class _Blob:
+    """Header of an encoded blob, with access to its blocks one at a time"""
+    
+    def __init__(self, blob: bytes):
+        if len(blob) < 2 or blob[0] not in (SINGLE_BLOCK_VERSION, FORMAT_VERSION):
+            raise ValueError("Unsupported segment encoding")
+        self.blob = blob
+        self.compression = blob[1]
+        if blob[0] == SINGLE_BLOCK_VERSION:
+            self._read_single_block()
+            return
+        
+        (header_length,) = struct.unpack_from(">I", blob, 2)
+        body = 6 + header_length
+        header = json.loads(blob[6:body])
+        self.n = header["n"]
+        self.keys = header["keys"]
+        self.block_size = header["block_size"]
+        self.first_start = header.get("first_start")
+        self.max_end = header.get("max_end")
+        self.offsets = list(accumulate(header["lengths"], initial=body))
+        self._single_block = None
+    
+    def _read_single_block(self) -> None:
+        payload = json.loads(_decompress(self.compression, self.blob[2:]))
+        self.n = payload["n"]
+        self.keys = payload.get("keys")
+        self.block_size = max(self.n, 1)
+        self.first_start = self.max_end = None
+        self.offsets = [0, 0]
+        self._single_block = payload
+    
+    @property
+    def block_count(self) -> int:
+        return len(self.offsets) - 1
+    
+    def block(self, index: int) -> List[Dict[str, Any]]:
+        if self._single_block is not None:
+            return _decode_block(self._single_block, self.keys, self.n)
+        data = self.blob[self.offsets[index]:self.offsets[index + 1]]
+        count = min(self.block_size, self.n - index * self.block_size)
+        return _decode_block(json.loads(_decompress(self.compression, data)), self.keys, count)
+
+def decode_segments(blob: Optional[bytes]) -> Optional[List[Dict[str, Any]]]:
+    """Rebuild the list of segment dicts written by encode_segments"""
+    if blob is None:
+        return None
+
+    encoded = _Blob(bytes(blob))
+    segments = []
+    for index in range(encoded.block_count):
+        segments.extend(encoded.block(index))
+    return segments
+
+def _overlaps(segment: Dict[str, Any], start_ms: Optional[int], end_ms: Optional[int]) -> bool:
+    if start_ms is not None and segment.get("end") is not None and segment["end"] <= start_ms:
+        return False
+    if end_ms is not None and segment.get("start") is not None and segment["start"] >= end_ms:
+        return False
+    return True
+
+def segments_in_window(
+    blob: Optional[bytes],
+    start_ms: Optional[int] = None,
+    end_ms: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the segments overlapping [start_ms, end_ms) in stored order.
+    Either bound may be None for an open window
+    """
+    if blob is None:
+        return
+
+    encoded = _Blob(bytes(blob))
+    lo, hi = 0, encoded.block_count
+    if encoded.max_end is not None:
+        if start_ms is not None:
+            # First block with a segment, in it or before it, that ends past start_ms
+            lo = bisect_right(encoded.max_end, start_ms)
+        if end_ms is not None:
+            hi = bisect_left(encoded.first_start, end_ms)
+
+    for index in range(lo, hi):
+        for segment in encoded.block(index):
+            if _overlaps(segment, start_ms, end_ms):
+                yield segment
+
+def segments_etag(*blobs: Optional[bytes]) -> str:
+    """Content hash of the stored segment blobs, used as the HTTP ETag"""
+    digest = hashlib.sha256()
+    for blob in blobs:
+        data = bytes(blob) if blob is not None else b""
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()[:32]
@@ -0,0 +1,215 @@
+"""
+Chunk planning for long recordings and stitching of the chunk transcripts.
+
+A long recording is transcribed as overlapping chunks in parallel. Each chunk
+comes back with timestamps relative to its own start and with its own speaker
+labels, so the transcripts cannot simply be concatenated. Stitching:
+
+- offsets each chunk's timestamps by the chunk's position in the recording
+- places a seam in every overlap at the longest pause that neither chunk heard
+  speech in, away from the chunk edges where words may be cut off. Each chunk
+  keeps only the words and segments on its side of the seams, so words spoken
+  in an overlap appear once
+- maps each chunk's speaker labels onto the labels already in use, pairing the
+  speakers that talk at the same time in the overlap for longest. A speaker
+  silent throughout an overlap has no counterpart there, and is carried
+  forward to a label no other speaker in the chunk has, the chunk's most
+  talkative speakers to the labels talked most under. New labels are only
+  used once every existing one is taken, i.e. when a chunk has more speakers
+  than were heard so far. When several speakers are silent in an overlap this
+  is a best guess, so longer overlaps keep speaker labels more accurate
+
+Cutting at pauses needs no audio decoding: the overlap means both neighbours
+transcribe the audio around a cut, and their word timings show where it is quiet.
+
+Everything here works on plain values, so it runs the same in a Celery task,
+a benchmark or a test.
+"""
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# Words this close to a chunk edge may be cut off, so seams are kept further in
+EDGE_MS = 1000
+
+class Word(NamedTuple):
+    text: str
+    start: int  # in milliseconds
+    end: int
+    confidence: float
+    speaker: Optional[str] = None
+
+class ChunkTranscript(NamedTuple):
+    start_ms: int  # position of the chunk in the recording
+    end_ms: int
+    words: List[Word]  # timestamps relative to start_ms
+    sentiments: List[Dict[str, Any]]  # sentiment segments, with start and end relative to start_ms
+    summary: Optional[str] = None
+
+class StitchedTranscript(NamedTuple):
+    text: str
+    confidence: Optional[float]
+    words: List[Word]
+    utterances: List[Dict[str, Any]]  # consecutive words of one speaker
+    sentiments: List[Dict[str, Any]]
+    summary: Optional[str]
+
+def plan_chunks(duration_ms: int, chunk_ms: int, overlap_ms: int) -> List[Tuple[int, int]]:
+    """Equal-length (start, end) chunks covering the recording, each overlapping the next by overlap_ms"""
+    if chunk_ms <= overlap_ms:
+        raise ValueError("Chunks must be longer than their overlap")
+    if duration_ms <= chunk_ms:
+        return [(0, duration_ms)]
+    count = math.ceil((duration_ms - overlap_ms) / (chunk_ms - overlap_ms))
+    step = (duration_ms - overlap_ms) / count
+    return [
+        (round(index * step), min(duration_ms, round((index + 1) * step + overlap_ms)))
+        for index in range(count)
+    ]
+
+def chunk_from_json(data: Sequence[Any]) -> ChunkTranscript:
+    """Rebuild a ChunkTranscript that went through JSON, e.g. as a Celery task result"""
+    start_ms, end_ms, words, sentiments, summary = data
+    return ChunkTranscript(start_ms, end_ms, [Word(*word) for word in words], sentiments, summary)
+
+def _shift(words: Iterable[Word], offset: int) -> List[Word]:
+    return [word._replace(start=word.start + offset, end=word.end + offset) for word in words]
+
+def _midpoint(start: int, end: int) -> float:
+    return (start + end) / 2
+
+def _seam(previous: List[Word], current: List[Word], overlap_start: int, overlap_end: int) -> float:
+    """Middle of the longest pause in the overlap, in absolute milliseconds"""
+    edge = min(EDGE_MS, (overlap_end - overlap_start) // 4)
+    low, high = overlap_start + edge, overlap_end - edge
+    if high <= low:
+        return _midpoint(overlap_start, overlap_end)
+
+    speech = sorted(
+        (word.start, word.end) for word in previous + current
+        if word.end > low and word.start < high
+    )
+    best_gap, seam = -1, _midpoint(low, high)
+    cursor = low
+    for start, end in speech + [(high, high)]:
+        start = min(start, high)
+        if start - cursor > best_gap:
+            best_gap, seam = start - cursor, _midpoint(cursor, start)
+        cursor = max(cursor, end)
+        if cursor >= high:
+            break
+    return seam
+
+def _speaker_label(index: int) -> str:
+    """A, B, ..., Z, AA, AB, ... like the provider's own labels"""
+    label = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        label = chr(ord("A") + remainder) + label
+    return label
+
+def _match_speakers(
+    previous: List[Word],
+    current: List[Word],
+    overlap_start: int,
+    overlap_end: int
+) -> Dict[Optional[str], Optional[str]]:
+    """Current chunk's labels paired with the previous chunk's, by time spoken together in the overlap"""
+    together: Dict[Tuple[Optional[str], Optional[str]], int] = defaultdict(int)
+    previous_words = [word for word in previous if word.end > overlap_start and word.start < overlap_end]
+    current_words = [word for word in current if word.end > overlap_start and word.start < overlap_end]
+    for previous_word in previous_words:
+        for current_word in current_words:
+            shared = min(previous_word.end, current_word.end) - max(previous_word.start, current_word.start)
+            if shared > 0:
+                together[(previous_word.speaker, current_word.speaker)] += shared
+
+    matches: Dict[Optional[str], Optional[str]] = {}
+    used = set()
+    for (previous_speaker, current_speaker), _ in sorted(together.items(), key=lambda item: -item[1]):
+        if current_speaker not in matches and previous_speaker not in used:
+            matches[current_speaker] = previous_speaker
+            used.add(previous_speaker)
+    return matches
+
+def _utterances(words: List[Word]) -> List[Dict[str, Any]]:
+    utterances: List[Dict[str, Any]] = []
+    run: List[Word] = []
+    for word in words + [None]:
+        if run and (word is None or word.speaker != run[0].speaker):
+            utterances.append({
+                "speaker": run[0].speaker,
+                "text": " ".join(run_word.text for run_word in run),
+                "start": run[0].start,
+                "end": run[-1].end,
+                "confidence": sum(run_word.confidence for run_word in run) / len(run)
+            })
+            run = []
+        if word is not None:
+            run.append(word)
+    return utterances
+
+def stitch_chunks(chunks: Sequence[ChunkTranscript]) -> StitchedTranscript:
+    """One transcript from chunk transcripts, given in recording order"""
+    absolute = [_shift(chunk.words, chunk.start_ms) for chunk in chunks]
+
+    # Chunk i keeps what lies between seams i - 1 and i
+    seams = [-math.inf]
+    for index in range(1, len(chunks)):
+        seams.append(_seam(absolute[index - 1], absolute[index], chunks[index].start_ms, chunks[index - 1].end_ms))
+    seams.append(math.inf)
+
+    words: List[Word] = []
+    sentiments: List[Dict[str, Any]] = []
+    talk_time: Dict[str, int] = defaultdict(int)  # milliseconds spoken under each label so far
+    speaker_count = 0
+    for index, chunk in enumerate(chunks):
+        # Relabel this chunk's speakers, then match the next chunk against the relabelled words
+        matches = {}
+        if index:
+            matches = _match_speakers(
+                absolute[index - 1], absolute[index], chunk.start_ms, chunks[index - 1].end_ms
+            )
+        chunk_talk_time: Dict[str, int] = defaultdict(int)
+        for word in absolute[index]:
+            if word.speaker is not None:
+                chunk_talk_time[word.speaker] += word.end - word.start
+        labels: Dict[Optional[str], Optional[str]] = {None: None}
+        labels.update(
+            (speaker, matches[speaker]) for speaker in chunk_talk_time if matches.get(speaker) is not None
+        )
+        # Speakers silent in the overlap take the free labels, talkative speakers the labels talked most under
+        free = sorted(
+            (label for label in talk_time if label not in labels.values()),
+            key=lambda label: -talk_time[label]
+        )
+        for speaker in sorted(chunk_talk_time, key=lambda speaker: -chunk_talk_time[speaker]):
+            if speaker in labels:
+                continue
+            if free:
+                labels[speaker] = free.pop(0)
+            else:
+                labels[speaker] = _speaker_label(speaker_count)
+                speaker_count += 1
+        absolute[index] = [word._replace(speaker=labels[word.speaker]) for word in absolute[index]]
+        for speaker, milliseconds in chunk_talk_time.items():
+            talk_time[labels[speaker]] += milliseconds
+
+        low, high = seams[index], seams[index + 1]
+        words.extend(word for word in absolute[index] if low <= _midpoint(word.start, word.end) < high)
+        for sentiment in chunk.sentiments:
+            start, end = sentiment["start"] + chunk.start_ms, sentiment["end"] + chunk.start_ms
+            if low <= _midpoint(start, end) < high:
+                sentiments.append({**sentiment, "start": start, "end": end})
+
+    summaries = [chunk.summary for chunk in chunks if chunk.summary]
+    return StitchedTranscript(
+        text=" ".join(word.text for word in words),
+        confidence=sum(word.confidence for word in words) / len(words) if words else None,
+        words=words,
+        utterances=_utterances(words),
+        sentiments=sentiments,
+        # Bullet summaries of consecutive chunks read as one list
+        summary="\n".join(summaries) or None
+    )
@@ -0,0 +1,177 @@
+"""
+Relay that publishes outbox messages to the Celery broker.
+
+Request handlers write OutboxMessage rows in the same transaction as the jobs
+they queue, so a job is never committed without its task, and a task is never
+published for a job that was rolled back. This process claims pending rows
+with FOR UPDATE SKIP LOCKED, so several relays can run side by side, publishes
+them under their pre-assigned task ids and deletes them in the same transaction.
+A crash between publish and commit publishes the message again with the same
+task id; process_transcription_job skips jobs that were already submitted.
+
+Each broker queue is only topped up to OUTBOX_QUEUE_DEPTH ready messages. The
+backlog stays in the outbox, where app.utils.fair_share decides which tenant's
+message goes next, so a tenant submitting thousands of files cannot push
+everyone else to the back of the broker queue. Tenant shares are tracked per
+relay process; with several relays each one balances its own batches.
+
+An insert trigger notifies the relay when messages are committed, so they are
+published right away; OUTBOX_POLL_INTERVAL is only the fallback and also how
+often queues that workers have drained are topped up again.
+
+Run with: python -m app.workers.outbox_relay
+"""
+import logging
+import select
+import time
+from typing import Dict, List
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.models.outbox import OutboxMessage
+from app.utils.fair_share import FairShareScheduler, PendingMessage
+from app.utils.logging import setup_logging
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "outbox_messages"
+
+class OutboxRelay:
+    def __init__(
+        self,
+        batch_size: int = None,
+        interval: float = None,
+        queue_depth: int = None,
+        policy: str = None
+    ):
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.interval = interval or settings.OUTBOX_POLL_INTERVAL
+        self.queue_depth = queue_depth or settings.OUTBOX_QUEUE_DEPTH
+        self.policy = policy or settings.OUTBOX_SCHEDULING_POLICY
+        # One per queue, so tenants' shares are tracked across batches
+        self.schedulers: Dict[str, FairShareScheduler] = {}
+        # Fail at startup on an unknown policy or invalid weights, not in the publishing loop
+        FairShareScheduler(self.policy, settings.OUTBOX_TENANT_WEIGHTS)
+
+    def _free_slots(self, connection, queue: str) -> int:
+        """Room left in a broker queue below queue_depth ready messages"""
+        bound = celery_app.amqp.queues[queue](connection.default_channel)
+        bound.declare()
+        declared = bound.queue_declare(passive=True)
+        return max(0, self.queue_depth - declared.message_count)
+
+    def _claim(self, db: Session, queue: str, slots: int) -> List[OutboxMessage]:
+        """Lock the next messages for a queue, in the order the scheduling policy picks them"""
+        # No tenant can get more than slots messages, so only each tenant's first slots are candidates
+        ranked = db.query(
+            OutboxMessage.id,
+            OutboxMessage.user_id,
+            func.row_number().over(
+                partition_by=OutboxMessage.user_id, order_by=OutboxMessage.id
+            ).label("position")
+        ).filter(OutboxMessage.queue == queue).subquery()
+        candidates = db.query(ranked.c.id, ranked.c.user_id).filter(ranked.c.position <= slots).all()
+        scheduler = self.schedulers.get(queue)
+        if scheduler is None:
+            scheduler = self.schedulers[queue] = FairShareScheduler(self.policy, settings.OUTBOX_TENANT_WEIGHTS)
+        chosen = scheduler.pick(
+            [PendingMessage(message_id, user_id) for message_id, user_id in candidates], slots
+        )
+
+        # Messages another relay is publishing right now are skipped
+        locked = {
+            message.id: message
+            for message in db.query(OutboxMessage).filter(
+                OutboxMessage.id.in_([message.id for message in chosen])
+            ).with_for_update(skip_locked=True)
+        }
+        return [locked[message.id] for message in chosen if message.id in locked]
+
+    def relay_batch(self) -> int:
+        """Top up every queue with pending messages and return how many were published"""
+        db = SessionLocal()
+        try:
+            queues = [queue for queue, in db.query(OutboxMessage.queue).distinct()]
+            if not queues:
+                return 0
+
+            messages, published = [], []
+            with celery_app.producer_or_acquire() as producer:
+                for queue in queues:
+                    slots = min(self.batch_size - len(messages), self._free_slots(producer.connection, queue))
+                    if slots > 0:
+                        messages.extend(self._claim(db, queue, slots))
+
+                for message in messages:
+                    try:
+                        celery_app.send_task(
+                            message.task_name,
+                            args=message.args,
+                            task_id=message.task_id,
+                            queue=message.queue,
+                            producer=producer
+                        )
+                    except Exception as e:
+                        # Most likely the broker is down; the rest wait for the next round
+                        message.attempts += 1
+                        message.last_error = str(e)
+                        logger.error(f"Failed to publish outbox message {message.id} ({message.task_name}): {str(e)}")
+                        break
+                    published.append(message.id)
+
+            if published:
+                db.query(OutboxMessage).filter(
+                    OutboxMessage.id.in_(published)
+                ).delete(synchronize_session=False)
+            db.commit()
+
+            if messages:
+                logger.info(f"Published {len(published)} of {len(messages)} outbox messages")
+            return len(published)
+        finally:
+            db.close()
+
+    def _listen(self):
+        """Dedicated autocommit connection subscribed to outbox notifications"""
+        connection = engine.raw_connection()
+        # Kept for the life of the relay instead of going back to the pool
+        connection.detach()
+        listener = connection.dbapi_connection
+        listener.autocommit = True
+        listener.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+        return listener
+
+    def _wait(self, listener) -> None:
+        """Block until messages are committed or the poll interval passes"""
+        if select.select([listener], [], [], self.interval)[0]:
+            listener.poll()
+            listener.notifies.clear()
+
+    def run(self) -> None:
+        listener = None
+        logger.info(
+            f"Outbox relay started (batch size {self.batch_size}, interval {self.interval}s, "
+            f"queue depth {self.queue_depth}, {self.policy} scheduling)"
+        )
+        while True:
+            try:
+                # Keep going while the queues have room and messages are waiting
+                while self.relay_batch():
+                    pass
+            except Exception as e:
+                logger.error(f"Outbox relay cycle failed: {str(e)}")
+
+            try:
+                if listener is None:
+                    listener = self._listen()
+                self._wait(listener)
+            except Exception as e:
+                logger.warning(f"Outbox notification listener failed, reconnecting: {str(e)}")
+                listener = None
+                time.sleep(self.interval)
+
+if __name__ == "__main__":
+    setup_logging()
+    OutboxRelay().run()
@@ -0,0 +1,127 @@
+"""
+Asyncio poller that tracks every in-flight transcript over one HTTP connection pool.
+
+Submitting is done by process_transcription_job, so Celery worker slots are only
+held for the fast submit and finalize steps. This process polls the provider for
+all jobs in processing state and hands finished ones to finalize_transcription_job.
+AssemblyAI is polled over the shared async pool, within the same fleet-wide
+rate and concurrency limits as every other AssemblyAI call; other backends are
+asked through their poll_transcription.
+
+Run with: python -m app.workers.transcript_poller
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+import httpx
+from app.core.config import settings
+from app.core.provider_limiter import ProviderLimiter, ProviderRateLimitedError, parse_retry_after
+from app.core.database import SessionLocal
+from app.models.transcription import TranscriptionJob, JobStatus
+from app.services.assemblyai_service import build_assemblyai_limiter
+from app.services.transcription_backend import get_transcription_backend
+from app.utils.logging import setup_logging
+from app.workers.transcription_worker import finalize_transcription_job
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = {"completed", "error"}
+
+def _load_in_flight_jobs() -> List[Tuple[int, str]]:
+    db = SessionLocal()
+    try:
+        return db.query(
+            TranscriptionJob.id, TranscriptionJob.provider_transcript_id
+        ).filter(
+            TranscriptionJob.status == JobStatus.PROCESSING.value,
+            TranscriptionJob.provider_transcript_id.isnot(None)
+        ).all()
+    finally:
+        db.close()
+
+class TranscriptPoller:
+    def __init__(self, interval: float = None, concurrency: int = None):
+        self.interval = interval or settings.TRANSCRIPT_POLL_INTERVAL
+        self.concurrency = concurrency or settings.TRANSCRIPT_POLL_CONCURRENCY
+        # Jobs already handed to the finalize task, so they are not dispatched twice
+        self.dispatched: Set[int] = set()
+        self.limiter: Optional[ProviderLimiter] = None
+    
+    async def _is_finished(
+        self, client: Optional[httpx.AsyncClient], semaphore: asyncio.Semaphore, transcript_id: str
+    ) -> bool:
+        async with semaphore:
+            if client is None:
+                return await asyncio.to_thread(get_transcription_backend().poll_transcription, transcript_id)
+            # A 429 backs off every AssemblyAI caller; the transcript is polled again next cycle
+            async with self.limiter.async_slot():
+                response = await client.get(f"/v2/transcript/{transcript_id}")
+                if response.status_code == httpx.codes.TOO_MANY_REQUESTS:
+                    raise ProviderRateLimitedError(
+                        parse_retry_after(response.headers.get("Retry-After"), settings.ASSEMBLYAI_DEFAULT_RETRY_AFTER)
+                    )
+            response.raise_for_status()
+            return response.json()["status"] in FINISHED_STATUSES
+    
+    async def poll_once(self, client: Optional[httpx.AsyncClient]) -> int:
+        """Poll every in-flight transcript once and dispatch the finished ones"""
+        jobs: Dict[int, str] = dict(await asyncio.to_thread(_load_in_flight_jobs))
+        
+        # Forget jobs that have left processing state
+        self.dispatched &= set(jobs)
+        pending = [(job_id, transcript_id) for job_id, transcript_id in jobs.items()
+                   if job_id not in self.dispatched]
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        statuses = await asyncio.gather(
+            *(self._is_finished(client, semaphore, transcript_id) for _, transcript_id in pending),
+            return_exceptions=True
+        )
+        
+        finished = 0
+        for (job_id, transcript_id), status in zip(pending, statuses):
+            if isinstance(status, Exception):
+                logger.warning(f"Failed to poll transcript {transcript_id} for job {job_id}: {status}")
+                continue
+            if status:
+                finalize_transcription_job.delay(job_id)
+                self.dispatched.add(job_id)
+                finished += 1
+        
+        if pending:
+            logger.info(f"Polled {len(pending)} transcripts, {finished} finished")
+        return finished
+    
+    async def _poll_forever(self, client: Optional[httpx.AsyncClient]) -> None:
+        logger.info(
+            f"Transcript poller started for {settings.TRANSCRIPTION_BACKEND} "
+            f"(interval {self.interval}s, concurrency {self.concurrency})"
+        )
+        while True:
+            try:
+                await self.poll_once(client)
+            except Exception as e:
+                logger.error(f"Transcript poll cycle failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+    
+    async def run(self) -> None:
+        if settings.TRANSCRIPTION_BACKEND != "assemblyai":
+            await self._poll_forever(None)
+            return
+        
+        self.limiter = build_assemblyai_limiter()
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency
+        )
+        async with httpx.AsyncClient(
+            base_url=settings.ASSEMBLYAI_BASE_URL,
+            headers={"authorization": settings.ASSEMBLYAI_API_KEY},
+            limits=limits,
+            timeout=httpx.Timeout(15.0)
+        ) as client:
+            await self._poll_forever(client)
+
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(TranscriptPoller().run())
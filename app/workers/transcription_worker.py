@@ -1,21 +1,179 @@
-from celery import current_task
-from app.core.celery_app import celery_app
+from celery import chord, current_task
+from app.core.celery_app import celery_app, BULK_QUEUE
+from app.core.config import settings
 from app.core.database import SessionLocal
-from app.models.transcription import TranscriptionJob, JobStatus
-from app.services.assemblyai_service import assemblyai_service
-from datetime import datetime
+from app.core.security import create_webhook_signature, WEBHOOK_SIGNATURE_HEADER
+from app.models.outbox import OutboxMessage
+from app.models.transcription import TranscriptionJob, TranscriptionResult, JobStatus, DEDUP_LOCK_QUERY
+from app.services.s3_service import get_s3_service
+from app.services.transcription_backend import get_transcription_backend, TranscriptionFailedError
+from app.utils.segment_codec import encode_segments, segments_etag
+from app.utils.transcript_stitcher import chunk_from_json, plan_chunks, stitch_chunks
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
 import logging
-import time
+import uuid
 
 logger = logging.getLogger(__name__)
 
+def _elapsed_since(started_at: datetime) -> float:
+    if started_at is None:
+        return None
+    if started_at.tzinfo is None:
+        started_at = started_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - started_at).total_seconds()
+
+def _webhook_url(job_id: int) -> str:
+    """Webhook URL for one job; the job id lets the endpoint check the signature before any lookup"""
+    separator = "&" if "?" in settings.ASSEMBLYAI_WEBHOOK_URL else "?"
+    return f"{settings.ASSEMBLYAI_WEBHOOK_URL}{separator}{urlencode({'job_id': job_id})}"
+
+def _audio_url(job: TranscriptionJob) -> str:
+    """URL the provider downloads the audio from, presigned now however long the job was queued"""
+    if job.s3_object_key is None:
+        return job.s3_url
+    return get_s3_service().generate_presigned_url(job.s3_object_key, settings.S3_PRESIGNED_DOWNLOAD_EXPIRATION)
+
+def _pending_duplicates(db, job: TranscriptionJob):
+    """
+    Jobs waiting on this one's transcript. Holds the job's dedup lock until the
+    caller commits, so no upload starts following the job in the meantime
+    """
+    if job.content_sha256:
+        db.execute(DEDUP_LOCK_QUERY, {"keys": [job.dedup_lock_key()]})
+    return db.query(TranscriptionJob).filter(
+        TranscriptionJob.duplicate_of_job_id == job.id,
+        TranscriptionJob.status == JobStatus.PENDING.value
+    ).all()
+
+def _complete_duplicates(db, job: TranscriptionJob, result: TranscriptionResult) -> None:
+    """Give jobs that were waiting on this one's audio a copy of its result"""
+    for duplicate in _pending_duplicates(db, job):
+        duplicate.status = JobStatus.COMPLETED.value
+        duplicate.confidence_score = job.confidence_score
+        duplicate.processing_time = 0.0
+        duplicate.started_at = duplicate.completed_at = job.completed_at
+        db.merge(result.copy_for(duplicate.id))
+        logger.info(f"Transcription job {duplicate.id} completed from duplicate job {job.id}")
+
+def _fail_duplicates(db, job: TranscriptionJob) -> None:
+    """Same audio and options, so jobs waiting on a failed transcript fail with it"""
+    for duplicate in _pending_duplicates(db, job):
+        duplicate.status = JobStatus.FAILED.value
+        duplicate.error_message = job.error_message
+        duplicate.completed_at = job.completed_at
+
+def _store_result(db, job: TranscriptionJob, result: Dict[str, Any]) -> float:
+    """Complete the job and the jobs waiting on its audio with a result, and return its processing time"""
+    processing_time = _elapsed_since(job.started_at)
+    
+    job.status = JobStatus.COMPLETED.value
+    job.confidence_score = result.get("confidence")
+    job.processing_time = processing_time
+    transcription_result = db.merge(TranscriptionResult(
+        job_id=job.id,
+        transcript_text=result["transcript_text"],
+        speaker_segments=result.get("speaker_segments"),
+        sentiment_segments=result.get("sentiment_segments"),
+        segments_etag=segments_etag(result.get("speaker_segments"), result.get("sentiment_segments")),
+        summary=result.get("summary") or None
+    ))
+    
+    job.completed_at = datetime.utcnow()
+    _complete_duplicates(db, job, transcription_result)
+    db.commit()
+    return processing_time
+
+def _fail_job(db, job: TranscriptionJob, exc: Exception) -> None:
+    job.status = JobStatus.FAILED.value
+    job.error_message = str(exc)
+    job.completed_at = datetime.utcnow()
+    _fail_duplicates(db, job)
+    db.commit()
+
+def _should_chunk(job: TranscriptionJob) -> bool:
+    return (
+        settings.CHUNKED_TRANSCRIPTION_ENABLED
+        and job.audio_duration is not None
+        and job.audio_duration >= settings.CHUNKED_MIN_DURATION
+    )
+
+def _claim_job(db, job_id: int) -> Optional[datetime]:
+    """
+    Claim a pending job by moving it to processing. Returns the claim time,
+    which the claimant's later updates are conditioned on, or None if the job
+    was claimed already
+    """
+    claimed_at = datetime.utcnow()
+    claimed = db.query(TranscriptionJob).filter(
+        TranscriptionJob.id == job_id,
+        TranscriptionJob.status == JobStatus.PENDING.value
+    ).update({
+        TranscriptionJob.status: JobStatus.PROCESSING.value,
+        TranscriptionJob.started_at: claimed_at
+    }, synchronize_session=False)
+    db.commit()
+    return claimed_at if claimed else None
+
+def _held_claim(job_id: int, claimed_at: datetime):
+    """Filter matching the job only while the claim made at claimed_at still holds"""
+    return (
+        TranscriptionJob.id == job_id,
+        TranscriptionJob.status == JobStatus.PROCESSING.value,
+        TranscriptionJob.started_at == claimed_at
+    )
+
+def _record_submission(db, job: TranscriptionJob, claimed_at: datetime, **values: Any) -> bool:
+    """Record what was submitted for a job; False if the sweeper requeued the claim meanwhile"""
+    recorded = db.query(TranscriptionJob).filter(*_held_claim(job.id, claimed_at)).update(
+        {getattr(TranscriptionJob, name): value for name, value in values.items()}, synchronize_session=False
+    )
+    db.commit()
+    if recorded:
+        db.refresh(job)
+    return bool(recorded)
+
+def _release_claim(db, job_id: int, claimed_at: datetime, error_message: str) -> bool:
+    """Put a claimed job back to pending for a retry, as long as nothing was submitted for it"""
+    released = db.query(TranscriptionJob).filter(
+        *_held_claim(job_id, claimed_at),
+        TranscriptionJob.provider_transcript_id.is_(None),
+        TranscriptionJob.chunk_count.is_(None)
+    ).update({
+        TranscriptionJob.status: JobStatus.PENDING.value,
+        TranscriptionJob.error_message: error_message
+    }, synchronize_session=False)
+    db.commit()
+    return bool(released)
+
+def _start_chunked_transcription(db, job: TranscriptionJob, claimed_at: datetime) -> bool:
+    """
+    Transcribe overlapping chunks of the audio in parallel, stitched together
+    once all are done. False if the claim was requeued before anything was queued
+    """
+    bounds = plan_chunks(
+        int(job.audio_duration * 1000),
+        int(settings.CHUNK_DURATION * 1000),
+        int(settings.CHUNK_OVERLAP * 1000)
+    )
+    # Recorded before the chunks are queued, so neither a retry nor a redelivery queues them again
+    if not _record_submission(db, job, claimed_at, chunk_count=len(bounds)):
+        return False
+    chord(
+        transcribe_audio_chunk.s(job.id, start_ms, end_ms) for start_ms, end_ms in bounds
+    )(stitch_transcription_chunks.s(job.id))
+    return True
+
 @celery_app.task(bind=True, max_retries=3)
 def process_transcription_job(self, job_id: int):
     """
-    Celery task to process audio transcription
+    Celery task to submit audio for transcription. Completion is picked up
+    separately by finalize_transcription_job, so the worker slot is released
+    as soon as the provider accepts the audio.
     """
     db = SessionLocal()
-    start_time = time.time()
+    claimed_at = None
     
     try:
         # Get job from database
@@ -23,46 +181,132 @@ def process_transcription_job(self, job_id: int):
         if not job:
             raise Exception(f"Job with id {job_id} not found")
         
+        # Redelivered message for a job that was already submitted
+        if job.provider_transcript_id or job.chunk_count:
+            logger.info(f"Transcription job {job_id} already submitted, skipping")
+            return {"job_id": job_id, "status": job.status}
+        
+        # Duplicates are completed together with the job they follow
+        if job.duplicate_of_job_id:
+            logger.info(f"Transcription job {job_id} follows job {job.duplicate_of_job_id}, skipping")
+            return {"job_id": job_id, "status": job.status}
+        
+        # Claim the job; a concurrent delivery of the same message finds it claimed
+        claimed_at = _claim_job(db, job_id)
+        if claimed_at is None:
+            logger.info(f"Transcription job {job_id} already claimed, skipping")
+            return {"job_id": job_id, "status": job.status}
+        db.refresh(job)
+        
         logger.info(f"Starting transcription job {job_id} for file: {job.filename}")
         
-        # Update job status to processing
-        job.status = JobStatus.PROCESSING.value
-        job.started_at = datetime.utcnow()
-        job.celery_task_id = self.request.id
-        db.commit()
+        if _should_chunk(job):
+            if not _start_chunked_transcription(db, job, claimed_at):
+                logger.warning(f"Transcription job {job_id} was requeued before its chunks were queued")
+                return {"job_id": job_id, "status": "requeued"}
+            logger.info(f"Transcription job {job_id} split into {job.chunk_count} chunks")
+            return {"job_id": job_id, "status": "processing", "chunks": job.chunk_count}
         
-        # Update task progress
-        self.update_state(
-            state="PROCESSING",
-            meta={"job_id": job_id, "message": "Starting transcription..."}
-        )
+        # Ask AssemblyAI to call back on completion when a webhook is configured
+        webhook_options = {}
+        if settings.ASSEMBLYAI_WEBHOOK_URL:
+            webhook_options = {
+                "webhook_url": _webhook_url(job.id),
+                "webhook_auth_header_name": WEBHOOK_SIGNATURE_HEADER,
+                "webhook_auth_header_value": create_webhook_signature(job.id)
+            }
         
-        # Call AssemblyAI service
-        result = assemblyai_service.transcribe_audio(
-            audio_url=job.s3_url,
-            enable_speaker_diarization=job.enable_speaker_diarization,
-            enable_sentiment_analysis=job.enable_sentiment_analysis
-        )
+        # Submit to the transcription backend
+        try:
+            transcript_id = get_transcription_backend().submit_transcription(
+                audio_url=_audio_url(job),
+                enable_speaker_diarization=job.enable_speaker_diarization,
+                enable_sentiment_analysis=job.enable_sentiment_analysis,
+                **webhook_options
+            )
+        except TranscriptionFailedError as exc:
+            # The provider rejected the audio, retrying will not help
+            logger.error(f"Transcription job {job_id} failed: {str(exc)}")
+            _fail_job(db, job, exc)
+            return {"job_id": job_id, "status": "failed"}
         
-        # Calculate processing time
-        processing_time = time.time() - start_time
+        # A transcript no job points to would be paid for and never used
+        try:
+            recorded = _record_submission(db, job, claimed_at, provider_transcript_id=transcript_id)
+        except Exception:
+            get_transcription_backend().cancel_transcription(transcript_id)
+            raise
+        if not recorded:
+            logger.warning(f"Transcription job {job_id} was requeued while submitting, cancelling {transcript_id}")
+            get_transcription_backend().cancel_transcription(transcript_id)
+            return {"job_id": job_id, "status": "requeued"}
         
-        # Update job with results
-        job.status = JobStatus.COMPLETED.value
-        job.transcript_text = result["transcript_text"]
-        job.confidence_score = result.get("confidence")
-        job.processing_time = processing_time
-        job.speaker_diarization_results = result.get("speaker_diarization_results")
-        job.sentiment_analysis_results = result.get("sentiment_analysis_results")
+        logger.info(f"Transcription job {job_id} submitted as transcript {job.provider_transcript_id}")
         
-        # Add summarry if available
-        if result.get("summary"):
-            job.summary = result["summary"]
-        else:
-            job.summary = None
+        return {
+            "job_id": job_id,
+            "status": "processing",
+            "transcript_id": job.provider_transcript_id
+        }
         
-        job.completed_at = datetime.utcnow()
-        db.commit()
+    except Exception as exc:
+        logger.error(f"Transcription job {job_id} failed: {str(exc)}")
+        db.rollback()
+        
+        # A claimed job goes back to pending so the retry can claim it, unless its
+        # chunks may already be queued, where a retry would queue them a second time
+        retryable = claimed_at is None or _release_claim(db, job_id, claimed_at, str(exc))
+        if retryable and self.request.retries < self.max_retries:
+            logger.info(f"Retrying job {job_id}, attempt {self.request.retries + 1}")
+            raise self.retry(countdown=60 * (self.request.retries + 1), exc=exc)
+        
+        # Out of retries, or chunks possibly queued; a claim the sweeper requeued is left alone
+        job = db.query(TranscriptionJob).filter(TranscriptionJob.id == job_id).first()
+        if job is not None and (
+            (retryable and job.status == JobStatus.PENDING.value)
+            or (job.status == JobStatus.PROCESSING.value and job.chunk_count)
+        ):
+            _fail_job(db, job, exc)
+        
+        raise exc
+        
+    finally:
+        db.close()
+
+@celery_app.task(bind=True, max_retries=3)
+def finalize_transcription_job(self, job_id: int):
+    """
+    Celery task to fetch a finished transcript and store its results.
+    Safe to run more than once per job.
+    """
+    db = SessionLocal()
+    
+    try:
+        job = db.query(TranscriptionJob).filter(TranscriptionJob.id == job_id).first()
+        if not job:
+            raise Exception(f"Job with id {job_id} not found")
+        
+        if job.status != JobStatus.PROCESSING.value or not job.provider_transcript_id:
+            logger.info(f"Transcription job {job_id} is {job.status}, nothing to finalize")
+            return {"job_id": job_id, "status": job.status}
+        
+        try:
+            result = get_transcription_backend().get_transcription_result(
+                job.provider_transcript_id,
+                enable_speaker_diarization=job.enable_speaker_diarization,
+                enable_sentiment_analysis=job.enable_sentiment_analysis
+            )
+        except TranscriptionFailedError as exc:
+            # Transcript ended in error on the provider side, retrying will not help
+            logger.error(f"Transcription job {job_id} failed: {str(exc)}")
+            _fail_job(db, job, exc)
+            return {"job_id": job_id, "status": "failed"}
+        
+        if result is None:
+            logger.info(f"Transcript for job {job_id} is still in progress")
+            return {"job_id": job_id, "status": job.status}
+        
+        processing_time = _store_result(db, job, result)
         
         logger.info(f"Transcription job {job_id} completed successfully in {processing_time:.2f}s")
         
@@ -73,21 +317,181 @@ def process_transcription_job(self, job_id: int):
         }
         
     except Exception as exc:
-        logger.error(f"Transcription job {job_id} failed: {str(exc)}")
-        
-        # Update job status to failed
-        if 'job' in locals():
-            job.status = JobStatus.FAILED.value
-            job.error_message = str(exc)
-            job.completed_at = datetime.utcnow()
-            db.commit()
+        logger.error(f"Finalizing transcription job {job_id} failed: {str(exc)}")
         
-        # Retry logic
+        # Job stays in processing, the poller will pick it up again
         if self.request.retries < self.max_retries:
-            logger.info(f"Retrying job {job_id}, attempt {self.request.retries + 1}")
-            raise self.retry(countdown=60 * (self.request.retries + 1), exc=exc)
+            raise self.retry(countdown=10 * (self.request.retries + 1), exc=exc)
         
         raise exc
         
     finally:
         db.close()
+
+@celery_app.task(bind=True, max_retries=None)
+def transcribe_audio_chunk(self, job_id: int, start_ms: int, end_ms: int, transcript_id: str = None):
+    """
+    Celery task to transcribe one chunk of a long recording. It submits the
+    chunk, then polls by retrying itself with the transcript id, so no worker
+    slot is held while the provider works. Returns the chunk transcript.
+    """
+    db = SessionLocal()
+    
+    try:
+        job = db.query(TranscriptionJob).filter(TranscriptionJob.id == job_id).first()
+        # Another chunk already failed the job, nothing left to do
+        if not job or job.status != JobStatus.PROCESSING.value:
+            if transcript_id is not None:
+                get_transcription_backend().cancel_transcription(transcript_id)
+            return None
+        
+        max_polls = int(settings.CHUNK_TIMEOUT / settings.TRANSCRIPT_POLL_INTERVAL)
+        chunk = None
+        try:
+            if transcript_id is None:
+                transcript_id = get_transcription_backend().submit_transcription(
+                    audio_url=_audio_url(job),
+                    enable_speaker_diarization=job.enable_speaker_diarization,
+                    enable_sentiment_analysis=job.enable_sentiment_analysis,
+                    audio_start_from=start_ms,
+                    audio_end_at=end_ms
+                )
+            else:
+                chunk = get_transcription_backend().get_chunk_transcript(transcript_id, start_ms, end_ms)
+        except TranscriptionFailedError as exc:
+            logger.error(f"Chunk {start_ms}-{end_ms}ms of transcription job {job_id} failed: {str(exc)}")
+            _fail_job(db, job, exc)
+            raise exc
+        except Exception as exc:
+            # Transient; the next poll submits or fetches again
+            logger.warning(f"Chunk {start_ms}-{end_ms}ms of transcription job {job_id}: {str(exc)}")
+        
+        if chunk is not None:
+            return chunk
+        
+        if self.request.retries >= max_polls:
+            exc = Exception(f"Chunk {start_ms}-{end_ms}ms not transcribed within {settings.CHUNK_TIMEOUT:.0f}s")
+            _fail_job(db, job, exc)
+            raise exc
+        
+        raise self.retry(
+            args=(job_id, start_ms, end_ms, transcript_id),
+            countdown=settings.TRANSCRIPT_POLL_INTERVAL
+        )
+        
+    finally:
+        db.close()
+
+@celery_app.task
+def stitch_transcription_chunks(chunks: List[list], job_id: int):
+    """
+    Celery chord callback that stitches chunk transcripts into the job's result
+    """
+    db = SessionLocal()
+    
+    try:
+        job = db.query(TranscriptionJob).filter(TranscriptionJob.id == job_id).first()
+        if not job or job.status != JobStatus.PROCESSING.value:
+            logger.info(f"Transcription job {job_id} is no longer processing, not stitching")
+            return {"job_id": job_id, "status": job.status if job else None}
+        
+        try:
+            stitched = stitch_chunks([chunk_from_json(chunk) for chunk in chunks])
+            processing_time = _store_result(db, job, {
+                "transcript_text": stitched.text,
+                "confidence": stitched.confidence,
+                "speaker_segments": (
+                    encode_segments(stitched.utterances)
+                    if job.enable_speaker_diarization and stitched.utterances else None
+                ),
+                "sentiment_segments": (
+                    encode_segments(stitched.sentiments)
+                    if job.enable_sentiment_analysis and stitched.sentiments else None
+                ),
+                "summary": stitched.summary
+            })
+            
+            logger.info(
+                f"Transcription job {job_id} completed from {len(chunks)} chunks in {processing_time:.2f}s"
+            )
+            return {
+                "job_id": job_id,
+                "status": "completed",
+                "processing_time": processing_time
+            }
+            
+        except Exception as exc:
+            # Chunk transcripts are not kept anywhere else, so the job cannot be finished later
+            logger.error(f"Stitching transcription job {job_id} failed: {str(exc)}")
+            db.rollback()
+            _fail_job(db, job, exc)
+            raise exc
+        
+    finally:
+        db.close()
+
+@celery_app.task
+def sweep_stale_transcription_jobs():
+    """
+    Periodic task that re-checks jobs whose completion callback never arrived,
+    fails chunked jobs that ran out of time and requeues abandoned claims
+    """
+    db = SessionLocal()
+    
+    try:
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=settings.TRANSCRIPT_SWEEP_AFTER)
+        job_ids = [job_id for (job_id,) in db.query(TranscriptionJob.id).filter(
+            TranscriptionJob.status == JobStatus.PROCESSING.value,
+            TranscriptionJob.provider_transcript_id.isnot(None),
+            TranscriptionJob.started_at < cutoff
+        ).all()]
+        
+        # Finalizing fetches the transcript once and leaves unfinished jobs untouched
+        for job_id in job_ids:
+            finalize_transcription_job.delay(job_id)
+        
+        # Chunked jobs whose chord was lost, e.g. with a chunk task, never finish on their own
+        chunked_cutoff = now - timedelta(seconds=settings.CHUNK_TIMEOUT)
+        timed_out = db.query(TranscriptionJob).filter(
+            TranscriptionJob.status == JobStatus.PROCESSING.value,
+            TranscriptionJob.chunk_count.isnot(None),
+            TranscriptionJob.started_at < chunked_cutoff
+        ).all()
+        for job in timed_out:
+            logger.error(f"Chunked transcription job {job.id} timed out")
+            _fail_job(db, job, Exception(f"Chunks not transcribed within {settings.CHUNK_TIMEOUT:.0f}s"))
+        
+        # Claimed jobs that were never submitted, because their worker died in
+        # between, go back to the queue. A worker that only stalled finds its
+        # claim gone when it records the submission and cancels the transcript
+        claim_cutoff = now - timedelta(seconds=settings.TRANSCRIPT_CLAIM_TIMEOUT)
+        abandoned = db.query(TranscriptionJob).filter(
+            TranscriptionJob.status == JobStatus.PROCESSING.value,
+            TranscriptionJob.provider_transcript_id.is_(None),
+            TranscriptionJob.chunk_count.is_(None),
+            TranscriptionJob.started_at < claim_cutoff
+        ).with_for_update(skip_locked=True).all()
+        for job in abandoned:
+            job.status = JobStatus.PENDING.value
+            job.started_at = None
+            job.celery_task_id = str(uuid.uuid4())
+            db.add(OutboxMessage.for_task(
+                process_transcription_job,
+                job.id,
+                queue=BULK_QUEUE,
+                task_id=job.celery_task_id,
+                user_id=job.user_id
+            ))
+            logger.warning(f"Transcription job {job.id} was claimed but never submitted, requeued")
+        db.commit()
+        
+        if job_ids or timed_out or abandoned:
+            logger.info(
+                f"Swept {len(job_ids)} stale, {len(timed_out)} timed out and "
+                f"{len(abandoned)} abandoned transcription jobs"
+            )
+        return {"swept": len(job_ids), "timed_out": len(timed_out), "requeued": len(abandoned)}
+        
+    finally:
+        db.close()
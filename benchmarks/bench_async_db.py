@@ -0,0 +1,89 @@
+"""
+Benchmark request latency with the sync vs async database session.
+
+Mounts two endpoints that run the same query (SELECT pg_sleep) from an
+`async def` handler: one through the synchronous SessionLocal, which blocks
+the event loop, and one through AsyncSessionLocal. Both are driven with the
+same concurrency in-process over ASGI, so every request shares one event
+loop exactly like a single uvicorn worker.
+
+Requires a reachable Postgres configured through the usual settings.
+
+Run with: python -m benchmarks.bench_async_db --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Tuple
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import text
+from app.core.database import SessionLocal, AsyncSessionLocal
+
+app = FastAPI()
+
+QUERY = text("SELECT pg_sleep(:delay)")
+
+@app.get("/sync")
+async def sync_session(delay: float):
+    db = SessionLocal()
+    try:
+        db.execute(QUERY, {"delay": delay})
+    finally:
+        db.close()
+    return {}
+
+@app.get("/async")
+async def async_session(delay: float):
+    async with AsyncSessionLocal() as db:
+        await db.execute(QUERY, {"delay": delay})
+    return {}
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run(path: str, requests: int, concurrency: int, delay: float) -> Tuple[List[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None
+    ) as client:
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path, params={"delay": delay})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+        
+        # Warm up the connection pools
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+        latencies.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    
+    return latencies, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.02, help="simulated query time in seconds")
+    args = parser.parse_args()
+    
+    print(f"{'mode':<8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for mode in ("sync", "async"):
+        latencies, elapsed = asyncio.run(run(f"/{mode}", args.requests, args.concurrency, args.delay))
+        print(
+            f"{mode:<8}"
+            f"{percentile(latencies, 50) * 1000:>10.1f}"
+            f"{percentile(latencies, 95) * 1000:>10.1f}"
+            f"{percentile(latencies, 99) * 1000:>10.1f}"
+            f"{len(latencies) / elapsed:>10.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark request throughput of the authentication dependency per token format.
+
+Compares a subject-only token resolved from the database, the same token
+served from the principal cache's Redis tier and from its in-process tier,
+and a stateless claims token checked against the cached token version. Requests go through a minimal ASGI app
+whose only work is get_current_active_user.
+
+Requires the configured Postgres and Redis.
+
+Run with: python -m benchmarks.bench_auth_tokens --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from app.core import security
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.principal_cache import PrincipalCache
+from app.models.user import User
+import app.models.transcription  # noqa: F401 - registers the User relationship target
+
+app = FastAPI()
+
+@app.get("/whoami")
+async def whoami(current_user: User = Depends(security.get_current_active_user)):
+    return {"id": current_user.id}
+
+async def ensure_user(username: str) -> User:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.username == username))
+        user = result.scalar_one_or_none()
+        if user is None:
+            user = User(
+                username=username,
+                email=f"{username}@example.com",
+                hashed_password=User.hash_password("benchmark")
+            )
+            db.add(user)
+            await db.commit()
+            await db.refresh(user)
+        return user
+
+async def run(token: str, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None
+    ) as client:
+        async def one():
+            async with semaphore:
+                response = await client.get("/whoami", headers=headers)
+                response.raise_for_status()
+        
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+async def main(args) -> None:
+    user = await ensure_user(args.username)
+    legacy_token = security.create_access_token(user.username)
+    stateless_token = security.create_access_token(
+        user.username,
+        claims=security.create_principal_claims(user, user.token_version)
+    )
+    
+    def cache(ttl: float, redis: bool) -> PrincipalCache:
+        return PrincipalCache(
+            settings.PRINCIPAL_CACHE_SIZE,
+            ttl,
+            redis_url=settings.REDIS_URL if redis else None,
+            redis_ttl=settings.PRINCIPAL_CACHE_REDIS_TTL
+        )
+    
+    modes = [
+        ("subject token, database", legacy_token, False, cache(0, redis=False)),
+        ("subject token, Redis", legacy_token, False, cache(0, redis=True)),
+        ("subject token, in-process", legacy_token, False, cache(settings.PRINCIPAL_CACHE_TTL, redis=True)),
+        ("stateless claims token", stateless_token, True, cache(0, redis=False)),
+    ]
+    
+    print(f"{'mode':<28}{'req/s':>10}")
+    for name, token, stateless, principal_cache in modes:
+        settings.JWT_STATELESS_CLAIMS = stateless
+        security.principal_cache = principal_cache
+        # The in-process tier is only used once subscribed to invalidations
+        principal_cache.start()
+        await asyncio.sleep(0.5)
+        throughput = await run(token, args.requests, args.concurrency)
+        await principal_cache.stop()
+        print(f"{name:<28}{throughput:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--username", default="benchmark-user")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,196 @@
+"""
+Benchmark chunked transcription of a long recording against a mocked provider.
+
+Builds a synthetic multi-speaker recording and a mock provider that, like a
+real one, takes a fixed overhead plus a fraction of the audio length per
+request, labels speakers independently per request, jitters timestamps and
+garbles words cut off at a chunk edge. Compares transcribing the whole file
+with chunked transcription stitched by app.utils.transcript_stitcher, and with
+naively concatenating the chunks:
+
+- latency: provider wall time with --concurrency requests in flight, rounded
+  up to the poll interval, plus the measured stitching time
+- accuracy against the ground truth: words lost, words duplicated by the
+  overlaps, cut-off words kept, and how well speaker labels follow the true
+  speakers. Purity is the share of words whose label mostly belongs to their
+  true speaker, which stays high when a speaker is split over many labels.
+  Completeness is the share of words under their true speaker's most used
+  label, which drops when that happens. The label count is shown against the
+  true speaker count
+
+Needs no external services.
+
+Run with: python -m benchmarks.bench_chunked_transcription --minutes 180
+"""
+import argparse
+import heapq
+import math
+import random
+import time
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from app.utils.transcript_stitcher import ChunkTranscript, Word, plan_chunks, stitch_chunks
+
+WORDS = (
+    "the call quality was fine thanks for waiting let me check your account "
+    "we can ship it tomorrow that works for me is there anything else today"
+).split()
+SPEAKERS = "PQRSTU"
+
+class TrueWord(NamedTuple):
+    text: str
+    start: int
+    end: int
+    speaker: str
+
+def synthetic_recording(minutes: float, speakers: int, rng: random.Random) -> List[TrueWord]:
+    """Turns of speech from a few speakers, with short gaps between words and longer pauses between turns"""
+    duration_ms = int(minutes * 60 * 1000)
+    words, position, speaker = [], 500, 0
+    while True:
+        for _ in range(rng.randint(3, 60)):
+            length = rng.randint(150, 600)
+            if position + length > duration_ms:
+                return words
+            words.append(TrueWord(rng.choice(WORDS), position, position + length, SPEAKERS[speaker]))
+            position += length + rng.randint(30, 200)
+        position += rng.randint(250, 1500)
+        speaker = (speaker + rng.randint(1, speakers - 1)) % speakers
+
+class MockProvider:
+    """Transcribes a time range of the recording the way a provider would see it"""
+
+    def __init__(self, truth: List[TrueWord], overhead: float, real_time_factor: float, seed: int):
+        self.truth = truth
+        self.starts = [word.start for word in truth]
+        self.overhead = overhead
+        self.real_time_factor = real_time_factor
+        self.rng = random.Random(seed)
+
+    def wall_time(self, start_ms: int, end_ms: int) -> float:
+        return self.overhead + (end_ms - start_ms) / 1000 * self.real_time_factor
+
+    def transcribe(self, start_ms: int, end_ms: int) -> ChunkTranscript:
+        labels: Dict[str, str] = {}
+        words = []
+        first = max(0, bisect_right(self.starts, start_ms) - 1)
+        for word in self.truth[first:]:
+            if word.start >= end_ms:
+                break
+            if word.end <= start_ms:
+                continue
+            text = word.text
+            if word.start < start_ms or word.end > end_ms:
+                # Cut off by the chunk edge: sometimes dropped, otherwise misheard
+                if self.rng.random() < 0.5:
+                    continue
+                text = word.text[:2] + "-"
+            # Each request labels speakers A, B, ... in order of appearance
+            label = labels.setdefault(word.speaker, chr(ord("A") + len(labels)))
+            jitter = self.rng.randint(-40, 40)
+            words.append(Word(
+                text,
+                max(0, max(word.start, start_ms) + jitter - start_ms),
+                min(end_ms, word.end) + jitter - start_ms,
+                round(self.rng.uniform(0.8, 1.0), 3),
+                label
+            ))
+        return ChunkTranscript(start_ms, end_ms, words, [], None)
+
+def provider_latency(
+    provider: MockProvider,
+    bounds: Sequence[Tuple[int, int]],
+    concurrency: int,
+    poll_interval: float
+) -> float:
+    """Seconds until the last chunk is seen finished, with at most concurrency requests in flight"""
+    slots = [0.0] * min(concurrency, len(bounds))
+    finished = 0.0
+    for start_ms, end_ms in bounds:
+        started = heapq.heappop(slots)
+        done = started + provider.wall_time(start_ms, end_ms)
+        heapq.heappush(slots, done)
+        finished = max(finished, math.ceil(done / poll_interval) * poll_interval)
+    return finished
+
+def concatenate(chunks: Sequence[ChunkTranscript]) -> List[Word]:
+    """Every chunk's words in order, offset but with no overlap or speaker handling"""
+    return [
+        word._replace(start=word.start + chunk.start_ms, end=word.end + chunk.start_ms)
+        for chunk in chunks
+        for word in chunk.words
+    ]
+
+def accuracy(truth: List[TrueWord], words: List[Word]) -> Tuple[int, int, int, float, float]:
+    """Words lost, duplicated and cut off, and the speaker purity and completeness"""
+    starts = [word.start for word in truth]
+    seen: Counter = Counter()
+    cut = 0
+    by_label: Dict[Optional[str], Counter] = defaultdict(Counter)
+    by_speaker: Dict[str, Counter] = defaultdict(Counter)
+    for word in words:
+        if word.text.endswith("-"):
+            cut += 1
+            continue
+        index = bisect_right(starts, (word.start + word.end) // 2) - 1
+        seen[index] += 1
+        by_label[word.speaker][truth[index].speaker] += 1
+        by_speaker[truth[index].speaker][word.speaker] += 1
+
+    lost = sum(1 for index in range(len(truth)) if not seen[index])
+    duplicated = sum(count - 1 for count in seen.values() if count > 1)
+    # Each stitched label stands for one true speaker; words under another speaker's label are impure
+    pure = sum(counts.most_common(1)[0][1] for counts in by_label.values())
+    # Each true speaker should have one label; words under any of their other labels are incomplete
+    complete = sum(counts.most_common(1)[0][1] for counts in by_speaker.values())
+    total = max(1, sum(seen.values()))
+    return lost, duplicated, cut, pure / total, complete / total
+
+def main(args) -> None:
+    rng = random.Random(args.seed)
+    truth = synthetic_recording(args.minutes, args.speakers, rng)
+    duration_ms = truth[-1].end + 500
+    provider = MockProvider(truth, args.overhead, args.real_time_factor, args.seed)
+
+    print(
+        f"{args.minutes:g} minute recording, {len(truth)} words, {args.speakers} speakers; "
+        f"provider {args.overhead:g}s + {args.real_time_factor:g}x audio, {args.concurrency} in flight"
+    )
+    print(
+        f"{'scenario':<22}{'chunks':>7}{'latency s':>11}{'speedup':>9}{'stitch ms':>11}"
+        f"{'lost':>7}{'dup':>7}{'cut':>6}{'purity %':>10}{'complete %':>12}{'labels':>8}"
+    )
+
+    whole = provider_latency(provider, [(0, duration_ms)], args.concurrency, args.poll_interval)
+    scenarios = [("whole file", [(0, duration_ms)], True)]
+    for chunk_minutes in args.chunk_minutes:
+        bounds = plan_chunks(duration_ms, int(chunk_minutes * 60 * 1000), int(args.overlap * 1000))
+        scenarios.append((f"{chunk_minutes:g} min chunks", bounds, True))
+        scenarios.append((f"{chunk_minutes:g} min, concatenated", bounds, False))
+
+    for name, bounds, stitched in scenarios:
+        chunks = [provider.transcribe(start_ms, end_ms) for start_ms, end_ms in bounds]
+        started = time.perf_counter()
+        words = stitch_chunks(chunks).words if stitched else concatenate(chunks)
+        stitch_ms = (time.perf_counter() - started) * 1000
+        latency = provider_latency(provider, bounds, args.concurrency, args.poll_interval) + stitch_ms / 1000
+        lost, duplicated, cut, purity, completeness = accuracy(truth, words)
+        labels = f"{len({word.speaker for word in words})}/{args.speakers}"
+        print(
+            f"{name:<22}{len(bounds):>7}{latency:>11.0f}{whole / latency:>8.1f}x{stitch_ms:>11.1f}"
+            f"{lost:>7}{duplicated:>7}{cut:>6}{purity * 100:>9.1f}%{completeness * 100:>11.1f}%{labels:>8}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=float, default=180.0, help="length of the recording")
+    parser.add_argument("--speakers", type=int, default=3)
+    parser.add_argument("--chunk-minutes", type=float, nargs="+", default=[5.0, 10.0, 20.0])
+    parser.add_argument("--overlap", type=float, default=30.0, help="seconds of overlap between chunks")
+    parser.add_argument("--concurrency", type=int, default=20, help="provider requests in flight")
+    parser.add_argument("--overhead", type=float, default=20.0, help="provider seconds per request")
+    parser.add_argument("--real-time-factor", type=float, default=0.25, help="provider seconds per second of audio")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="seconds between chunk status checks")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
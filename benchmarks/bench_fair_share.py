@@ -0,0 +1,144 @@
+"""
+Simulate queueing delay for small tenants next to a noisy neighbour.
+
+One tenant bulk-submits --noisy-jobs files at once while --small-tenants
+tenants each submit a few files spread over the time it takes to drain that
+backlog. A discrete-event simulation with --workers Celery workers replays the
+same workload under each outbox scheduling policy, with the relay keeping the
+broker queue at --depth ready messages, and once with every message published
+straight to the broker as jobs used to be. Scheduling goes through
+app.utils.fair_share, the code the relay runs.
+
+Needs no external services.
+
+Run with: python -m benchmarks.bench_fair_share --noisy-jobs 5000 --workers 20
+"""
+import argparse
+import heapq
+import random
+import statistics
+from collections import defaultdict, deque
+from itertools import islice
+from typing import Dict, List, NamedTuple, Optional
+from app.utils.fair_share import FairShareScheduler, PendingMessage
+
+NOISY_TENANT = 0
+
+class Submission(NamedTuple):
+    id: int
+    tenant: int
+    arrival: float
+    duration: float
+
+def build_workload(args) -> List[Submission]:
+    rng = random.Random(args.seed)
+
+    def duration() -> float:
+        return rng.uniform(0.5, 1.5) * args.service_time
+
+    submissions = [
+        (rng.uniform(0, args.burst), NOISY_TENANT, duration())
+        for _ in range(args.noisy_jobs)
+    ]
+    # Small tenants arrive while the backlog drains
+    drain_time = args.noisy_jobs * args.service_time / args.workers
+    for tenant in range(1, args.small_tenants + 1):
+        submissions.extend(
+            (rng.uniform(0, drain_time), tenant, duration())
+            for _ in range(args.small_jobs)
+        )
+    submissions.sort()
+    return [
+        Submission(index, tenant, arrival, job_duration)
+        for index, (arrival, tenant, job_duration) in enumerate(submissions)
+    ]
+
+def simulate(
+    workload: List[Submission],
+    workers: int,
+    policy: str,
+    depth: Optional[int],
+    weights: Dict[int, float]
+) -> Dict[int, List[float]]:
+    """Seconds each submission waited before a worker started it, by tenant"""
+    scheduler = FairShareScheduler(policy, weights)
+    outbox: Dict[int, deque] = defaultdict(deque)
+    broker = deque()
+    completions: List[float] = []
+    idle = workers
+    waits: Dict[int, List[float]] = defaultdict(list)
+    arrivals = iter(workload)
+    upcoming = next(arrivals, None)
+
+    while upcoming is not None or completions or broker or any(outbox.values()):
+        # Next event: an arrival or a worker finishing, whichever comes first
+        if upcoming is not None and (not completions or upcoming.arrival <= completions[0]):
+            now = upcoming.arrival
+            outbox[upcoming.tenant].append(upcoming)
+            upcoming = next(arrivals, None)
+        else:
+            now = heapq.heappop(completions)
+            idle += 1
+
+        # The relay tops the broker queue up; without a depth everything is published as it arrives
+        if depth is None:
+            for tenant_backlog in outbox.values():
+                broker.extend(tenant_backlog)
+                tenant_backlog.clear()
+        else:
+            slots = depth - len(broker)
+            if slots > 0:
+                candidates = [
+                    PendingMessage(submission.id, tenant)
+                    for tenant, tenant_backlog in outbox.items()
+                    for submission in islice(tenant_backlog, slots)
+                ]
+                # Policies keep each tenant's own messages in order, so the head is the pick
+                for message in scheduler.pick(candidates, slots):
+                    broker.append(outbox[message.tenant].popleft())
+
+        # Workers take from the broker queue in order
+        while idle and broker:
+            submission = broker.popleft()
+            waits[submission.tenant].append(now - submission.arrival)
+            heapq.heappush(completions, now + submission.duration)
+            idle -= 1
+
+    return waits
+
+def main(args) -> None:
+    workload = build_workload(args)
+    weights = {NOISY_TENANT: args.noisy_weight}
+    scenarios = [
+        ("direct publish", "fifo", None),
+        ("fifo", "fifo", args.depth),
+        ("round_robin", "round_robin", args.depth),
+        (f"weighted {args.noisy_weight:g}", "weighted", args.depth),
+    ]
+
+    print(
+        f"{args.noisy_jobs} noisy jobs, {args.small_tenants} small tenants x {args.small_jobs} jobs, "
+        f"{args.workers} workers, queue depth {args.depth}"
+    )
+    print(f"{'scenario':<18}{'small p50 s':>13}{'small p95 s':>13}{'small max s':>13}{'noisy p50 s':>13}")
+    for name, policy, depth in scenarios:
+        waits = simulate(workload, args.workers, policy, depth, weights)
+        small = [wait for tenant, tenant_waits in waits.items() if tenant != NOISY_TENANT for wait in tenant_waits]
+        noisy = waits[NOISY_TENANT]
+        print(
+            f"{name:<18}{statistics.median(small):>13.0f}{statistics.quantiles(small, n=20)[-1]:>13.0f}"
+            f"{max(small):>13.0f}{statistics.median(noisy):>13.0f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--noisy-jobs", type=int, default=5000)
+    parser.add_argument("--burst", type=float, default=60.0, help="seconds over which the noisy tenant submits")
+    parser.add_argument("--small-tenants", type=int, default=20)
+    parser.add_argument("--small-jobs", type=int, default=5, help="jobs per small tenant")
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--service-time", type=float, default=30.0, help="mean seconds per job")
+    parser.add_argument("--depth", type=int, default=20, help="ready messages kept in the broker queue")
+    parser.add_argument("--noisy-weight", type=float, default=0.25, help="noisy tenant weight for the weighted policy")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,148 @@
+"""
+Benchmark transcription job creation throughput.
+
+Creates jobs for already-uploaded objects through _create_transcription_jobs
+from --concurrency concurrent sessions, --batch-size uploads per call, and
+reports jobs/sec, call latency and database round trips per job. With
+--compare-inline the flow used before the outbox (commit, refresh, publish,
+then a second commit for the task id) is timed as well. It publishes to a
+scratch queue that is deleted afterwards, and needs the configured RabbitMQ.
+
+Benchmark jobs and their outbox messages are deleted at the end, so run it
+without an outbox relay attached to the same database.
+
+Requires the configured Postgres, migrated to head.
+
+Run with: python -m benchmarks.bench_job_creation --jobs 5000 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from typing import List
+from sqlalchemy import delete, event, select
+from app.api.v1.endpoints.transcriptions import UploadedAudio, _create_transcription_jobs
+from app.core.celery_app import celery_app
+from app.core.database import SessionLocal, AsyncSessionLocal, async_engine
+from app.models.outbox import OutboxMessage
+from app.models.transcription import TranscriptionJob, JobStatus
+from app.models.user import User
+from app.schemas.transcription import TranscriptionOptions
+from app.workers.transcription_worker import process_transcription_job
+from benchmarks.bench_async_db import percentile
+from benchmarks.bench_transcript_search import ensure_user
+
+OPTIONS = TranscriptionOptions()
+SCRATCH_QUEUE = "benchmark-job-creation"
+
+class RoundTripCounter:
+    """Statements and commits sent over the async engine"""
+    def __init__(self):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._count)
+        event.listen(async_engine.sync_engine, "commit", self._count)
+
+    def _count(self, *args) -> None:
+        self.count += 1
+
+def synthetic_uploads(user_id: int, count: int) -> List[UploadedAudio]:
+    uploads = []
+    for _ in range(count):
+        name = uuid.uuid4().hex
+        uploads.append(UploadedAudio(
+            filename=f"bench-{name}.mp3",
+            object_name=f"audio/{user_id}/{name}.mp3",
+            content_sha256=os.urandom(32).hex()
+        ))
+    return uploads
+
+async def create_with_outbox(user: User, batch_size: int) -> None:
+    async with AsyncSessionLocal() as db:
+        await _create_transcription_jobs(db, user, synthetic_uploads(user.id, batch_size), OPTIONS)
+
+async def create_inline(user: User, batch_size: int) -> None:
+    """Job creation as it worked before the outbox, one job per transaction"""
+    async with AsyncSessionLocal() as db:
+        for upload in synthetic_uploads(user.id, batch_size):
+            job = TranscriptionJob(
+                user_id=user.id,
+                filename=upload.filename,
+                s3_object_key=upload.object_name,
+                status=JobStatus.PENDING.value,
+                content_sha256=upload.content_sha256
+            )
+            db.add(job)
+            await db.commit()
+            await db.refresh(job)
+            task = await asyncio.to_thread(
+                celery_app.send_task, process_transcription_job.name, args=[job.id], queue=SCRATCH_QUEUE
+            )
+            job.celery_task_id = task.id
+            await db.commit()
+
+async def run(create, user: User, calls: int, concurrency: int, batch_size: int) -> List[float]:
+    remaining = iter(range(calls))
+    latencies = []
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            await create(user, batch_size)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+def cleanup(user_id: int) -> None:
+    db = SessionLocal()
+    try:
+        task_ids = select(TranscriptionJob.celery_task_id).where(TranscriptionJob.user_id == user_id)
+        db.execute(delete(OutboxMessage).where(OutboxMessage.task_id.in_(task_ids)))
+        db.execute(delete(TranscriptionJob).where(TranscriptionJob.user_id == user_id))
+        db.commit()
+    finally:
+        db.close()
+
+async def main(args) -> None:
+    user_id = ensure_user(args.username)
+    user = User(id=user_id, username=args.username)
+    cleanup(user_id)
+    counter = RoundTripCounter()
+
+    modes = [("outbox", create_with_outbox)]
+    if args.compare_inline:
+        modes.append(("inline", create_inline))
+
+    calls = max(1, args.jobs // args.batch_size)
+    print(f"{calls * args.batch_size} jobs, {args.batch_size} per call, concurrency {args.concurrency}")
+    print(f"{'flow':<10}{'jobs/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'trips/job':>12}")
+    try:
+        for name, create in modes:
+            # Warm up the connection pools
+            await run(create, user, args.concurrency, args.concurrency, 1)
+            counter.count = 0
+
+            start = time.perf_counter()
+            latencies = await run(create, user, calls, args.concurrency, args.batch_size)
+            elapsed = time.perf_counter() - start
+            jobs = calls * args.batch_size
+            print(
+                f"{name:<10}{jobs / elapsed:>10.0f}"
+                f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 95) * 1000:>10.1f}"
+                f"{counter.count / jobs:>12.1f}"
+            )
+    finally:
+        cleanup(user_id)
+        if args.compare_inline:
+            with celery_app.connection_for_write() as connection:
+                connection.default_channel.queue_delete(SCRATCH_QUEUE)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1, help="uploads per call, as in a batch request")
+    parser.add_argument("--compare-inline", action="store_true", help="also time the pre-outbox flow")
+    parser.add_argument("--username", default="benchmark-creation-user")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,98 @@
+"""
+Benchmark storage size and encode/decode time of the segment codec.
+
+Builds a synthetic hour-long transcript (diarization utterances and
+sentiment sentences shaped like the AssemblyAI results) and compares plain
+JSON, gzipped JSON and app.utils.segment_codec, plus the time the codec takes
+to read a one-minute window from the middle of the transcript.
+
+Needs no external services.
+
+Run with: python -m benchmarks.bench_segment_codec --segments 20000
+"""
+import argparse
+import gzip
+import json
+import random
+import statistics
+import time
+from app.utils import segment_codec
+
+WORDS = (
+    "the call quality was fine thanks for waiting let me check your account "
+    "we can ship it tomorrow that works for me is there anything else today"
+).split()
+
+def synthetic_segments(count: int, duration_ms: int, seed: int):
+    rng = random.Random(seed)
+    step = duration_ms // count
+    utterances, sentences = [], []
+    for i in range(count):
+        start = i * step + rng.randint(0, step // 4)
+        end = start + rng.randint(step // 2, step)
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 20)))
+        confidence = round(rng.uniform(0.6, 1.0), 4)
+        utterances.append({
+            "speaker": rng.choice("ABCD"),
+            "text": text,
+            "start": start,
+            "end": end,
+            "confidence": confidence
+        })
+        sentences.append({
+            "text": text,
+            "sentiment": rng.choice(["POSITIVE", "NEUTRAL", "NEGATIVE"]),
+            "confidence": confidence,
+            "start": start,
+            "end": end
+        })
+    return utterances, sentences
+
+def timed(fn, repeat: int) -> float:
+    """Median wall time of fn in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main(args) -> None:
+    compression = "zstd" if segment_codec.zstandard is not None else "zlib"
+    print(f"{args.segments} segments over {args.minutes} minutes, codec compression: {compression}")
+    print(f"{'dataset':<12}{'format':<14}{'bytes':>12}{'encode ms':>12}{'decode ms':>12}")
+
+    datasets = synthetic_segments(args.segments, args.minutes * 60 * 1000, args.seed)
+    for name, segments in zip(["diarization", "sentiment"], datasets):
+        raw = json.dumps(segments).encode()
+        gzipped = gzip.compress(raw)
+        encoded = segment_codec.encode_segments(segments)
+        assert segment_codec.decode_segments(encoded) == segments
+
+        rows = [
+            ("json", len(raw),
+             timed(lambda: json.dumps(segments).encode(), args.repeat),
+             timed(lambda: json.loads(raw), args.repeat)),
+            ("json+gzip", len(gzipped),
+             timed(lambda: gzip.compress(json.dumps(segments).encode()), args.repeat),
+             timed(lambda: json.loads(gzip.decompress(gzipped)), args.repeat)),
+            ("columnar", len(encoded),
+             timed(lambda: segment_codec.encode_segments(segments), args.repeat),
+             timed(lambda: segment_codec.decode_segments(encoded), args.repeat)),
+        ]
+        for fmt, size, encode_ms, decode_ms in rows:
+            print(f"{name:<12}{fmt:<14}{size:>12}{encode_ms:>12.1f}{decode_ms:>12.1f}")
+
+        middle = args.minutes * 30 * 1000
+        window_ms = timed(
+            lambda: list(segment_codec.segments_in_window(encoded, middle, middle + 60 * 1000)), args.repeat
+        )
+        print(f"{name:<12}{'1min window':<14}{'':>12}{'':>12}{window_ms:>12.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--segments", type=int, default=20000)
+    parser.add_argument("--minutes", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,182 @@
+"""
+Benchmark transcript search latency on a synthetic corpus.
+
+Seeds one benchmark user with --transcripts completed jobs (100k by default,
+skipped when they already exist) and drives GET /transcriptions/search
+in-process over ASGI with common, rare and phrase queries. A sequential
+ILIKE scan over the same rows is timed for comparison.
+
+Requires the configured Postgres, migrated to head.
+
+Run with: python -m benchmarks.bench_transcript_search --transcripts 100000
+"""
+import argparse
+import asyncio
+import random
+import time
+from itertools import accumulate
+from typing import List
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import func, insert, select, text
+from app.api.v1.endpoints import transcriptions
+from app.core import security
+from app.core.database import SessionLocal, AsyncSessionLocal
+from app.models.transcription import TranscriptionJob, TranscriptionResult, JobStatus
+from app.models.user import User
+from app.utils.segment_codec import encode_segments, segments_etag
+from benchmarks.bench_async_db import percentile
+
+app = FastAPI()
+app.include_router(transcriptions.router, prefix="/transcriptions")
+
+TOPIC_WORDS = (
+    "account billing call customer delivery invoice order payment product "
+    "refund service shipping support ticket update warranty agent manager "
+    "tomorrow today week price discount contract renewal cancel upgrade"
+).split()
+# Appears in roughly one transcript per thousand
+RARE_WORD = "zanzibar"
+QUERIES = ["refund", "shipping delivery", '"billing account"', "warranty -renewal", RARE_WORD]
+BATCH_SIZE = 2000
+VOCABULARY_SIZE = 5000
+
+def build_vocabulary(seed: int) -> List[str]:
+    """Made-up words in Zipf rank order, with the topic words at mid-frequency ranks"""
+    rng = random.Random(seed)
+    syllables = [consonant + vowel for consonant in "bdfgklmnprstvz" for vowel in "aeiou"]
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 3))))
+    vocabulary = sorted(words)
+    rng.shuffle(vocabulary)
+    # Each topic word then shows up in roughly a fifth of the transcripts
+    vocabulary[200:200] = TOPIC_WORDS
+    return vocabulary
+
+VOCABULARY = build_vocabulary(0)
+CUMULATIVE_WEIGHTS = list(accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+
+def synthetic_transcript(rng: random.Random, words: int):
+    segments = []
+    for index in range(words // 20):
+        text = " ".join(rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=20))
+        if rng.random() < 0.001 / (words // 20):
+            text += f" {RARE_WORD}"
+        segments.append({
+            "speaker": rng.choice("AB"),
+            "text": text,
+            "start": index * 8000,
+            "end": index * 8000 + 7500,
+            "confidence": 0.9
+        })
+    return " ".join(segment["text"] for segment in segments), encode_segments(segments)
+
+def seed(user_id: int, transcripts: int, words: int) -> None:
+    db = SessionLocal()
+    try:
+        existing = db.scalar(select(func.count()).where(TranscriptionJob.user_id == user_id))
+        rng = random.Random(existing)
+        for offset in range(existing, transcripts, BATCH_SIZE):
+            count = min(BATCH_SIZE, transcripts - offset)
+            job_ids = db.scalars(
+                insert(TranscriptionJob).returning(TranscriptionJob.id),
+                [
+                    {
+                        "user_id": user_id,
+                        "filename": f"bench-{offset + i}.mp3",
+                        "s3_url": "s3://benchmark",
+                        "status": JobStatus.COMPLETED.value
+                    }
+                    for i in range(count)
+                ]
+            ).all()
+            rows = []
+            for job_id in job_ids:
+                transcript, speaker_segments = synthetic_transcript(rng, words)
+                rows.append({
+                    "job_id": job_id,
+                    "transcript_text": transcript,
+                    "speaker_segments": speaker_segments,
+                    "segments_etag": segments_etag(speaker_segments, None)
+                })
+            db.execute(insert(TranscriptionResult), rows)
+            db.commit()
+            print(f"seeded {offset + count}/{transcripts}")
+        
+        # Fresh planner statistics, so the search query uses the GIN index
+        db.execute(text("ANALYZE transcription_jobs, transcription_results"))
+        db.commit()
+    finally:
+        db.close()
+
+def ensure_user(username: str) -> int:
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            user = User(
+                username=username,
+                email=f"{username}@example.com",
+                hashed_password=User.hash_password("benchmark")
+            )
+            db.add(user)
+            db.commit()
+        return user.id
+    finally:
+        db.close()
+
+async def time_search(client: httpx.AsyncClient, token: str, query: str, repeat: int) -> List[float]:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(
+            "/transcriptions/search",
+            params={"q": query},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+async def time_ilike(user_id: int, word: str, repeat: int) -> List[float]:
+    latencies = []
+    async with AsyncSessionLocal() as db:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await db.execute(
+                select(TranscriptionResult.job_id)
+                .join(TranscriptionJob, TranscriptionJob.id == TranscriptionResult.job_id)
+                .where(
+                    TranscriptionJob.user_id == user_id,
+                    TranscriptionResult.transcript_text.ilike(f"%{word}%")
+                )
+                .limit(10)
+            )
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+async def main(args) -> None:
+    user_id = ensure_user(args.username)
+    seed(user_id, args.transcripts, args.words)
+    token = security.create_access_token(args.username)
+
+    print(f"{'query':<24}{'p50 ms':>10}{'p95 ms':>10}")
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None
+    ) as client:
+        for query in QUERIES:
+            await time_search(client, token, query, 1)
+            latencies = await time_search(client, token, query, args.repeat)
+            print(f"{query:<24}{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 95) * 1000:>10.1f}")
+
+    latencies = await time_ilike(user_id, RARE_WORD, args.repeat)
+    print(f"{'ILIKE ' + RARE_WORD:<24}{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 95) * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transcripts", type=int, default=100000)
+    parser.add_argument("--words", type=int, default=400, help="words per transcript")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--username", default="benchmark-search-user")
+    asyncio.run(main(parser.parse_args()))
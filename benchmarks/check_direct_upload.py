@@ -0,0 +1,177 @@
+"""
+Check the direct-to-S3 upload flow against a mocked S3.
+
+Runs the API in-process with S3 replaced by moto and drives
+POST /transcriptions/uploads and /uploads/complete the way a client does,
+PUTting the bytes to the presigned URLs:
+
+- single: a small WAV uploaded with one presigned PUT
+- multipart: a WAV larger than S3_MULTIPART_CHUNK_SIZE uploaded in parts
+- wrong type: an object stored as text/plain, which must be rejected. The
+  presigned PUT pins the content type, so it is written to the bucket directly
+- unreadable: a WAV-typed object that is not audio, which must be rejected
+
+Rejected objects must be deleted from the bucket. The check user's jobs
+are deleted at the end; nothing is published, since jobs reach the queue
+through the outbox relay. Exits with status 1 when a check fails.
+
+Requires the configured Postgres, migrated to head, and moto (pip install moto).
+
+Run with: python -m benchmarks.check_direct_upload
+"""
+import argparse
+import asyncio
+import io
+import sys
+import wave
+from typing import Dict, List, Optional, Tuple
+import httpx
+import requests
+from moto import mock_aws
+from sqlalchemy import delete, select
+from app.core import security
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.main import app
+from app.models.outbox import OutboxMessage
+from app.models.transcription import TranscriptionJob
+from app.services.s3_service import get_s3_service
+from benchmarks.bench_transcript_search import ensure_user
+
+API = "/api/v1/transcriptions"
+SAMPLE_RATE = 16000
+
+def wav_bytes(size: int) -> bytes:
+    """A silent 16-bit mono WAV of about size bytes"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(b"\x00\x00" * max(SAMPLE_RATE, size // 2))
+    return buffer.getvalue()
+
+def put_object(url: str, body: bytes, content_type: Optional[str] = None) -> str:
+    """PUT bytes to a presigned URL and return the ETag"""
+    headers = {"Content-Type": content_type} if content_type else {}
+    response = requests.put(url, data=body, headers=headers)
+    response.raise_for_status()
+    return response.headers["ETag"]
+
+def object_exists(object_key: str) -> bool:
+    return get_s3_service().head_object(object_key) is not None
+
+async def upload(
+    client: httpx.AsyncClient,
+    headers: Dict[str, str],
+    filename: str,
+    body: bytes,
+    content_type: str,
+    stored_type: Optional[str] = None
+) -> Tuple[str, httpx.Response]:
+    """Upload body the way a client does; the object key and the completion response"""
+    response = await client.post(
+        f"{API}/uploads",
+        json={"filename": filename, "content_type": content_type, "file_size": len(body)},
+        headers=headers
+    )
+    response.raise_for_status()
+    created = response.json()
+
+    completion = {"filename": filename, "object_key": created["object_key"]}
+    if stored_type:
+        get_s3_service().s3_client.put_object(
+            Bucket=settings.S3_BUCKET_NAME, Key=created["object_key"], Body=body, ContentType=stored_type
+        )
+    elif created["upload_url"]:
+        put_object(created["upload_url"], body, content_type)
+    else:
+        part_size = created["part_size"]
+        completion["upload_id"] = created["upload_id"]
+        completion["parts"] = [
+            {
+                "part_number": part["part_number"],
+                "etag": put_object(
+                    part["url"],
+                    body[(part["part_number"] - 1) * part_size:part["part_number"] * part_size]
+                )
+            }
+            for part in created["part_urls"]
+        ]
+    response = await client.post(f"{API}/uploads/complete", json=completion, headers=headers)
+    return created["object_key"], response
+
+async def run_checks(client: httpx.AsyncClient, headers: Dict[str, str]) -> List[str]:
+    failures = []
+
+    def expect_job(name: str, uploaded: Tuple[str, httpx.Response]) -> None:
+        object_key, response = uploaded
+        if response.status_code != 200:
+            failures.append(f"{name}: expected a job, got {response.status_code} {response.text}")
+        elif not object_exists(object_key):
+            failures.append(f"{name}: object {object_key} is missing")
+        else:
+            print(f"{name:<12}job {response.json()['job_id']}")
+
+    def expect_rejected(name: str, uploaded: Tuple[str, httpx.Response]) -> None:
+        object_key, response = uploaded
+        if response.status_code != 400:
+            failures.append(f"{name}: expected 400, got {response.status_code} {response.text}")
+        elif object_exists(object_key):
+            failures.append(f"{name}: rejected object {object_key} was not deleted")
+        else:
+            print(f"{name:<12}rejected and deleted: {response.json()['detail']}")
+
+    expect_job("single", await upload(client, headers, "single.wav", wav_bytes(64 * 1024), "audio/wav"))
+    expect_job(
+        "multipart",
+        await upload(
+            client, headers, "multipart.wav", wav_bytes(settings.S3_MULTIPART_CHUNK_SIZE + 1024 * 1024), "audio/wav"
+        )
+    )
+    expect_rejected(
+        "wrong type",
+        await upload(client, headers, "notes.wav", wav_bytes(64 * 1024), "audio/wav", stored_type="text/plain")
+    )
+    expect_rejected(
+        "unreadable",
+        await upload(client, headers, "noise.wav", b"not audio at all" * 4096, "audio/wav")
+    )
+    return failures
+
+def cleanup(user_id: int) -> None:
+    db = SessionLocal()
+    try:
+        task_ids = select(TranscriptionJob.celery_task_id).where(TranscriptionJob.user_id == user_id)
+        db.execute(delete(OutboxMessage).where(OutboxMessage.task_id.in_(task_ids)))
+        db.execute(delete(TranscriptionJob).where(TranscriptionJob.user_id == user_id))
+        db.commit()
+    finally:
+        db.close()
+
+async def main(args) -> int:
+    user_id = ensure_user(args.username)
+    token = security.create_access_token(args.username)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with mock_aws():
+        bucket = {"Bucket": settings.S3_BUCKET_NAME}
+        if settings.AWS_REGION != "us-east-1":
+            bucket["CreateBucketConfiguration"] = {"LocationConstraint": settings.AWS_REGION}
+        get_s3_service().s3_client.create_bucket(**bucket)
+        try:
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://check", timeout=None
+            ) as client:
+                failures = await run_checks(client, headers)
+        finally:
+            cleanup(user_id)
+
+    for failure in failures:
+        print(f"FAILED {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--username", default="benchmark-upload-user")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,358 @@
+"""
+End-to-end load test of the deployed API, workers and their backing services.
+
+Drives a running stack over HTTP, normally docker-compose with
+benchmarks/docker-compose.load.yml on top, which swaps MinIO in for S3 and the
+local transcription backend in for AssemblyAI. Each phase measures one part
+of the pipeline:
+
+- auth: login latency, and the latency the token check adds to a request
+  (GET /users/me against the unauthenticated /health)
+- upload: throughput and latency of synthetic WAV uploads through
+  POST /transcriptions/upload
+- pipeline: seconds from job creation to completion of the uploaded jobs,
+  taken from the jobs' own timestamps
+- listing: GET /transcriptions/ (first page and a deep cursor page) and
+  GET /transcriptions/{id} for a user owning each of --list-sizes jobs, which
+  are seeded straight into Postgres and kept for later runs
+
+Metrics go to a JSON report together with checks against the regression
+thresholds in benchmarks/load_thresholds.json. The exit status is 1 when a
+check fails, so CI can track releases against the same thresholds.
+
+Requires the stack to be up and migrated to head, and the configured Postgres
+(the stack's, for seeding the listing phase).
+
+Run with: python -m benchmarks.load_test --base-url http://localhost:8000 --report load-report.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import wave
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import httpx
+from sqlalchemy import func, select, text
+from app.core.database import SessionLocal
+from app.models.transcription import TranscriptionJob
+from benchmarks.bench_async_db import percentile
+
+API = "/api/v1"
+PHASES = ("auth", "upload", "pipeline", "listing")
+THRESHOLDS = os.path.join(os.path.dirname(__file__), "load_thresholds.json")
+PASSWORD = "load-test-password"
+FINISHED = {"completed", "failed"}
+SAMPLE_RATE = 16000
+SEED_BATCH = 100_000
+DEEP_PAGE = 50
+
+# Completed jobs with a short transcript each, older the higher n
+SEED_JOBS = text("""
+    WITH jobs AS (
+        INSERT INTO transcription_jobs (
+            user_id, filename, s3_url, status, audio_format, audio_duration,
+            enable_speaker_diarization, enable_sentiment_analysis, enable_summarization,
+            confidence_score, processing_time, created_at, started_at, completed_at
+        )
+        SELECT
+            :user_id, 'load-' || n || '.wav', 's3://load-test/' || n, 'completed', 'wav', 60,
+            true, true, true,
+            0.9, 12, created_at, created_at, created_at + interval '12 seconds'
+        FROM generate_series(:start, :stop - 1) AS n,
+            LATERAL (SELECT now() - n * interval '1 minute' AS created_at) AS times
+        RETURNING id
+    )
+    INSERT INTO transcription_results (job_id, transcript_text)
+    SELECT id, 'load test transcript number ' || id FROM jobs
+""")
+
+Call = Callable[[], Awaitable[None]]
+
+def synthetic_wav(seconds: float) -> bytes:
+    """Mono 16-bit WAV of noise, different every time so uploads are never deduplicated"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as audio:
+        audio.setnchannels(1)
+        audio.setsampwidth(2)
+        audio.setframerate(SAMPLE_RATE)
+        audio.writeframes(os.urandom(int(seconds * SAMPLE_RATE) * 2))
+    return buffer.getvalue()
+
+async def measure(call: Call, requests: int, concurrency: int) -> Dict[str, Optional[float]]:
+    """Run call requests times, concurrency at once, and summarise its latency and throughput"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call()
+            except httpx.HTTPError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    
+    summary: Dict[str, Optional[float]] = {"per_second": len(latencies) / elapsed, "errors": errors}
+    for pct in (50, 95, 99):
+        summary[f"p{pct}_ms"] = percentile(latencies, pct) * 1000 if latencies else None
+    return summary
+
+def record(metrics: Dict[str, Any], prefix: str, summary: Dict[str, Any]) -> None:
+    for key, value in summary.items():
+        metrics[f"{prefix}.{key}"] = value
+    print(f"{prefix:<32}" + "".join(
+        f"{key}={value:.1f}  " if isinstance(value, float) else f"{key}={value}  "
+        for key, value in summary.items()
+    ))
+
+async def sign_in(client: httpx.AsyncClient, username: str) -> Dict[str, str]:
+    """Register the user unless it exists, log in and return the auth header"""
+    response = await client.post(f"{API}/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": PASSWORD
+    })
+    if response.status_code != 400:  # already registered
+        response.raise_for_status()
+    response = await client.post(f"{API}/auth/login", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def auth_phase(client: httpx.AsyncClient, headers: Dict[str, str], args, metrics: Dict[str, Any]) -> None:
+    form = {"username": args.username, "password": PASSWORD}
+    
+    async def login():
+        (await client.post(f"{API}/auth/login", data=form)).raise_for_status()
+    
+    async def unauthenticated():
+        (await client.get("/health")).raise_for_status()
+    
+    async def authenticated():
+        (await client.get(f"{API}/users/me", headers=headers)).raise_for_status()
+    
+    # Login hashes the password on purpose, so it gets fewer requests
+    record(metrics, "auth.login", await measure(login, args.login_requests, args.concurrency))
+    baseline = await measure(unauthenticated, args.requests, args.concurrency)
+    record(metrics, "auth.unauthenticated", baseline)
+    checked = await measure(authenticated, args.requests, args.concurrency)
+    record(metrics, "auth.authenticated", checked)
+    if baseline["p50_ms"] is not None and checked["p50_ms"] is not None:
+        metrics["auth.overhead_p50_ms"] = checked["p50_ms"] - baseline["p50_ms"]
+
+async def upload_phase(
+    client: httpx.AsyncClient, headers: Dict[str, str], args, metrics: Dict[str, Any]
+) -> List[int]:
+    """Upload --uploads files and return the IDs of the jobs they created"""
+    files = [synthetic_wav(args.audio_seconds) for _ in range(args.uploads)]
+    remaining = iter(files)
+    job_ids: List[int] = []
+    
+    async def upload():
+        response = await client.post(
+            f"{API}/transcriptions/upload",
+            headers=headers,
+            files={"file": ("load-test.wav", next(remaining), "audio/wav")}
+        )
+        response.raise_for_status()
+        job_ids.append(response.json()["job_id"])
+    
+    summary = await measure(upload, len(files), args.concurrency)
+    summary["megabytes_per_second"] = summary["per_second"] * len(files[0]) / 1e6
+    record(metrics, "upload", summary)
+    return job_ids
+
+async def pipeline_phase(
+    client: httpx.AsyncClient, headers: Dict[str, str], job_ids: List[int], args, metrics: Dict[str, Any]
+) -> None:
+    """Wait up to --timeout for the uploaded jobs to finish, then time them from creation to completion"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    finished: Dict[int, Dict[str, Any]] = {}
+    
+    async def check(job_id: int):
+        async with semaphore:
+            try:
+                response = await client.get(f"{API}/transcriptions/{job_id}", headers=headers)
+                response.raise_for_status()
+            except httpx.HTTPError:
+                return
+            job = response.json()
+            if job["status"] in FINISHED:
+                finished[job_id] = job
+    
+    deadline = time.monotonic() + args.timeout
+    while len(finished) < len(job_ids) and time.monotonic() < deadline:
+        await asyncio.gather(*(check(job_id) for job_id in job_ids if job_id not in finished))
+        if len(finished) < len(job_ids):
+            await asyncio.sleep(args.poll_interval)
+    
+    completed = [job for job in finished.values() if job["status"] == "completed"]
+    summary: Dict[str, Any] = {
+        "completed": len(completed),
+        "failed": len(finished) - len(completed),
+        "unfinished": len(job_ids) - len(finished)
+    }
+    if completed:
+        created = [datetime.fromisoformat(job["created_at"]) for job in completed]
+        done = [datetime.fromisoformat(job["completed_at"]) for job in completed]
+        seconds = [(end - start).total_seconds() for start, end in zip(created, done)]
+        for pct in (50, 95, 99):
+            summary[f"p{pct}_s"] = percentile(seconds, pct)
+        summary["jobs_per_second"] = len(completed) / max(1e-3, (max(done) - min(created)).total_seconds())
+    record(metrics, "pipeline", summary)
+
+def seed_jobs(user_id: int, total: int) -> None:
+    """Top up the user's jobs to total"""
+    db = SessionLocal()
+    try:
+        existing = db.scalar(select(func.count()).where(TranscriptionJob.user_id == user_id))
+        for start in range(existing, total, SEED_BATCH):
+            stop = min(total, start + SEED_BATCH)
+            db.execute(SEED_JOBS, {"user_id": user_id, "start": start, "stop": stop})
+            db.commit()
+            print(f"seeded {stop}/{total} jobs")
+        
+        # Fresh planner statistics after a bulk insert
+        db.execute(text("ANALYZE transcription_jobs, transcription_results"))
+        db.commit()
+    finally:
+        db.close()
+
+def sample_job_ids(user_id: int, count: int) -> List[int]:
+    db = SessionLocal()
+    try:
+        return db.scalars(
+            select(TranscriptionJob.id)
+            .where(TranscriptionJob.user_id == user_id)
+            .order_by(func.random())
+            .limit(count)
+        ).all()
+    finally:
+        db.close()
+
+async def listing_phase(client: httpx.AsyncClient, args, metrics: Dict[str, Any]) -> None:
+    headers = await sign_in(client, f"{args.username}-listing")
+    response = await client.get(f"{API}/users/me", headers=headers)
+    response.raise_for_status()
+    user_id = response.json()["id"]
+    
+    for size in sorted(args.list_sizes):
+        await asyncio.to_thread(seed_jobs, user_id, size)
+        
+        # Walk once to a page deep in the list, then request it repeatedly
+        cursor = None
+        for _ in range(DEEP_PAGE):
+            response = await client.get(
+                f"{API}/transcriptions/", headers=headers, params={"cursor": cursor} if cursor else None
+            )
+            response.raise_for_status()
+            cursor = response.headers.get("X-Next-Cursor") or cursor
+        
+        job_ids = iter(await asyncio.to_thread(sample_job_ids, user_id, args.requests))
+        
+        async def first_page():
+            (await client.get(f"{API}/transcriptions/", headers=headers)).raise_for_status()
+        
+        async def deep_page():
+            (await client.get(f"{API}/transcriptions/", headers=headers, params={"cursor": cursor})).raise_for_status()
+        
+        async def get_job():
+            (await client.get(f"{API}/transcriptions/{next(job_ids)}", headers=headers)).raise_for_status()
+        
+        record(metrics, f"listing.{size}.first_page", await measure(first_page, args.requests, args.concurrency))
+        record(metrics, f"listing.{size}.deep_page", await measure(deep_page, args.requests, args.concurrency))
+        record(metrics, f"listing.{size}.get", await measure(get_job, min(args.requests, size), args.concurrency))
+
+def check_thresholds(metrics: Dict[str, Any], thresholds: Dict[str, Dict[str, float]]) -> List[Dict[str, Any]]:
+    """One check per threshold whose metric was measured in this run"""
+    checks = []
+    for metric, bounds in thresholds.items():
+        value = metrics.get(metric)
+        if value is None:
+            continue
+        passed = value <= bounds.get("max", value) and value >= bounds.get("min", value)
+        checks.append({"metric": metric, "value": value, **bounds, "passed": passed})
+    return checks
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run(args) -> Dict[str, Any]:
+    metrics: Dict[str, Any] = {}
+    async with httpx.AsyncClient(
+        base_url=args.base_url,
+        timeout=httpx.Timeout(args.request_timeout),
+        limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    ) as client:
+        headers = await sign_in(client, args.username)
+        if "auth" in args.phases:
+            await auth_phase(client, headers, args, metrics)
+        if "upload" in args.phases or "pipeline" in args.phases:
+            job_ids = await upload_phase(client, headers, args, metrics)
+            if "pipeline" in args.phases:
+                await pipeline_phase(client, headers, job_ids, args, metrics)
+        if "listing" in args.phases:
+            await listing_phase(client, args, metrics)
+    return metrics
+
+def main(args) -> None:
+    with open(args.thresholds) as thresholds_file:
+        thresholds = json.load(thresholds_file)
+    
+    started_at = datetime.now(timezone.utc)
+    metrics = asyncio.run(run(args))
+    checks = check_thresholds(metrics, thresholds)
+    report = {
+        "started_at": started_at.isoformat(),
+        "duration_s": (datetime.now(timezone.utc) - started_at).total_seconds(),
+        "commit": git_commit(),
+        "parameters": {key: value for key, value in vars(args).items() if key != "report"},
+        "metrics": metrics,
+        "checks": checks,
+        "passed": all(check["passed"] for check in checks)
+    }
+    with open(args.report, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+    
+    print(f"\n{'threshold':<40}{'value':>12}{'bound':>14}  result")
+    for check in checks:
+        bound = f"<= {check['max']:g}" if "max" in check else f">= {check['min']:g}"
+        print(f"{check['metric']:<40}{check['value']:>12.2f}{bound:>14}  {'pass' if check['passed'] else 'FAIL'}")
+    print(f"\nreport written to {args.report}")
+    sys.exit(0 if report["passed"] else 1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--phases", nargs="+", choices=PHASES, default=list(PHASES))
+    parser.add_argument("--username", default="load-test")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per latency measurement")
+    parser.add_argument("--login-requests", type=int, default=100)
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--audio-seconds", type=float, default=10.0, help="length of each uploaded file")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds to wait for uploaded jobs to finish")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between job status checks")
+    parser.add_argument(
+        "--list-sizes", type=int, nargs="+", default=[10_000, 1_000_000], help="jobs owned by the listing user"
+    )
+    parser.add_argument("--request-timeout", type=float, default=60.0, help="seconds")
+    parser.add_argument("--thresholds", default=THRESHOLDS)
+    parser.add_argument("--report", default="load-report.json")
+    main(parser.parse_args())